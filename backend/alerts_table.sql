@@ -8,6 +8,14 @@ CREATE TABLE IF NOT EXISTS alerts (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Series the alert refers to (e.g. 'disease:Cholera', 'country:Sudan'); NULL for global alerts
+ALTER TABLE alerts ADD COLUMN IF NOT EXISTS series_key TEXT;
+
+-- "<type>:<series_key or 'global'>:<window start>" (see ingestion/notifier.py);
+-- a repeat of an alert already stored in the same window is ignored
+ALTER TABLE alerts ADD COLUMN IF NOT EXISTS dedupe_key TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_alerts_dedupe_key ON alerts(dedupe_key);
+
 -- Policy: Allow anonymous read (for dashboard)
 CREATE POLICY "Allow public read access" ON alerts FOR SELECT USING (true);
 
@@ -0,0 +1,97 @@
+"""
+Offline parity check and round-trip count for the bulk write path.
+Writes the same events through the per-row and the batch path of
+SupabaseClient, each against its own FakeSupabaseClient.
+
+Usage (from backend/):
+    python benchmarks/bench_batch_writes.py [--events 200]
+"""
+import argparse
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "ingestion"))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+from db_client import SupabaseClient
+from fakes import FakeSupabaseClient
+
+CHILD_TABLES = ["disease_mentions", "location_mentions", "outbreak_assessments"]
+
+
+def make_events(n):
+    events = []
+    for i in range(n):
+        raw = {
+            "external_id": f"don-{i}",
+            "title": f"Cholera - Sudan #{i}",
+            "content": f"Report {i}: cholera cases in Sudan and Chad.",
+            "raw_url": f"https://www.who.int/emergencies/disease-outbreak-news/item/{i}",
+            "published_at": "2024-01-08T00:00:00",
+        }
+        processed = {
+            "title": raw["title"],
+            "diseases": ["Cholera"] if i % 3 else [],
+            "locations": ["Sudan", "Chad"][: i % 3],
+            "classification": "confirmed_outbreak",
+            "confidence": 1.0,
+            "assessment_text": "Official Tier 1 Source (WHO DONs)",
+            "source_tier": 1,
+        }
+        events.append((raw, processed))
+    return events
+
+
+def snapshot(fake):
+    """Table contents with generated IDs replaced by stable keys."""
+    raw_key = {r["id"]: r["external_id"] for r in fake.tables.get("raw_events", [])}
+    event_key = {r["id"]: raw_key[r["raw_event_id"]] for r in fake.tables.get("normalized_events", [])}
+    volatile = {"id", "created_at"}
+    result = {
+        "raw_events": sorted(
+            tuple(sorted((k, v) for k, v in r.items() if k not in volatile and k != "source_id"))
+            for r in fake.tables.get("raw_events", [])
+        ),
+        "normalized_events": sorted(
+            tuple(sorted((k, raw_key.get(v, v) if k == "raw_event_id" else v)
+                         for k, v in r.items() if k not in volatile))
+            for r in fake.tables.get("normalized_events", [])
+        ),
+    }
+    for table in CHILD_TABLES:
+        result[table] = sorted(
+            tuple(sorted((k, event_key[v] if k == "event_id" else v)
+                         for k, v in r.items() if k not in volatile))
+            for r in fake.tables.get(table, [])
+        )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200)
+    args = parser.parse_args()
+    events = make_events(args.events)
+
+    per_row_fake = FakeSupabaseClient()
+    per_row = SupabaseClient(client=per_row_fake)
+    source_id = per_row.upsert_source("WHO", "https://www.who.int", 1, "Web")
+    for raw, processed in events:
+        raw_id = per_row.insert_raw_event(source_id, raw)
+        per_row.insert_normalized_event(raw_id, processed)
+
+    batch_fake = FakeSupabaseClient()
+    batch = SupabaseClient(client=batch_fake)
+    source_id = batch.upsert_source("WHO", "https://www.who.int", 1, "Web")
+    batch.insert_events_batch(source_id, events)
+
+    assert snapshot(per_row_fake) == snapshot(batch_fake), "Row contents differ between write paths"
+    print(f"Events: {len(events)}")
+    print(f"Per-row path: {per_row_fake.requests} requests")
+    print(f"Batch path:   {batch_fake.requests} requests")
+    print("Row contents match.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Offline accuracy and speed check for the near-duplicate index.
+Indexes a synthetic DON corpus as one source, then queries:
+  - copies: lightly reworded DONs from another source (should match the
+    DON they were copied from),
+  - updates: the same DONs with new dates and figures (should not match:
+    linking them would drop the new counts),
+  - unseen DONs (should not match),
+  - copies from the indexed source itself (should not match).
+Precision is the share of matches that are copies linked to their
+original; exact shingle Jaccard is shown for reference.
+
+Usage (from backend/):
+    python benchmarks/bench_dedup.py [--events 5000] [--threshold 0.6] [--sweep 0.5,0.6,0.7,0.8]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "ingestion"))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+from dedup import NearDuplicateIndex, figures, shingles
+from corpus import make_dons
+
+FILLER = ("According to the latest situation report, ", "WHO notes that ", "Update: ", "")
+NUMBER_RE = re.compile(r"\d+")
+INDEXED_SOURCE = "who"
+OTHER_SOURCE = "news"
+
+
+def text(don):
+    return f"{don['Title']} {don['Summary']}"
+
+
+def reword(don, rng):
+    """A syndicated copy: different lead-in and one word dropped near the end."""
+    words = don["Summary"].split()
+    del words[rng.randrange(len(words) // 2, len(words))]
+    return {**don, "Summary": rng.choice(FILLER) + " ".join(words)}
+
+
+def update(don, rng):
+    """A follow-up report on the same outbreak: every date and figure changed."""
+    renumber = lambda m: str(int(m.group()) + rng.randrange(1, 500))
+    return {**don, "Summary": NUMBER_RE.sub(renumber, don["Summary"])}
+
+
+def jaccard(a, b):
+    a, b = set(shingles(a)), set(shingles(b))
+    return len(a & b) / len(a | b)
+
+
+def evaluate(indexed, queries, threshold):
+    path = os.path.join(tempfile.mkdtemp(prefix="outbreak-bench-"), "dedup.sqlite")
+    index = NearDuplicateIndex(threshold=threshold, path=path)
+    start = time.perf_counter()
+    index.add_many((f"{INDEXED_SOURCE}:{d['Id']}", index.signature(text(d)), d["Id"], figures(text(d)))
+                   for d in indexed)
+    build = time.perf_counter() - start
+
+    found = {kind: 0 for kind in ("copy", "update", "unseen", "own_copy")}
+    correct = 0
+    query_time = 0.0
+    for query, kind, source_id, origin in queries:
+        start = time.perf_counter()
+        signature = index.signature(query)
+        match = index.query(signature, figures(query), exclude_source=source_id) if signature is not None else None
+        query_time += time.perf_counter() - start
+        if match:
+            found[kind] += 1
+            correct += kind == "copy" and match[0] == origin["Id"]
+    result = {"index": index, "build": build, "query_time": query_time, "found": found, "correct": correct}
+    index.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--sweep", default="", help="Comma-separated thresholds to compare")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    indexed = make_dons(args.events, seed=1)
+    unseen = make_dons(args.events // 2, seed=2)
+    sample = rng.sample(indexed, args.events // 2)
+
+    # (query text, kind, querying source, indexed DON it derives from or None)
+    queries = [(text(reword(d, rng)), "copy", OTHER_SOURCE, d) for d in sample]
+    queries += [(text(update(d, rng)), "update", OTHER_SOURCE, d) for d in sample]
+    queries += [(text(d), "unseen", OTHER_SOURCE, None) for d in unseen]
+    queries += [(text(reword(d, rng)), "own_copy", INDEXED_SOURCE, d) for d in sample[:len(sample) // 5]]
+    copies = sum(1 for q in queries if q[1] == "copy")
+
+    for threshold in [float(t) for t in args.sweep.split(",") if t] or [args.threshold]:
+        r = evaluate(indexed, queries, threshold)
+        found, matches = r["found"], sum(r["found"].values())
+        print(f"threshold {threshold:.2f} (bands={r['index'].bands}, rows={r['index'].rows}): "
+              f"indexed {args.events} in {r['build']:.2f}s, {r['query_time'] / len(queries) * 1000:.3f} ms/query")
+        print(f"  precision {r['correct'] / max(matches, 1):.1%}, recall {r['correct'] / copies:.1%} "
+              f"({r['correct']}/{copies} copies linked to their original)")
+        print(f"  wrongly linked: {found['update']} updates, {found['unseen']} unrelated DONs, "
+              f"{found['own_copy']} same-source reports")
+
+    # Exact similarity of the generated pairs, for choosing a threshold
+    pairs = {"copy": [], "update": []}
+    for query, kind, _, origin in queries[:2 * len(sample)]:
+        pairs[kind].append(jaccard(query, text(origin)))
+    for kind, values in pairs.items():
+        values.sort()
+        print(f"Exact Jaccard of {kind} pairs: min {values[0]:.2f}, median {values[len(values) // 2]:.2f}, "
+              f"max {values[-1]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
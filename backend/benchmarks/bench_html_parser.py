@@ -0,0 +1,118 @@
+"""
+Parity check and benchmark: lxml/XPath index parser and fast date parser
+vs the previous BeautifulSoup + dateutil implementation.
+
+The checked-in who_page.html renders its DON list client-side (the item
+anchor only exists inside a Kendo template) and parses to no items, so
+parity is checked on that page with its template expanded into synthetic
+items, and on the synthetic index page used by run_benchmarks.py.
+
+Usage (from backend/):
+    python benchmarks/bench_html_parser.py [--items 500]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+import dateutil.parser
+from bs4 import BeautifulSoup
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "ingestion"))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+from who_dons import WHODonIngestor, parse_who_date
+from scratch import use_scratch_caches
+from corpus import make_dons, render_index_html
+
+FIXTURE = os.path.join(BACKEND_DIR, "who_page.html")
+BASE_URL = WHODonIngestor.BASE_URL
+ROUNDS = 20
+MONTH_NAMES = ["January", "February", "March", "April", "May", "June", "July",
+               "August", "September", "October", "November", "December"]
+
+
+def legacy_parse_html(html):
+    """The previous BeautifulSoup implementation of _parse_html."""
+    soup = BeautifulSoup(html, "lxml")
+    events = []
+    items = soup.find_all("a", class_=re.compile(r"list-vertical__item|list-view--item"))
+    if not items:
+        items = soup.find_all("a", href=re.compile(r"/emergencies/disease-outbreak-news/item/"))
+    for item in items:
+        url = item.get("href")
+        if url and not url.startswith("http"):
+            url = BASE_URL + url if url.startswith("/") else url
+        title_elem = item.find("span", class_="full-title") or item.find("h4")
+        title = title_elem.get_text(strip=True) if title_elem else item.get_text(strip=True)
+        date_match = re.search(r"(\d{1,2}\s+[A-Z][a-z]+\s+\d{4})", item.get_text())
+        date_str = date_match.group(1) if date_match else ""
+        events.append({"external_id": url, "title": title, "content": title,
+                       "raw_url": url, "published_at": date_str})
+    return events
+
+
+def legacy_parse_date(date_str):
+    return dateutil.parser.parse(date_str).isoformat()
+
+
+def render_fixture(html, n):
+    """Expand the page's Kendo item template into n server-rendered items."""
+    container = re.search(r'<div id="listView-([^"]*)" class="sf-list-vertical emergency">', html)
+    template = re.search(r'<script type="text/x-kendo-tmpl" id="template-%s">(.*?)</script>'
+                         % re.escape(container.group(1)), html, re.S).group(1)
+    template = re.sub(r"#var title.*?#", "", template, count=1)
+    rendered = []
+    for i in range(n):
+        date = f"{1 + i % 28} {MONTH_NAMES[i % 12]} {2015 + i % 10}"
+        title = f"Cholera &amp; Mpox - Côte d'Ivoire #{i}"
+        rendered.append(template
+                        .replace("#:ItemDefaultUrl #", f"/{2015 + i % 10}-DON{i}")
+                        .replace("#= title#", title)
+                        .replace("#: FormattedDate#", date))
+    tag = container.group(0)
+    return html.replace(tag, tag + "".join(rendered), 1)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn(*args)
+    return (time.perf_counter() - start) / ROUNDS, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=500)
+    args = parser.parse_args()
+    use_scratch_caches()
+
+    with open(FIXTURE, encoding="utf-8") as f:
+        fixture = f.read()
+    ingestor = WHODonIngestor(dry_run=True)
+    fast_parse = lambda html: list(ingestor._parse_html(html))
+
+    pages = [(f"who_page.html + {args.items} items", render_fixture(fixture, args.items)),
+             (f"index page ({args.items} items)", render_index_html(make_dons(args.items)))]
+    for label, html in pages:
+        legacy_time, legacy = timed(legacy_parse_html, html)
+        fast_time, fast = timed(fast_parse, html)
+        assert len(fast) == args.items, f"Parsed {len(fast)} of {args.items} items on {label}"
+        assert legacy == fast, f"Parser output differs on {label}"
+        print(f"{label:28s} items={len(fast):4d}  bs4: {legacy_time * 1000:7.1f} ms  "
+              f"lxml: {fast_time * 1000:7.1f} ms  ({legacy_time / fast_time:.1f}x)  identical")
+
+    dates = [e["published_at"] for e in fast] + ["2024-01-08T00:00:00Z", "2023-12-31T10:15:30.5+02:00", "2024-02-29"]
+    for d in dates:
+        assert parse_who_date(d) == legacy_parse_date(d), f"Date parse differs for {d!r}"
+    parse_who_date.cache_clear()
+    legacy_time, _ = timed(lambda: [legacy_parse_date(d) for d in dates])
+    fast_time, _ = timed(lambda: [parse_who_date(d) for d in dates])
+    print(f"{'dates (' + str(len(dates)) + ')':28s} dateutil: {legacy_time * 1000:7.2f} ms  "
+          f"fast+memo: {fast_time * 1000:7.2f} ms  ({legacy_time / fast_time:.1f}x)  identical")
+
+
+if __name__ == "__main__":
+    main()
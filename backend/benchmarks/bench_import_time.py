@@ -0,0 +1,72 @@
+"""
+Startup-time check for the ingestion entry points.
+Imports a module in fresh interpreters under `python -X importtime` and
+reports its cumulative import time (best of --repeat) plus the slowest
+imports. Exits non-zero if the time exceeds --max-ms or if a module
+that should load lazily (--forbid) is imported at startup.
+
+Usage (from backend/):
+    python benchmarks/bench_import_time.py [--module run_pipeline] [--repeat 5]
+        [--max-ms 1000] [--forbid google.generativeai,lxml,feedparser,pandas]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INGESTION_DIR = os.path.join(BACKEND_DIR, "ingestion")
+
+# Heavy dependencies that only some runs need
+DEFAULT_FORBID = "google.generativeai,lxml,feedparser,pandas,bs4"
+
+
+def import_times(module):
+    """{imported module: (self_us, cumulative_us)} for one fresh `import module`."""
+    env = {k: v for k, v in os.environ.items() if not k.startswith(("SUPABASE_", "GEMINI_"))}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=INGESTION_DIR, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        sys.exit(f"import {module} failed:\n{proc.stderr}")
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="run_pipeline")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if the import takes longer than this")
+    parser.add_argument("--forbid", default=DEFAULT_FORBID,
+                        help="Comma-separated modules that must not be imported at startup")
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.repeat)]
+    best = min(runs, key=lambda t: t[args.module][1])
+    total_ms = best[args.module][1] / 1000
+
+    print(f"import {args.module}: best {total_ms:.1f} ms, "
+          f"median {sorted(r[args.module][1] for r in runs)[len(runs) // 2] / 1000:.1f} ms "
+          f"({len(best)} modules, {args.repeat} runs)")
+    print("Slowest imports (self time):")
+    for name, (self_us, cumulative_us) in sorted(best.items(), key=lambda kv: kv[1][0], reverse=True)[:10]:
+        print(f"  {self_us / 1000:7.1f} ms  {cumulative_us / 1000:7.1f} ms cumulative  {name}")
+
+    failures = []
+    forbidden = [m for m in args.forbid.split(",") if m and m in best]
+    if forbidden:
+        failures.append(f"imported at startup: {', '.join(forbidden)}")
+    if args.max_ms is not None and total_ms > args.max_ms:
+        failures.append(f"{total_ms:.1f} ms exceeds the {args.max_ms:.0f} ms budget")
+    if failures:
+        sys.exit("FAIL: " + "; ".join(failures))
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
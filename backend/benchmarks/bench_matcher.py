@@ -0,0 +1,70 @@
+"""
+Benchmark: compiled EntityMatcher vs the per-keyword re.search loop.
+
+Usage (from backend/):
+    python benchmarks/bench_matcher.py
+"""
+import os
+import re
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "ingestion"))
+
+from processor import EventProcessor
+from matcher import EntityMatcher
+
+FIXTURE = os.path.join(BACKEND_DIR, "who_page.html")
+ROUNDS = 50
+
+
+def legacy_match(text):
+    """The previous implementation: one re.search per keyword."""
+    diseases = []
+    for disease, keywords in EventProcessor.DISEASE_KEYWORDS.items():
+        for kw in keywords:
+            if re.search(rf"\b{re.escape(kw)}\b", text, re.I):
+                diseases.append(disease)
+                break
+    locations = []
+    for country in EventProcessor.COUNTRIES:
+        if re.search(rf"\b{re.escape(country)}\b", text):
+            locations.append(country)
+    return sorted(set(diseases)), sorted(set(locations))
+
+
+def timed(fn, text):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn(text)
+    return (time.perf_counter() - start) / ROUNDS, result
+
+
+def main():
+    with open(FIXTURE, encoding="utf-8") as f:
+        text = re.sub(r"<[^>]+>", " ", f.read())
+
+    build_start = time.perf_counter()
+    matcher = EntityMatcher(EventProcessor.DISEASE_KEYWORDS, EventProcessor.COUNTRIES)
+    build_time = time.perf_counter() - build_start
+
+    legacy_time, legacy = timed(legacy_match, text)
+    compiled_time, compiled = timed(matcher.match, text)
+
+    print(f"Fixture: {FIXTURE} ({len(text):,} chars of text)")
+    print(f"Matcher build:   {build_time * 1000:8.2f} ms (once per process)")
+    print(f"Legacy loop:     {legacy_time * 1000:8.2f} ms/scan")
+    print(f"Compiled single: {compiled_time * 1000:8.2f} ms/scan ({legacy_time / compiled_time:.1f}x)")
+    print(f"Diseases: {sorted(compiled[0])}")
+    print(f"Countries: {sorted(compiled[1])}")
+
+    # The legacy loop also reports names nested inside longer ones
+    # ("Sudan" inside "South Sudan"); the matcher keeps the longest match.
+    only_legacy = set(legacy[1]) - set(compiled[1])
+    if set(legacy[0]) != set(compiled[0]) or only_legacy:
+        print(f"Differences vs legacy: diseases={set(legacy[0]) ^ set(compiled[0])} countries={only_legacy}")
+
+
+if __name__ == "__main__":
+    main()
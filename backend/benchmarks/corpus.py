@@ -0,0 +1,107 @@
+"""
+Deterministic synthetic WHO DON corpora for the offline benchmarks.
+"""
+import html
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from processor import EventProcessor
+
+MONTH_NAMES = ["January", "February", "March", "April", "May", "June", "July",
+               "August", "September", "October", "November", "December"]
+
+SUMMARY_TEMPLATES = [
+    "On {date}, the Ministry of Health of {country} notified WHO of {cases} cases of {disease}, "
+    "including {deaths} deaths. Investigations are ongoing in affected districts.",
+    "Between epidemiological weeks 1 and {week}, {cases} suspected {disease} cases were reported in {country}. "
+    "WHO assesses the national risk as high and the regional risk as moderate.",
+    "{country} reported a cluster of {disease} infections linked to a single event. "
+    "Contact tracing identified {cases} contacts; {deaths} have died.",
+    "This is an update on the {disease} situation in {country} and {other}. "
+    "Cumulatively, {cases} cases and {deaths} deaths have been recorded.",
+]
+
+# Same markup as a server-rendered item of the WHO DON index list
+INDEX_ITEM = ('<a class="sf-list-vertical__item" href="{url}">'
+              '<div class="sf-list-vertical__inner"><h4 class="sf-list-vertical__title">'
+              '<span class="full-title">{title}</span><span>{date} | </span>'
+              '<span class="trimmed">{title}</span></h4></div></a>')
+
+
+def make_dons(n: int, days: int = 365, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    n DONs shaped like items of the WHO API `value` array, newest first,
+    with publication dates spread over the last `days` days.
+    """
+    rng = random.Random(seed)
+    diseases = list(EventProcessor.DISEASE_KEYWORDS)
+    countries = EventProcessor.COUNTRIES
+    now = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    dons = []
+    for i in range(n):
+        disease = diseases[rng.randrange(len(diseases))]
+        alias = rng.choice(EventProcessor.DISEASE_KEYWORDS[disease])
+        country, other = rng.sample(countries, 2)
+        published = now - timedelta(days=rng.randrange(days), hours=rng.randrange(24))
+        summary = rng.choice(SUMMARY_TEMPLATES).format(
+            date=f"{published.day} {MONTH_NAMES[published.month - 1]} {published.year}",
+            country=country, other=other, disease=alias,
+            cases=rng.randrange(1, 5000), deaths=rng.randrange(0, 200), week=rng.randrange(2, 52),
+        )
+        dons.append({
+            "Id": f"synthetic-{seed}-{i}",
+            "Title": f"{disease} - {country}",
+            "Summary": summary,
+            "ItemDefaultUrl": f"/emergencies/disease-outbreak-news/item/{published.year}-DON{i}",
+            "PublicationDate": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        })
+    dons.sort(key=lambda d: d["PublicationDate"], reverse=True)
+    return dons
+
+
+# A DON item page: site furniture around the article sections
+ITEM_PAGE = ('<!DOCTYPE html><html><head><title>{title}</title><script>window.dataLayer = [];</script></head><body>'
+             '<header class="sf-header"><nav><a href="/">Home</a><a href="/news">Newsroom</a></nav></header>'
+             '<div class="sf-breadcrumb"><a href="/emergencies">Emergencies</a> / Disease Outbreak News</div>'
+             '<main><article class="sf-detail-body-wrapper"><h1>{title}</h1><p>{date}</p>{sections}</article>'
+             '<aside class="related-links"><h3>Related</h3><ul><li><a href="/x">Fact sheet</a></li></ul></aside></main>'
+             '<div class="social-share"><a href="#">Share on X</a></div>'
+             '<footer><p>&copy; World Health Organization. All rights reserved.</p></footer></body></html>')
+
+ITEM_SECTIONS = [
+    ("Situation at a glance", "{summary}"),
+    ("Description of the situation",
+     "The Ministry of Health of {country} is investigating the {disease} cases with support from WHO. "
+     "Samples were sent to the national reference laboratory and sequencing is under way. "
+     "Most cases were reported from rural districts with limited access to health services."),
+    ("Public health response",
+     "National authorities have activated an incident management system, enhanced surveillance and "
+     "contact tracing, and deployed rapid response teams to the affected areas."),
+    ("WHO risk assessment",
+     "WHO assesses the overall public health risk posed by {disease} as moderate at the national level "
+     "and low at the regional and global levels."),
+]
+
+
+def render_item_html(don: Dict[str, Any]) -> str:
+    """The page behind a DON's ItemDefaultUrl, with its summary as the first section."""
+    disease, country = don["Title"].split(" - ", 1)
+    fields = {"summary": don["Summary"], "disease": disease, "country": country}
+    sections = "".join(f"<h2>{heading}</h2><p>{html.escape(text.format(**fields))}</p>"
+                       for heading, text in ITEM_SECTIONS)
+    return ITEM_PAGE.format(title=html.escape(don["Title"]), date=don["PublicationDate"][:10], sections=sections)
+
+
+def render_index_html(dons: List[Dict[str, Any]]) -> str:
+    """A DON index page listing the given DONs, as _parse_html expects it."""
+    items = []
+    for d in dons:
+        published = datetime.strptime(d["PublicationDate"], "%Y-%m-%dT%H:%M:%SZ")
+        items.append(INDEX_ITEM.format(
+            url=d["ItemDefaultUrl"],
+            title=html.escape(d["Title"]),
+            date=f"{published.day} {MONTH_NAMES[published.month - 1]} {published.year}",
+        ))
+    return ("<!DOCTYPE html><html><head><title>Disease Outbreak News</title></head><body>"
+            '<div class="sf-list-vertical emergency">' + "".join(items) + "</div></body></html>")
@@ -0,0 +1,347 @@
+"""
+Offline stand-ins for external services, used by the benchmark scripts.
+"""
+import json
+import re
+import hashlib
+import time
+import uuid
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from matcher import EntityMatcher
+from processor import EventProcessor
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Deterministic stand-in for genai.GenerativeModel.
+    Answers both the single-item and the batched extraction prompts using
+    the regex matcher, after an optional simulated network latency.
+    """
+    ITEM_RE = re.compile(r'Item ID: (?P<id>\S+)\nText: "(?P<text>.*?)"\n', re.S)
+    TEXT_RE = re.compile(r'Text: "(?P<text>.*?)"\n', re.S)
+
+    def __init__(self, latency: float = 0.0, malformed_ids: Optional[Set[str]] = None):
+        self.latency = latency
+        self.malformed_ids = malformed_ids or set()
+        self.calls = 0
+        self.matcher = EntityMatcher(EventProcessor.DISEASE_KEYWORDS, EventProcessor.COUNTRIES)
+
+    def _extract(self, text: str) -> Dict[str, Any]:
+        diseases, locations = self.matcher.match(text)
+        return {
+            "diseases": sorted(diseases),
+            "locations": sorted(locations),
+            "assessment": "Stub assessment",
+            "confidence": 0.9 if diseases else 0.4,
+        }
+
+    def generate_content(self, prompt: str, request_options: Optional[Dict[str, Any]] = None) -> FakeResponse:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        items = list(self.ITEM_RE.finditer(prompt))
+        if not items:
+            match = self.TEXT_RE.search(prompt)
+            return FakeResponse(json.dumps(self._extract(match.group("text") if match else "")))
+
+        results: List[Any] = []
+        for m in items:
+            if m.group("id") in self.malformed_ids:
+                results.append({"id": m.group("id"), "diseases": "not-a-list"})
+                continue
+            results.append({"id": m.group("id"), **self._extract(m.group("text"))})
+        return FakeResponse("```json\n" + json.dumps(results) + "\n```")
+
+
+class FakeAPIResponse:
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+
+
+class FakeQuery:
+    """Chainable query builder mimicking the subset of postgrest-py we use."""
+
+    def __init__(self, client: "FakeSupabaseClient", table: str):
+        self.client = client
+        self.table = table
+        self.action = "select"
+        self.columns: Optional[List[str]] = None
+        self.payload: Any = None
+        self.on_conflict: Optional[List[str]] = None
+        self.ignore_duplicates = False
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.order_by: Optional[tuple] = None
+        self.row_limit: Optional[int] = None
+        self.row_offset = 0
+
+    # Actions
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "FakeQuery":
+        self.action = "select"
+        if columns.strip() != "*":
+            self.columns = [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, data: Any) -> "FakeQuery":
+        self.action, self.payload = "insert", data
+        return self
+
+    def upsert(self, data: Any, on_conflict: str = "id", ignore_duplicates: bool = False) -> "FakeQuery":
+        self.action, self.payload = "upsert", data
+        self.on_conflict = [c.strip() for c in on_conflict.split(",")]
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, data: Dict[str, Any]) -> "FakeQuery":
+        self.action, self.payload = "update", data
+        return self
+
+    def delete(self) -> "FakeQuery":
+        self.action = "delete"
+        return self
+
+    # Filters
+    def eq(self, col: str, val: Any) -> "FakeQuery":
+        self.filters.append(lambda r: r.get(col) == val)
+        return self
+
+    def in_(self, col: str, vals: List[Any]) -> "FakeQuery":
+        allowed = set(vals)
+        self.filters.append(lambda r: r.get(col) in allowed)
+        return self
+
+    def gt(self, col: str, val: Any) -> "FakeQuery":
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) > val)
+        return self
+
+    def gte(self, col: str, val: Any) -> "FakeQuery":
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) >= val)
+        return self
+
+    def lt(self, col: str, val: Any) -> "FakeQuery":
+        self.filters.append(lambda r: r.get(col) is not None and r.get(col) < val)
+        return self
+
+    def order(self, col: str, desc: bool = False) -> "FakeQuery":
+        self.order_by = (col, desc)
+        return self
+
+    def limit(self, n: int) -> "FakeQuery":
+        self.row_limit = n
+        return self
+
+    def range(self, start: int, end: int) -> "FakeQuery":
+        self.row_offset, self.row_limit = start, end - start + 1
+        return self
+
+    def execute(self) -> FakeAPIResponse:
+        return self.client._execute(self)
+
+
+class FakeSupabaseClient:
+    """
+    In-memory PostgREST stand-in for SupabaseClient.client.
+    Counts every executed request so round trips can be compared.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.functions: Dict[str, Callable[..., List[Dict[str, Any]]]] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        # (table, conflict columns) -> {key: row}; keeps upserts O(1) on large tables
+        self._indexes: Dict[Tuple[str, Tuple[str, ...]], Dict[tuple, Dict[str, Any]]] = {}
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> "FakeRPC":
+        return FakeRPC(self, name, params or {})
+
+    def _new_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = dict(row)
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        return row
+
+    def _index(self, table: str, cols: Tuple[str, ...]) -> Dict[tuple, Dict[str, Any]]:
+        index = self._indexes.get((table, cols))
+        if index is None:
+            index = {tuple(r.get(c) for c in cols): r for r in self.tables.get(table, [])}
+            self._indexes[(table, cols)] = index
+        return index
+
+    def _add_rows(self, table: str, new_rows: List[Dict[str, Any]]):
+        self.tables.setdefault(table, []).extend(new_rows)
+        for (t, cols), index in self._indexes.items():
+            if t == table:
+                for r in new_rows:
+                    index[tuple(r.get(c) for c in cols)] = r
+
+    def _drop_indexes(self, table: str):
+        for key in [k for k in self._indexes if k[0] == table]:
+            del self._indexes[key]
+
+    def _execute(self, q: FakeQuery) -> FakeAPIResponse:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            rows = self.tables.setdefault(q.table, [])
+            payload = q.payload if isinstance(q.payload, list) else [q.payload]
+
+            if q.action == "insert":
+                created = [self._new_row(r) for r in payload]
+                self._add_rows(q.table, created)
+                return FakeAPIResponse([dict(r) for r in created])
+
+            if q.action == "upsert":
+                cols = tuple(q.on_conflict)
+                index = self._index(q.table, cols)
+                result = []
+                for r in payload:
+                    match = index.get(tuple(r.get(c) for c in cols))
+                    if match is not None:
+                        if not q.ignore_duplicates:
+                            match.update(r)
+                            result.append(dict(match))
+                    else:
+                        created = self._new_row(r)
+                        self._add_rows(q.table, [created])
+                        result.append(dict(created))
+                return FakeAPIResponse(result)
+
+            selected = [r for r in rows if all(f(r) for f in q.filters)]
+
+            if q.action == "update":
+                for r in selected:
+                    r.update(q.payload)
+                self._drop_indexes(q.table)
+                return FakeAPIResponse([dict(r) for r in selected])
+
+            if q.action == "delete":
+                removed = {id(r) for r in selected}
+                self.tables[q.table] = [r for r in rows if id(r) not in removed]
+                self._drop_indexes(q.table)
+                return FakeAPIResponse([dict(r) for r in selected])
+
+            if q.order_by:
+                col, desc = q.order_by
+                selected = sorted(selected, key=lambda r: (r.get(col) is None, r.get(col)), reverse=desc)
+            if q.row_limit is not None:
+                selected = selected[q.row_offset:q.row_offset + q.row_limit]
+            if q.columns:
+                return FakeAPIResponse([{c: r.get(c) for c in q.columns} for r in selected])
+            return FakeAPIResponse([dict(r) for r in selected])
+
+
+class FakeRPC:
+    def __init__(self, client: FakeSupabaseClient, name: str, params: Dict[str, Any]):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self) -> FakeAPIResponse:
+        with self.client._lock:
+            self.client.requests += 1
+            tables = self.client.tables
+        return FakeAPIResponse(self.client.functions[self.name](tables, **self.params))
+
+
+def _event_days(tables: Dict[str, List[Dict[str, Any]]], lookback_days: int) -> Dict[str, str]:
+    """{normalized event id: UTC day} for events inside the lookback window, as the SQL functions date them."""
+    first_day = (datetime.now(timezone.utc).date() - timedelta(days=lookback_days - 1)).isoformat()
+    published = {r["id"]: r.get("published_at") for r in tables.get("raw_events", [])}
+    days = {}
+    for n in tables.get("normalized_events", []):
+        ts = n.get("event_timestamp") or published.get(n.get("raw_event_id")) or n.get("created_at")
+        day = ts[:10] if ts else None
+        if day and day >= first_day:
+            days[n["id"]] = day
+    return days
+
+
+def daily_event_counts(tables: Dict[str, List[Dict[str, Any]]], lookback_days: int = 30) -> List[Dict[str, Any]]:
+    """Python twin of the daily_event_counts SQL function."""
+    today = datetime.now(timezone.utc).date()
+    counts: Dict[str, int] = {}
+    for day in _event_days(tables, lookback_days).values():
+        counts[day] = counts.get(day, 0) + 1
+    window = [(today - timedelta(days=offset)).isoformat() for offset in range(lookback_days - 1, -1, -1)]
+    return [{"day": day, "event_count": counts.get(day, 0)} for day in window]
+
+
+def series_daily_counts(tables: Dict[str, List[Dict[str, Any]]], lookback_days: int = 90,
+                        page_offset: int = 0, page_limit: int = 1000) -> List[Dict[str, Any]]:
+    """Python twin of the series_daily_counts SQL function."""
+    days = _event_days(tables, lookback_days)
+    # (series, day) -> {event_id: largest case count among its rows}
+    events: Dict[Tuple[str, str], Dict[str, int]] = {}
+    mentions = [("disease:", "disease_name", r) for r in tables.get("disease_mentions", [])]
+    mentions += [("country:", "country", r) for r in tables.get("location_mentions", [])]
+    for prefix, column, r in mentions:
+        day = days.get(r.get("event_id"))
+        if day and r.get(column) is not None:
+            cases = events.setdefault((prefix + r[column], day), {})
+            cases[r["event_id"]] = max(cases.get(r["event_id"], 0), r.get("case_count") or 0)
+    rows = [{"series_key": k, "day": d, "event_count": len(cases), "case_count": sum(cases.values())}
+            for (k, d), cases in sorted(events.items())]
+    return rows[page_offset:page_offset + page_limit]
+
+
+ANALYTICS_FUNCTIONS = {
+    "daily_event_counts": daily_event_counts,
+    "series_daily_counts": series_daily_counts,
+}
+
+
+class FakeHTTPResponse:
+    def __init__(self, status_code: int, text: str, headers: Optional[Dict[str, str]] = None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+class FakeWHOSession:
+    """
+    Stand-in for the pooled requests.Session used by CachedFetcher.
+    Serves a fixed DON corpus through the API's $top/$skip paging, item
+    pages (by URL path, with ETags and 304s) and the index page as HTML,
+    after an optional simulated network latency.
+    """
+
+    def __init__(self, dons: List[Dict[str, Any]], index_html: str = "", latency: float = 0.0,
+                 pages: Optional[Dict[str, str]] = None):
+        self.dons = dons
+        self.index_html = index_html
+        self.latency = latency
+        self.pages = pages or {}
+        self.requests = 0
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None,
+            timeout: Optional[float] = None) -> FakeHTTPResponse:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        page = self.pages.get(urlsplit(url).path)
+        if page is not None:
+            etag = f'"{hashlib.md5(page.encode("utf-8")).hexdigest()}"'
+            if (headers or {}).get("If-None-Match") == etag:
+                return FakeHTTPResponse(304, "", {"ETag": etag})
+            return FakeHTTPResponse(200, page, {"ETag": etag})
+        if "/api/" not in url:
+            return FakeHTTPResponse(200, self.index_html)
+        params = params or {}
+        top = int(params.get("$top", 100))
+        skip = int(params.get("$skip", 0))
+        return FakeHTTPResponse(200, json.dumps({"value": self.dons[skip:skip + top]}))
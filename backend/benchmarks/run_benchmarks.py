@@ -0,0 +1,278 @@
+"""
+Offline benchmark suite for the backend hot paths.
+
+Runs against FakeSupabaseClient, FakeGenerativeModel and FakeWHOSession,
+so no network, API key or database is needed. Every benchmark runs on a
+synthetic DON corpus of each requested size:
+
+    parse_html        WHODonIngestor._parse_html on a rendered index page
+    process           EventProcessor.process, one call per event
+    ingest_run        WHODonIngestor.run end to end (full mode, item pages included)
+    detect_anomalies  IntelligenceAnalyzer.detect_anomalies (+ series detector)
+
+Results are written as JSON (default: benchmarks/results/<commit>.json)
+so runs can be compared across commits with --compare.
+
+Usage (from backend/):
+    python benchmarks/run_benchmarks.py [--sizes 100,10000,100000] [--repeat 3]
+        [--llm-latency 0.0] [--db-latency 0.0] [--only parse_html,process]
+        [--output results.json] [--compare benchmarks/results/<commit>.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "ingestion"))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+from db_client import SupabaseClient
+from http_client import CachedFetcher
+from processor import EventProcessor
+from dedup import NearDuplicateIndex, figures
+from enrichment import ArticleEnricher, BodyCache
+from notifier import Notifier
+from who_dons import WHODonIngestor
+from fakes import ANALYTICS_FUNCTIONS, FakeGenerativeModel, FakeSupabaseClient, FakeWHOSession
+from corpus import make_dons, render_index_html, render_item_html
+from scratch import use_scratch_caches
+
+# Guarantee that nothing below can reach a live service or a shared cache
+SCRATCH_DIR = use_scratch_caches()
+
+# Every Nth DON of an ingest run was already reported by another source
+SYNDICATED_EVERY = 10
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+BENCHMARKS = ("parse_html", "process", "ingest_run", "detect_anomalies")
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the pipeline's progress output while timing."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def measure(setup, fn, repeat):
+    """Time fn(setup()) `repeat` times; setup is not timed."""
+    runs = []
+    result = None
+    for _ in range(repeat):
+        state = setup()
+        with quiet():
+            start = time.perf_counter()
+            result = fn(state)
+            runs.append(time.perf_counter() - start)
+    return runs, result
+
+
+def summarize(runs, items, **extra):
+    best = min(runs)
+    return {
+        "items": items,
+        "best_s": round(best, 6),
+        "median_s": round(statistics.median(runs), 6),
+        "runs_s": [round(r, 6) for r in runs],
+        "items_per_s": round(items / best, 1) if best > 0 else None,
+        **extra,
+    }
+
+
+def make_ingestor(dons, args):
+    """
+    A full-mode WHODonIngestor wired to the in-memory fakes, with a dedup
+    index holding another source's copies of every SYNDICATED_EVERY-th DON.
+    """
+    dedup = NearDuplicateIndex(path=os.path.join(tempfile.mkdtemp(dir=SCRATCH_DIR), "dedup.sqlite"))
+    texts = [(d, f"{d['Title']} {d['Summary']}") for d in dons[::SYNDICATED_EVERY]]
+    dedup.add_many((f"syndication:{d['Id']}", dedup.signature(text), f"syndicated-{d['Id']}", figures(text))
+                   for d, text in texts)
+    with quiet():
+        ingestor = WHODonIngestor(incremental=False, concurrency=args.workers,
+                                  max_pages=len(dons) // WHODonIngestor.PAGE_SIZE + 1, dedup=dedup)
+        ingestor.processor = EventProcessor(model=FakeGenerativeModel(latency=args.llm_latency), use_cache=False)
+    session = FakeWHOSession(dons, pages={d["ItemDefaultUrl"]: render_item_html(d) for d in dons})
+    fake_db = FakeSupabaseClient(latency=args.db_latency)
+    fake_db.functions.update(ANALYTICS_FUNCTIONS)
+    ingestor.http = CachedFetcher(headers=ingestor.HEADERS, cache_dir=tempfile.mkdtemp(dir=SCRATCH_DIR),
+                                  session=session, defer_validators=True)
+    ingestor.db = SupabaseClient(client=fake_db)
+    # Item pages come from the fake too, without the per-host rate limit
+    ingestor.enricher = ArticleEnricher(session=session, headers=ingestor.HEADERS, host_rpm=None,
+                                        cache=BodyCache(os.path.join(tempfile.mkdtemp(dir=SCRATCH_DIR), "bodies.sqlite")))
+    return ingestor, session, fake_db
+
+
+def bench_parse_html(dons, args):
+    html = render_index_html(dons)
+    with quiet():
+        ingestor = WHODonIngestor(dry_run=True)
+    runs, events = measure(lambda: html, lambda h: list(ingestor._parse_html(h)), args.repeat)
+    assert len(events) == len(dons), f"Parsed {len(events)} of {len(dons)} index items"
+    return summarize(runs, len(dons), html_bytes=len(html))
+
+
+def bench_process(dons, args):
+    raw_events = [{"id": d["Id"], "title": d["Title"], "content": d["Summary"]} for d in dons]
+
+    def setup():
+        model = FakeGenerativeModel(latency=args.llm_latency)
+        with quiet():
+            return EventProcessor(model=model, use_cache=False), model
+
+    def run(state):
+        processor, model = state
+        for e in raw_events:
+            processor.process(e, source_tier=1)
+        return model.calls
+
+    runs, llm_calls = measure(setup, run, args.repeat)
+    return summarize(runs, len(dons), llm_calls=llm_calls)
+
+
+def bench_ingest_run(dons, args):
+    def run(state):
+        ingestor, session, fake_db = state
+        ingestor.run()
+        return ingestor, session, fake_db
+
+    runs, (ingestor, session, fake_db) = measure(lambda: make_ingestor(dons, args), run, args.repeat)
+    handled = ingestor.stats["stored"] + ingestor.stats["duplicates"]
+    assert handled == len(dons), f"Stored or linked {handled} of {len(dons)} events"
+    # Only the syndicated DONs may be linked; every other DON is distinct and must be extracted
+    linked = {r["external_id"] for r in fake_db.tables.get("raw_events", []) if r.get("duplicate_of")}
+    syndicated = {str(d["Id"]) for d in dons[::SYNDICATED_EVERY]}
+    assert linked == syndicated, (f"Linked {len(linked - syndicated)} distinct DONs, "
+                                  f"missed {len(syndicated - linked)} syndicated copies")
+    result = summarize(runs, len(dons), http_requests=session.requests, db_requests=fake_db.requests,
+                       llm_calls=ingestor.processor.model.calls, duplicates=ingestor.stats["duplicates"])
+    # A second run over the same database re-extracts every DON; each must keep one normalized event
+    rerun, _, _ = make_ingestor(dons, args)
+    rerun.db = ingestor.db
+    with quiet():
+        rerun.run()
+    normalized = len(fake_db.tables["normalized_events"])
+    assert normalized == ingestor.stats["stored"], f"{normalized} normalized events for {ingestor.stats['stored']} DONs"
+    # A cold index warmed from the stored (enriched) events must match another source's copy of each
+    cold = NearDuplicateIndex(path=os.path.join(tempfile.mkdtemp(dir=SCRATCH_DIR), "dedup.sqlite"))
+    cold.warm_from_db(ingestor.db, days=100 * 365)
+    texts = [f"{d['Title']} {d['Summary']}" for d in dons if str(d["Id"]) not in syndicated]
+    matched = sum(1 for text in texts if cold.query(cold.signature(text), figures(text), exclude_source="copies"))
+    assert matched == len(texts), f"Warmed index matched {matched} of {len(texts)} copies"
+    return result
+
+
+def bench_detect_anomalies(dons, args):
+    # Imported here: the analyzer pulls in numpy via the anomaly engine
+    from analyzer import IntelligenceAnalyzer
+
+    # Seed the store through the real pipeline once, then time detection only
+    ingestor, _, fake_db = make_ingestor(dons, args)
+    with quiet():
+        ingestor.run()
+        analyzer = IntelligenceAnalyzer()
+    analyzer.db = SupabaseClient(client=fake_db)
+    analyzer.notifier = Notifier(db=analyzer.db)
+
+    def run(_):
+        before = fake_db.requests
+        anomalies = analyzer.detect_anomalies() + analyzer.detect_series_anomalies()
+        return len(anomalies), fake_db.requests - before
+
+    runs, (anomalies, db_requests) = measure(lambda: None, run, args.repeat)
+    with quiet():
+        analyzer.notifier.close()
+    return summarize(runs, len(dons), anomalies=anomalies, db_requests=db_requests)
+
+
+RUNNERS = {
+    "parse_html": bench_parse_html,
+    "process": bench_process,
+    "ingest_run": bench_ingest_run,
+    "detect_anomalies": bench_detect_anomalies,
+}
+
+
+def git_revision():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline.get('commit', '?')} ({baseline_path}):")
+    for size, benches in results["results"].items():
+        for name, current in benches.items():
+            before = baseline.get("results", {}).get(size, {}).get(name)
+            if not before:
+                continue
+            ratio = before["best_s"] / current["best_s"] if current["best_s"] else float("inf")
+            print(f"  {name:18s} n={size:>7s}  {before['best_s']:9.4f}s -> {current['best_s']:9.4f}s  "
+                  f"({ratio:.2f}x {'faster' if ratio >= 1 else 'slower'})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the ingestion and analysis hot paths.")
+    parser.add_argument("--sizes", default="100,10000,100000", help="Comma-separated corpus sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark (best and median reported)")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="Comma-separated benchmarks to run")
+    parser.add_argument("--workers", type=int, default=4, help="Extraction workers for ingest_run")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per LLM call")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="Simulated seconds per database request")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    parser.add_argument("--output", default=None, help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    selected = [b.strip() for b in args.only.split(",") if b.strip()]
+    unknown = set(selected) - set(RUNNERS)
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    commit = git_revision()
+    results = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": {},
+    }
+
+    for size in sizes:
+        dons = make_dons(size, seed=args.seed)
+        for name in selected:
+            result = RUNNERS[name](dons, args)
+            results["results"].setdefault(str(size), {})[name] = result
+            print(f"{name:18s} n={size:>7d}  best {result['best_s']:9.4f}s  "
+                  f"median {result['median_s']:9.4f}s  ({result['items_per_s']} items/s)")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
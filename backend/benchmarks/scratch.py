@@ -0,0 +1,30 @@
+"""
+Isolation for the offline benchmarks: every on-disk cache (HTTP
+responses, extraction results, dedup and gazetteer indexes, article
+bodies, the alert outbox) is pointed at a throwaway directory and
+live-service credentials are unset, so a benchmark never reads or writes
+backend/.cache or reaches Supabase or Gemini.
+"""
+import os
+import tempfile
+
+# Cache location variables and their file names inside the scratch directory
+CACHE_PATHS = {
+    "HTTP_CACHE_DIR": "http",
+    "EXTRACTION_CACHE_PATH": "extraction.sqlite",
+    "DEDUP_INDEX_PATH": "dedup.sqlite",
+    "GAZETTEER_INDEX_PATH": "gazetteer.idx",
+    "ARTICLE_CACHE_PATH": "article_bodies.sqlite",
+    "ALERT_OUTBOX_PATH": "alert_outbox.sqlite",
+}
+LIVE_SERVICE_VARS = ("SUPABASE_URL", "SUPABASE_KEY", "GEMINI_API_KEY", "ALERT_FILE")
+
+
+def use_scratch_caches() -> str:
+    """Point the caches at a new temp directory (read when each cache opens) and return it."""
+    for var in LIVE_SERVICE_VARS:
+        os.environ.pop(var, None)
+    scratch_dir = tempfile.mkdtemp(prefix="outbreak-bench-")
+    for var, name in CACHE_PATHS.items():
+        os.environ[var] = os.path.join(scratch_dir, name)
+    return scratch_dir
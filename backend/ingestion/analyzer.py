@@ -1,41 +1,53 @@
 import os
 import math
-from datetime import datetime, timedelta
-from db_client import SupabaseClient
-from ingestion.notifier import Notifier
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+from db_client import get_db
+from notifier import Notifier
+from anomaly_engine import AnomalyEngine, build_count_matrix
+from metrics import metrics
 
 class IntelligenceAnalyzer:
+    SERIES_PAGE_SIZE = 1000
+    # Reported cases below this never make a case-volume spike
+    CASE_MIN_COUNT = 10
+
     def __init__(self):
-        self.db = SupabaseClient()
-        self.notifier = Notifier()
+        self.db = get_db()
+        self.notifier = Notifier(db=self.db)
+        self.engine = AnomalyEngine()
+        self.case_engine = AnomalyEngine(min_count=self.CASE_MIN_COUNT)
+
+    @staticmethod
+    def _window_days(lookback_days: int) -> List[str]:
+        """ISO dates (UTC) of the lookback window, oldest first, ending today."""
+        today = datetime.now(timezone.utc).date()
+        return [(today - timedelta(days=offset)).isoformat() for offset in range(lookback_days - 1, -1, -1)]
+
+    def _daily_counts(self, lookback_days: int) -> Dict[str, int]:
+        """
+        Fetch per-day event counts from the `daily_event_counts` RPC.
+        Days with no events are filled with zero so they count towards
+        the mean and standard deviation.
+        """
+        response = self.db.execute(self.db.client.rpc("daily_event_counts", {"lookback_days": lookback_days}))
+        counts = {row["day"][:10]: int(row["event_count"]) for row in response.data or []}
 
+        return {day: counts.get(day, 0) for day in self._window_days(lookback_days)}
+
+    @metrics.timed("anomaly_detection")
     def detect_anomalies(self, lookback_days=30):
         """
         Detects anomalies by comparing signal frequency in the last 24h 
         against the average frequency of the lookback period.
         """
-        # 1. Fetch historical counts by day
-        # In a real app, this would be a GROUP BY query on published_at
-        # For now, we'll fetch all events in range and aggregate in Python
-        cutoff = (datetime.now() - timedelta(days=lookback_days)).isoformat()
-        
         try:
-            response = self.db.client.table("normalized_events") \
-                .select("id, published_at, classification") \
-                .gt("published_at", cutoff) \
-                .execute()
-            
-            events = response.data
-            if not events:
+            # 1. Fetch daily counts (aggregated server-side, zero-filled)
+            daily_counts = self._daily_counts(lookback_days)
+            if not any(daily_counts.values()):
                 return []
 
-            # 2. Aggregate counts by day
-            daily_counts = {}
-            for event in events:
-                date_str = event['published_at'][:10] # YYYY-MM-DD
-                daily_counts[date_str] = daily_counts.get(date_str, 0) + 1
-
-            # 3. Calculate Mean and Standard Deviation
+            # 2. Calculate Mean and Standard Deviation
             counts = list(daily_counts.values())
             if len(counts) < 2:
                 return []
@@ -44,8 +56,8 @@ class IntelligenceAnalyzer:
             variance = sum((x - mean) ** 2 for x in counts) / len(counts)
             std_dev = math.sqrt(variance)
 
-            # 4. Check if today's count is an anomaly (Z-score > 2)
-            today_str = datetime.now().isoformat()[:10]
+            # 3. Check if today's count is an anomaly (Z-score > 2)
+            today_str = datetime.now(timezone.utc).date().isoformat()
             today_count = daily_counts.get(today_str, 0)
             
             z_score = (today_count - mean) / std_dev if std_dev > 0 else 0
@@ -59,17 +71,73 @@ class IntelligenceAnalyzer:
                     "timestamp": datetime.now().isoformat()
                 }
                 results.append(anomaly)
-                # Send alert immediately
+                # Queued; the outbox delivers it in bulk
                 self.notifier.send_alert("anomaly_volume", anomaly["severity"], anomaly["message"])
 
             return results
 
         except Exception as e:
+            metrics.count("anomaly_detection_failures")
             print(f"Analysis Error: {e}")
             return []
 
+    def _series_counts(self, lookback_days: int) -> List[Tuple[str, str, int, int]]:
+        """
+        Fetch sparse (series_key, day, event count, case count) rows from the
+        `series_daily_counts` RPC, page by page.
+        """
+        rows = []
+        offset = 0
+        while True:
+            response = self.db.execute(self.db.client.rpc("series_daily_counts", {
+                "lookback_days": lookback_days,
+                "page_offset": offset,
+                "page_limit": self.SERIES_PAGE_SIZE
+            }))
+            page = response.data or []
+            rows.extend((r["series_key"], r["day"], int(r["event_count"]), int(r.get("case_count") or 0))
+                        for r in page)
+            if len(page) < self.SERIES_PAGE_SIZE:
+                return rows
+            offset += self.SERIES_PAGE_SIZE
+
+    @metrics.timed("anomaly_detection")
+    def detect_series_anomalies(self, lookback_days=90):
+        """
+        Detects spikes per disease and per country by running the vectorized
+        AnomalyEngine (z-score, EWMA, CUSUM, count threshold) over every
+        series, both in event volume and in reported case volume.
+        """
+        try:
+            rows = self._series_counts(lookback_days)
+            days = self._window_days(lookback_days)
+            keys, matrix = build_count_matrix(((k, day, events) for k, day, events, _ in rows), days)
+            # Only series that reported cases somewhere in the window
+            case_keys, case_matrix = build_count_matrix(((f"cases:{k}", day, cases) for k, day, _, cases in rows
+                                                         if cases), days)
+            anomalies = []
+            for alert_type, unit, found in (
+                    ("anomaly_volume", "events", self.engine.evaluate(keys, matrix)),
+                    ("anomaly_cases", "cases", self.case_engine.evaluate(case_keys, case_matrix))):
+                for a in found:
+                    a["type"] = "series_spike"
+                    a["message"] = (f"Spike in {a['series_key']}: {a['today_count']} {unit} today "
+                                    f"vs {a['baseline_mean']:.1f}/day baseline "
+                                    f"(Z-score: {a['zscore']:.2f}, detectors: {', '.join(a['detectors'])})")
+                    a["timestamp"] = datetime.now().isoformat()
+                    self.notifier.send_alert(alert_type, a["severity"], a["message"], series_key=a["series_key"])
+                anomalies.extend(found)
+
+            return anomalies
+
+        except Exception as e:
+            metrics.count("anomaly_detection_failures")
+            print(f"Series Analysis Error: {e}")
+            return []
+
 if __name__ == "__main__":
     analyzer = IntelligenceAnalyzer()
-    anomalies = analyzer.detect_anomalies()
+    anomalies = analyzer.detect_anomalies() + analyzer.detect_series_anomalies()
+    analyzer.notifier.close()
     for a in anomalies:
         print(f"[{a['severity'].upper()}] {a['message']}")
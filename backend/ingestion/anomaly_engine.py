@@ -0,0 +1,151 @@
+import math
+import numpy as np
+from typing import Dict, Any, Iterable, List, Tuple
+
+
+def build_count_matrix(rows: Iterable[Tuple[str, str, int]], days: List[str]) -> Tuple[List[str], np.ndarray]:
+    """
+    Builds a (series x day) count matrix from sparse (series_key, day, count)
+    rows. Days missing for a series are zero.
+    """
+    day_index = {day: i for i, day in enumerate(days)}
+    keys: List[str] = []
+    key_index: Dict[str, int] = {}
+    row_idx, col_idx, values = [], [], []
+    for key, day, count in rows:
+        col = day_index.get(day[:10])
+        if col is None:
+            continue
+        if key not in key_index:
+            key_index[key] = len(keys)
+            keys.append(key)
+        row_idx.append(key_index[key])
+        col_idx.append(col)
+        values.append(count)
+
+    matrix = np.zeros((len(keys), len(days)), dtype=np.float64)
+    if values:
+        np.add.at(matrix, (np.array(row_idx), np.array(col_idx)), np.array(values, dtype=np.float64))
+    return keys, matrix
+
+
+# Counts above this (case volumes run into the thousands) take the normal
+# approximation; the exact sum costs one pass over every series per unit of x
+EXACT_TAIL_MAX = 500
+
+_erfc = np.vectorize(math.erfc, otypes=[np.float64])
+
+
+def _poisson_upper_tail(x: np.ndarray, mu: np.ndarray) -> np.ndarray:
+    """P(X >= x) for X ~ Poisson(mu), computed in log space for every series at once."""
+    x = x.astype(np.int64)
+    mu = np.maximum(mu, 1e-9)
+    exact = x <= EXACT_TAIL_MAX
+    log_mu = np.log(mu)
+    log_pmf = -mu                      # log P(X = 0)
+    log_cdf = np.where(x > 0, log_pmf, -np.inf)  # log P(X <= x - 1), accumulated below
+    for k in range(1, int(x[exact].max(initial=0))):
+        log_pmf = log_pmf + log_mu - np.log(k)
+        log_cdf = np.where(k < x, np.logaddexp(log_cdf, log_pmf), log_cdf)
+    tail = np.clip(1.0 - np.exp(log_cdf), 0.0, 1.0)
+    if not exact.all():
+        # With continuity correction
+        z = (x[~exact] - 0.5 - mu[~exact]) / np.sqrt(mu[~exact])
+        tail[~exact] = 0.5 * _erfc(z / math.sqrt(2.0))
+    return tail
+
+
+class AnomalyEngine:
+    """
+    Runs several spike detectors over many daily count series in one
+    vectorized pass. The last column is "today"; earlier columns are the
+    baseline. A series is flagged when at least `min_votes` detectors agree.
+    """
+
+    DETECTORS = ("zscore", "ewma", "cusum", "count_threshold")
+
+    def __init__(self, z_threshold: float = 3.0, ewma_alpha: float = 0.3, ewma_threshold: float = 3.0,
+                 cusum_k: float = 0.5, cusum_h: float = 4.0, p_value: float = 0.001,
+                 min_count: int = 3, min_votes: int = 2):
+        self.z_threshold = z_threshold
+        self.ewma_alpha = ewma_alpha
+        self.ewma_threshold = ewma_threshold
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+        self.p_value = p_value
+        self.min_count = min_count
+        self.min_votes = min_votes
+
+    def score(self, matrix: np.ndarray) -> Dict[str, np.ndarray]:
+        """Per-series scores and boolean flags for every detector."""
+        baseline = matrix[:, :-1]
+        today = matrix[:, -1]
+        mean = baseline.mean(axis=1)
+        std = baseline.std(axis=1)
+        # Floor the spread so flat (often all-zero) series don't divide by zero
+        safe_std = np.maximum(std, np.sqrt(np.maximum(mean, 1.0)))
+
+        # 1. Classic z-score of today against the baseline window
+        z = (today - mean) / safe_std
+
+        # 2. EWMA forecast and variance, compared with today's count
+        ewma_mean = baseline[:, 0].copy()
+        ewma_var = np.zeros_like(ewma_mean)
+        a = self.ewma_alpha
+        for t in range(1, baseline.shape[1]):
+            diff = baseline[:, t] - ewma_mean
+            ewma_mean += a * diff
+            ewma_var = (1 - a) * (ewma_var + a * diff * diff)
+        ewma_z = (today - ewma_mean) / np.maximum(np.sqrt(ewma_var), np.sqrt(np.maximum(ewma_mean, 1.0)))
+
+        # 3. One-sided CUSUM of standardized residuals over the whole window
+        residuals = (matrix - mean[:, None]) / safe_std[:, None]
+        cusum = np.zeros(matrix.shape[0])
+        for t in range(matrix.shape[1]):
+            cusum = np.maximum(0.0, cusum + residuals[:, t] - self.cusum_k)
+
+        # 4. Count threshold: Poisson tail, or negative-binomial moments when overdispersed
+        variance = std ** 2
+        overdispersed = variance > mean * 1.5
+        p_poisson = _poisson_upper_tail(today, mean)
+        nb_z = (today - mean) / np.sqrt(np.maximum(variance, np.maximum(mean, 1.0)))
+        count_flag = np.where(overdispersed, nb_z > 3.09, p_poisson < self.p_value)
+
+        return {
+            "zscore": z,
+            "ewma": ewma_z,
+            "cusum": cusum,
+            "p_value": p_poisson,
+            "flags": {
+                "zscore": z > self.z_threshold,
+                "ewma": ewma_z > self.ewma_threshold,
+                "cusum": cusum > self.cusum_h,
+                "count_threshold": count_flag,
+            },
+            "today": today,
+            "mean": mean,
+        }
+
+    def evaluate(self, keys: List[str], matrix: np.ndarray) -> List[Dict[str, Any]]:
+        """Returns one anomaly dict per flagged series, strongest first."""
+        if matrix.shape[0] == 0 or matrix.shape[1] < 3:
+            return []
+        scores = self.score(matrix)
+        flags = scores["flags"]
+        votes = sum(flags[name].astype(np.int64) for name in self.DETECTORS)
+        hits = np.nonzero((votes >= self.min_votes) & (scores["today"] >= self.min_count))[0]
+
+        anomalies = []
+        for i in hits[np.argsort(-scores["zscore"][hits])]:
+            anomalies.append({
+                "series_key": keys[i],
+                "today_count": int(scores["today"][i]),
+                "baseline_mean": float(scores["mean"][i]),
+                "zscore": float(scores["zscore"][i]),
+                "ewma_z": float(scores["ewma"][i]),
+                "cusum": float(scores["cusum"][i]),
+                "p_value": float(scores["p_value"][i]),
+                "detectors": [name for name in self.DETECTORS if flags[name][i]],
+                "severity": "critical" if votes[i] == len(self.DETECTORS) else "high",
+            })
+        return anomalies
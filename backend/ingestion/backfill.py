@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Tuple
+from who_dons import WHODonIngestor
+from stream import chunked
+from enrichment import body_stored
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STATE_PATH = os.path.join(BACKEND_DIR, ".cache", "backfill_state.json")
+
+
+class BackfillState:
+    """
+    Local checkpoint file for a backfill. Each date range is recorded when
+    it completes, so an interrupted backfill resumes with the ranges that
+    are still pending.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data: Dict[str, Any] = {"ranges": {}}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    def is_done(self, key: str) -> bool:
+        return self.data["ranges"].get(key, {}).get("status") == "done"
+
+    def record(self, key: str, **fields):
+        with self._lock:
+            self.data["ranges"].setdefault(key, {}).update(fields)
+            self._save()
+
+    def forget(self, prefix: str):
+        """Drop the records of every range whose key starts with `prefix`."""
+        with self._lock:
+            self.data["ranges"] = {k: v for k, v in self.data["ranges"].items() if not k.startswith(prefix)}
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def split_ranges(start: datetime.date, end: datetime.date, range_days: int) -> List[Tuple[datetime.date, datetime.date]]:
+    """Split [start, end) into consecutive ranges of at most range_days days."""
+    ranges = []
+    cursor = start
+    while cursor < end:
+        upper = min(cursor + datetime.timedelta(days=range_days), end)
+        ranges.append((cursor, upper))
+        cursor = upper
+    return ranges
+
+
+class Backfill:
+    """
+    Loads the WHO DON archive range by range with a worker pool.
+    Already-stored DONs are skipped with a bulk existence check, so a
+    range that was interrupted midway can safely be run again. With
+    `enrich_stored`, DONs stored with their summary only (before article
+    bodies were fetched, or past a run's fetch limit) are enriched and
+    reprocessed when their page has a body.
+
+    A `reprocess` or `enrich_stored` pass checkpoints its ranges under its
+    own key prefix, so ranges done by the initial load are run again, and
+    its checkpoints are cleared once every range is done so the next such
+    pass starts over.
+    """
+
+    def __init__(self, start: datetime.date, end: datetime.date, range_days: int = 90, workers: int = 4,
+                 state_path: Optional[str] = None, reprocess: bool = False, enrich_stored: bool = False):
+        self.ranges = split_ranges(start, end, range_days)
+        self.workers = max(1, workers)
+        self.reprocess = reprocess
+        self.enrich_stored = enrich_stored
+        self.pass_prefix = "reprocess:" if reprocess else "enrich-stored:" if enrich_stored else ""
+        self.state = BackfillState(state_path or DEFAULT_STATE_PATH)
+        self.ingestor = WHODonIngestor(incremental=False, concurrency=self.workers)
+        # Range queries never rely on "not modified", so there is nothing to hold back
+        self.ingestor.http.defer_validators = False
+        self.source_id: Optional[str] = None
+
+    def range_key(self, r: Tuple[datetime.date, datetime.date]) -> str:
+        return f"{self.pass_prefix}{r[0].isoformat()}/{r[1].isoformat()}"
+
+    def _run_range(self, r: Tuple[datetime.date, datetime.date]) -> Dict[str, Any]:
+        key = self.range_key(r)
+        self.state.record(key, status="running")
+        start = time.perf_counter()
+        fetched = stored = 0
+        processor, db = self.ingestor.processor, self.ingestor.db
+
+        for chunk in chunked(self.ingestor.iter_range(*r), processor.BATCH_MAX_ITEMS):
+            fetched += len(chunk)
+            summary_only = set()
+            if not self.reprocess:
+                existing = db.get_existing_raw_events(self.source_id, [e['external_id'] for e in chunk])
+                if self.enrich_stored and self.ingestor.enricher is not None:
+                    summary_only = {e['external_id'] for e in chunk if existing.get(e['external_id']) == e['content']}
+                chunk = [e for e in chunk if e['external_id'] in summary_only
+                         or not body_stored(existing.get(e['external_id']), e['content'])]
+            if not chunk:
+                continue
+            if self.ingestor.enricher is not None:
+                summaries = {e['external_id']: e['content'] for e in chunk}
+                chunk = list(self.ingestor.enricher.enrich_all(chunk))
+                # A stored summary whose page has no body is already up to date
+                chunk = [e for e in chunk if e['external_id'] not in summary_only
+                         or e['content'] != summaries[e['external_id']]]
+                if not chunk:
+                    continue
+            processed = processor.process_batch(chunk, source_tier=1)
+            event_ids = db.insert_events_batch(self.source_id, list(zip(chunk, processed)))
+            stored += sum(1 for i in event_ids if i)
+
+        seconds = time.perf_counter() - start
+        self.state.record(key, status="done", fetched=fetched, stored=stored, seconds=round(seconds, 2), error=None)
+        return {"key": key, "fetched": fetched, "stored": stored, "seconds": seconds}
+
+    def run(self):
+        self.source_id = self.ingestor.ensure_source()
+        if not self.source_id:
+            print("Error: Could not obtain source_id. Check Supabase connection.")
+            return
+
+        pending = [r for r in self.ranges if not self.state.is_done(self.range_key(r))]
+        skipped = len(self.ranges) - len(pending)
+        print(f"Backfill: {len(self.ranges)} ranges, {skipped} already done, "
+              f"{len(pending)} to run with {self.workers} workers (state: {self.state.path})")
+
+        started = time.perf_counter()
+        completed = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._run_range, r): r for r in pending}
+            for future in as_completed(futures):
+                key = self.range_key(futures[future])
+                completed += 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self.state.record(key, status="failed", error=str(e))
+                    print(f"[{completed}/{len(pending)}] {key}: FAILED ({e})")
+                    continue
+                elapsed = time.perf_counter() - started
+                eta = elapsed / completed * (len(pending) - completed)
+                print(f"[{completed}/{len(pending)}] {key}: {result['fetched']} fetched, "
+                      f"{result['stored']} stored in {result['seconds']:.1f}s "
+                      f"(elapsed {elapsed:.0f}s, ETA {eta:.0f}s)")
+
+        print(self.ingestor.db.diseases.report())
+        failed = [r for r in self.ranges if not self.state.is_done(self.range_key(r))]
+        if failed:
+            print(f"Backfill incomplete: {len(failed)} ranges not done; re-run to resume.")
+        else:
+            if self.pass_prefix:
+                self.state.forget(self.pass_prefix)
+            print("Backfill complete.")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Load or rebuild the WHO DON archive.")
+    parser.add_argument("--start", default="2004-01-01", help="First publication date (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="End date, exclusive (default: tomorrow)")
+    parser.add_argument("--range-days", type=int, default=90, help="Days per work range")
+    parser.add_argument("--workers", type=int, default=4, help="Ranges fetched and processed concurrently")
+    parser.add_argument("--state", default=None, help="Checkpoint file (default: backend/.cache/backfill_state.json)")
+    parser.add_argument("--reprocess", action="store_true", help="Reprocess DONs that are already stored")
+    parser.add_argument("--enrich-stored", action="store_true",
+                        help="Fetch article bodies for DONs stored with their summary only, and reprocess them")
+    args = parser.parse_args()
+
+    end = (datetime.date.fromisoformat(args.end) if args.end
+           else datetime.date.today() + datetime.timedelta(days=1))
+    Backfill(
+        start=datetime.date.fromisoformat(args.start),
+        end=end,
+        range_days=args.range_days,
+        workers=args.workers,
+        state_path=args.state,
+        reprocess=args.reprocess,
+        enrich_stored=args.enrich_stored
+    ).run()
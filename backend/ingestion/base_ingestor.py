@@ -0,0 +1,342 @@
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Type
+import datetime
+import time
+import dateutil.parser
+from processor import EventProcessor
+from db_client import SupabaseClient, get_db
+from http_client import CachedFetcher, FetchResult
+from stream import chunked, prefetch, bounded_map
+from metrics import metrics
+from dedup import NearDuplicateIndex, get_dedup_index, figures
+from enrichment import ArticleEnricher, BodyCache, body_stored
+
+# Source plugins by config type (see sources.py)
+SOURCE_TYPES: Dict[str, Type["BaseIngestor"]] = {}
+
+
+def register_source(type_name: str) -> Callable[[Type["BaseIngestor"]], Type["BaseIngestor"]]:
+    """Class decorator registering an ingestor under a `sources.json` type."""
+    def decorator(cls: Type["BaseIngestor"]) -> Type["BaseIngestor"]:
+        SOURCE_TYPES[type_name] = cls
+        return cls
+    return decorator
+
+
+class BaseIngestor:
+    """
+    Shared pipeline for one source: fetch -> date-normalize -> filter ->
+    extract -> write. Subclasses describe the source and implement
+    iter_events; everything downstream is common to all sources.
+    """
+    SOURCE_NAME = ""
+    SOURCE_URL = ""
+    TIER = 2
+    SOURCE_TYPE = "Web"
+    HEADERS: Dict[str, str] = {
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+    }
+
+    # Items published this long before the watermark are assumed stored;
+    # newer ones are re-checked because sources edit recent items in place.
+    WATERMARK_GRACE_DAYS = 14
+
+    # Events per bulk existence lookup in incremental mode
+    FILTER_CHUNK = 200
+
+    # Parsed events buffered ahead of extraction
+    PREFETCH_BUFFER = 100
+
+    # Per-request HTTP timeout (capped by the run's time budget)
+    HTTP_TIMEOUT = 15
+
+    # Fetch each item's page and add its article body to `content`, with at
+    # most ENRICH_LIMIT page requests per run (cached bodies are free); items
+    # past the limit keep their summary until a backfill with --enrich-stored
+    ENRICH_BODIES = False
+    ENRICH_LIMIT = 100
+
+    def __init__(self, dry_run: bool = False, incremental: bool = True, concurrency: int = 4,
+                 processor: Optional[EventProcessor] = None, db: Optional[SupabaseClient] = None,
+                 timeout: Optional[float] = None, key: Optional[str] = None,
+                 dedup: Optional[NearDuplicateIndex] = None, deduplicate: bool = True,
+                 enrich: Optional[bool] = None, enrich_limit: Optional[int] = None):
+        # Name of this source in sources.json (used in logs and metrics)
+        self.key = key or type(self).__name__
+        self.dry_run = dry_run
+        self.incremental = incremental
+        self.concurrency = max(1, concurrency)
+        # Wall-clock budget for run(); None means unlimited
+        self.timeout = timeout
+        self._deadline: Optional[float] = None
+        self._watermark = None
+        self.source_id: Optional[str] = None
+        self.stats: Dict[str, Any] = {}
+        # Validators are saved only after a run stores everything it fetched (see run)
+        self.http = CachedFetcher(headers=self.HEADERS,
+                                  timeout=min(self.HTTP_TIMEOUT, timeout) if timeout else self.HTTP_TIMEOUT,
+                                  defer_validators=True)
+        # Dry runs leave the on-disk caches (extraction results, article bodies) untouched
+        self.processor = processor or EventProcessor(use_cache=not dry_run)
+        self.db = (db or get_db()) if not dry_run else None
+        # Near-duplicates of stored events are linked instead of extracted
+        self.dedup = None
+        if deduplicate and not dry_run:
+            self.dedup = dedup if dedup is not None else get_dedup_index()
+        self._signatures: Dict[str, Any] = {}
+        self.enricher = None
+        self.enrich_limit = self.ENRICH_LIMIT if enrich_limit is None else enrich_limit
+        if self.ENRICH_BODIES if enrich is None else enrich:
+            self.enricher = ArticleEnricher(session=self.http.session, headers=self.HEADERS,
+                                            timeout=self.http.timeout,
+                                            cache=BodyCache(":memory:") if dry_run else None)
+
+    def iter_events(self, since: Optional[datetime.datetime] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield raw events (external_id, title, content, raw_url, published_at),
+        ideally newest first and stopping once items predate `since`.
+        """
+        raise NotImplementedError
+
+    def fetch_latest(self, since: Optional[datetime.datetime] = None) -> List[Dict[str, Any]]:
+        """Fetch and parse the latest items into a list (see iter_events)."""
+        return list(self.iter_events(since=since))
+
+    def _fetch(self, url: str, params: Optional[Dict[str, Any]] = None) -> FetchResult:
+        """Conditional GET, timed and counted; non-200 responses raise."""
+        metrics.count("http_requests")
+        with metrics.timer("fetch"):
+            result = self.http.get(url, params=params)
+            if result.status != 200:
+                raise RuntimeError(f"{url} returned status {result.status}")
+        if result.not_modified:
+            metrics.count("http_not_modified")
+        return result
+
+    def _parse_date(self, date_str: str) -> str:
+        """Parse a date string into ISO format (now if missing or unparseable)."""
+        try:
+            return dateutil.parser.parse(date_str).isoformat()
+        except Exception:
+            return datetime.datetime.now().isoformat()
+
+    def _normalize_dates(self, events: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for e in events:
+            # Clean up published_at
+            e['published_at'] = self._parse_date(e['published_at'])
+            self.stats["fetched"] += 1
+            metrics.count("events_fetched")
+            yield e
+
+    def _until_deadline(self, events: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Stop pulling events once the run's time budget is spent."""
+        for e in events:
+            if self._deadline and time.monotonic() > self._deadline:
+                self.stats["timed_out"] = True
+                print(f"{self.SOURCE_NAME}: time budget of {self.timeout:.0f}s spent; stopping early.")
+                return
+            yield e
+
+    def _filter_new_events(self, source_id: str, events: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Keep only events that are unseen or whose content changed, using the
+        source watermark and one bulk lookup of existing external IDs per
+        FILTER_CHUNK events. Stored content that is the summary with its
+        article body appended counts as unchanged.
+        """
+        cutoff = None
+        if self._watermark:
+            cutoff = self._to_utc(self._watermark) - datetime.timedelta(days=self.WATERMARK_GRACE_DAYS)
+
+        for chunk in chunked(events, self.FILTER_CHUNK):
+            candidates = [e for e in chunk if not cutoff or self._to_utc(e['published_at']) >= cutoff]
+            existing = self.db.get_existing_raw_events(source_id, [e['external_id'] for e in candidates])
+            for e in candidates:
+                if not body_stored(existing.get(e['external_id']), e['content']):
+                    self.stats["fresh"] += 1
+                    yield e
+
+    def _skip_near_duplicates(self, source_id: str, events: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Pass on events with no near-duplicate from another source in the
+        index. Duplicates are stored as raw events linked to the matching
+        normalized event, in bulk, without extraction.
+        """
+        duplicates = []
+        for e in events:
+            with metrics.timer("dedup"):
+                text = f"{e['title']} {e['content']}"
+                signature = self.dedup.signature(text)
+                match = None
+                if signature is not None:
+                    text_figures = figures(text)
+                    match = self.dedup.query(signature, text_figures, exclude_source=source_id)
+            if match:
+                duplicates.append((e, match[0]))
+                if len(duplicates) >= self.FILTER_CHUNK:
+                    self._link_duplicates(source_id, duplicates)
+                    duplicates = []
+                continue
+            if signature is not None:
+                self._signatures[e['external_id']] = (signature, text_figures)
+            yield e
+        self._link_duplicates(source_id, duplicates)
+
+    def _link_duplicates(self, source_id: str, duplicates: List[tuple]):
+        if not duplicates:
+            return
+        self.stats["duplicates"] += len(duplicates)
+        metrics.count("near_duplicates", len(duplicates))
+        self.db.link_duplicate_raw_events(source_id, duplicates)
+
+    def _advance_watermark(self, source_id: str):
+        """Move the source watermark forward to the newest stored event."""
+        newest = self.stats["newest_stored"]
+        if not newest:
+            return
+        if self._watermark and newest <= self._to_utc(self._watermark):
+            return
+        self.db.update_source_watermark(source_id, newest.isoformat())
+
+    @staticmethod
+    def _to_utc(iso_str: str) -> datetime.datetime:
+        """Parse an ISO timestamp, treating naive values as UTC."""
+        dt = dateutil.parser.parse(iso_str)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=datetime.timezone.utc)
+        return dt
+
+    def _process_and_store(self, events: Iterable[Dict[str, Any]], source_id: Optional[str]):
+        """
+        Extraction and storage stages. A worker pool runs batched LLM
+        extraction on at most 2 x concurrency chunks at a time, while this
+        thread stores each chunk as soon as it is extracted.
+        """
+        chunks = chunked(events, self.processor.BATCH_MAX_ITEMS)
+        extract = lambda chunk: self.processor.process_batch(chunk, source_tier=self.TIER)
+        for chunk, processed_events, error in bounded_map(extract, chunks, workers=self.concurrency,
+                                                          max_in_flight=self.concurrency * 2):
+            if error:
+                metrics.count("extraction_failures")
+                print(f"Extraction Error: {error}")
+                self.stats["failed"] += len(chunk)
+                continue
+            self._write_chunk(chunk, processed_events, source_id)
+
+    def _write_chunk(self, chunk: List[Dict[str, Any]], processed_events: List[Dict[str, Any]],
+                     source_id: Optional[str]):
+        if self.dry_run:
+            for e, processed in zip(chunk, processed_events):
+                print(f"--- Event: {processed['title']} ---")
+                print(f"    Date: {e['published_at']}")
+                print(f"    Diseases: {', '.join(processed['diseases']) or 'None detected'}")
+                print(f"    Locations: {', '.join(processed['locations']) or 'None detected'}")
+                print(f"    Classification: {processed['classification']} (Conf: {processed['confidence']})")
+                print(f"    Reason: {processed['assessment_text']}\n")
+            self.stats["stored"] += len(chunk)
+            return
+        try:
+            with metrics.timer("db_write"):
+                event_ids = self.db.insert_events_batch(source_id, list(zip(chunk, processed_events)))
+        except Exception as e:
+            print(f"Storage Error: {e}")
+            self.stats["failed"] += len(chunk)
+            return
+        stored = [e for e, event_id in zip(chunk, event_ids) if event_id]
+        self.stats["stored"] += len(stored)
+        self.stats["failed"] += len(chunk) - len(stored)
+        if self.dedup is not None:
+            entries = []
+            for e, event_id in zip(chunk, event_ids):
+                signed = self._signatures.pop(e['external_id'], None)
+                if event_id and signed:
+                    signature, text_figures = signed
+                    entries.append((f"{source_id}:{e['external_id']}", signature, event_id, text_figures))
+            self.dedup.add_many(entries)
+        metrics.count("events_stored", len(stored))
+        if stored:
+            newest = max(self._to_utc(e['published_at']) for e in stored)
+            if not self.stats["newest_stored"] or newest > self.stats["newest_stored"]:
+                self.stats["newest_stored"] = newest
+        print(f"Stored {len(stored)}/{len(chunk)} events.")
+
+    def ensure_source(self) -> Optional[str]:
+        """Insert or update this ingestor's row in `sources` and return its ID."""
+        return self.db.upsert_source(
+            name=self.SOURCE_NAME,
+            url=self.SOURCE_URL,
+            tier=self.TIER,
+            source_type=self.SOURCE_TYPE
+        )
+
+    def run(self) -> Dict[str, Any]:
+        """Run the whole pipeline for this source and return its stats."""
+        self.stats = {"fetched": 0, "fresh": 0, "duplicates": 0, "stored": 0, "failed": 0, "newest_stored": None,
+                      "timed_out": False}
+        self.http.discard()
+        self._deadline = time.monotonic() + self.timeout if self.timeout else None
+        source_id = None
+        since = None
+        if not self.dry_run:
+            source_id = self.source_id = self.ensure_source()
+            if not source_id:
+                print("Error: Could not obtain source_id. Check Supabase connection.")
+                self.stats["error"] = "Could not obtain source_id"
+                return self.stats
+            if self.incremental:
+                self._watermark = self.db.get_source_watermark(source_id)
+                if self._watermark:
+                    since = self._to_utc(self._watermark) - datetime.timedelta(days=self.WATERMARK_GRACE_DAYS)
+            if self.dedup is not None:
+                self.dedup.warm_from_db(self.db)
+
+        # fetch -> parse (background, bounded) -> date-normalize -> filter -> dedup -> enrich -> process -> write
+        start = time.perf_counter()
+        events = prefetch(self.iter_events(since=since), buffer_size=self.PREFETCH_BUFFER)
+        events = self._normalize_dates(self._until_deadline(events))
+        if self.incremental and source_id:
+            events = self._filter_new_events(source_id, events)
+        # Near-duplicates are judged on title and summary: appended article
+        # bodies share section boilerplate that would make distinct reports
+        # look alike (and linked copies need no page fetch)
+        if self.dedup is not None and source_id:
+            events = self._skip_near_duplicates(source_id, events)
+        if self.enricher is not None:
+            events = self.enricher.enrich_all(events, deadline=self._deadline, max_fetches=self.enrich_limit)
+        self._process_and_store(events, source_id)
+        elapsed = time.perf_counter() - start
+        self.stats["seconds"] = elapsed
+        if self._deadline and time.monotonic() > self._deadline:
+            self.stats["timed_out"] = True
+
+        # A page counts as seen only once its events are stored: after a
+        # failed or cut-short run, the next one fetches and parses it again
+        # instead of getting "not modified" and skipping what was lost
+        if not self.dry_run and not self.stats["timed_out"] and not self.stats["failed"]:
+            self.http.commit()
+        elif self.http.discard() and not self.dry_run:
+            print(f"{self.SOURCE_NAME}: {self.stats['failed']} events not stored"
+                  f"{' (time budget spent)' if self.stats['timed_out'] else ''}; pages will be re-read next run.")
+
+        processed = self.stats["fresh"] if self.incremental and source_id else self.stats["fetched"]
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        print(f"{self.SOURCE_NAME}: fetched {self.stats['fetched']} events; processed {processed}, stored {self.stats['stored']} "
+              f"in {elapsed:.1f}s ({rate:.2f} events/sec, {self.concurrency} workers)")
+
+        if self.dedup is not None and source_id:
+            skip_rate = self.stats["duplicates"] / processed if processed else 0.0
+            print(f"Near-duplicates: {self.stats['duplicates']} linked instead of extracted "
+                  f"({skip_rate:.0%} skip rate, threshold {self.dedup.threshold})")
+
+        if self.incremental and source_id:
+            self._advance_watermark(source_id)
+
+        cascade = self.processor.cascade_stats().get(self.TIER)
+        if cascade:
+            print(f"Extraction cascade: {cascade['escalated']}/{cascade['events']} tier {self.TIER} events "
+                  f"escalated to the LLM ({cascade['escalation_rate']:.0%})")
+
+        if self.processor.cache:
+            stats = self.processor.cache.stats()
+            print(f"Extraction cache: {stats['hits']} hits, {stats['misses']} misses "
+                  f"({stats['hit_rate']:.0%} hit rate, {stats['entries']} entries)")
+        return self.stats
@@ -0,0 +1,291 @@
+import re
+import bisect
+import threading
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+from matcher import _trie_pattern
+from gazetteer import LEVELS
+from metrics import metrics
+
+UNITS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+    "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15,
+    "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19, "twenty": 20, "thirty": 30,
+    "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+SCALES = {"hundred": 100, "thousand": 1000, "million": 1000000}
+
+# Thousands separators: comma, space, no-break and narrow no-break space ("1 234")
+SEPARATOR = "[, \u00a0\u202f]"
+# Digits ("1,234"; decimals only before "million") or number words
+# ("twenty-one", "two hundred and five"), not part of a name ("COVID-19",
+# "cVDPV2") or of a larger number
+_DIGITS = rf"\d{{1,3}}(?:{SEPARATOR}\d{{3}})+(?!\d)|\d+(?:\.\d+)?(?=\s+million)|\d+"
+_WORD = _trie_pattern({**UNITS, **SCALES})
+_NUMBER = (rf"(?<![\w.,])(?<![^\W\d_]-)"
+           rf"(?:(?:{_DIGITS})(?:\s+million)?|(?:{_WORD})(?:(?:[\s-]+|\s+and\s+)(?:{_WORD}))*)\b")
+
+_QUALIFIER = r"(?:(?:laboratory|lab)[- ])?confirmed|suspected|suspect|probable"
+
+# Words allowed between a number and its noun ("12 new laboratory-confirmed
+# cholera cases"); disease aliases are added per extractor
+MODIFIERS = ("new", "additional", "more", "total", "cumulative", "human", "fatal", "associated", "related",
+             "reported", "imported", "locally", "acquired", "active", "clinical", "clinically", "compatible",
+             "diagnosed", "epidemiologically", "linked", "people", "persons", "patients", "children",
+             "adults", "individuals", "have", "had", "has", "and", "or")
+CASE_NOUNS = r"cases?|infections?"
+DEATH_NOUNS = r"deaths?|fatalities|fatality|died"
+# Words that may follow a reversed count ("cases rose to 120 in ..."); any
+# other word means the number counts something else ("to 12 districts")
+AFTER_REVERSED = ("in", "on", "as", "and", "since", "across", "among", "including", "with", "by", "from",
+                  "of", "at", "for", "during")
+MONTHS = ("january", "february", "march", "april", "may", "june", "july", "august", "september",
+          "october", "november", "december")
+# "In 2023 cases rose" names a year, not 2023 cases
+YEAR_WORDS = {"in", "since", "during", "of", "from", "until", "by", "year", "early", "late", "mid", *MONTHS}
+
+# Attribution never crosses a sentence end ("St." splitting early only narrows it)
+SENTENCE_END_RE = re.compile(r"[.!?;](?=\s+[\"'“(]?[A-Z0-9])|\n\s*\n")
+WORD_BEFORE_RE = re.compile(r"(\w+)\W*$")
+
+
+def parse_number(text: str) -> Optional[int]:
+    """Value of a matched number ("1 234", "1.5 million", "twenty-one", "two hundred and five")."""
+    text = text.lower()
+    if text[0].isdigit():
+        multiplier = 1
+        if text.endswith("million"):
+            text, multiplier = text[:-len("million")], SCALES["million"]
+        try:
+            return int(float(re.sub(SEPARATOR, "", text)) * multiplier)
+        except ValueError:
+            return None
+    total, current = 0, 0
+    for word in re.findall(r"[a-z]+", text):
+        if word in UNITS:
+            current += UNITS[word]
+        elif word == "hundred":
+            current = max(current, 1) * SCALES[word]
+        elif word in SCALES:
+            total += max(current, 1) * SCALES[word]
+            current = 0
+    return total + current
+
+
+def qualifier_of(word: str) -> str:
+    """"confirmed", "suspected" or "probable" for a matched qualifier ("lab-confirmed", "suspect")."""
+    word = re.split(r"[- ]", word.lower())[-1]
+    return "suspected" if word == "suspect" else word
+
+
+def total_count(mentions: Iterable[Dict[str, Any]], kind: str) -> Optional[int]:
+    """
+    One count of a kind from several mentions: the largest plain count, or
+    the sum of the largest per qualifier ("12 confirmed and 30 suspected")
+    when that is larger.
+    """
+    best: Dict[str, int] = {}
+    for m in mentions:
+        if m["kind"] == kind:
+            best[m["qualifier"]] = max(best.get(m["qualifier"], 0), m["count"])
+    if not best:
+        return None
+    return max(best.get("", 0), sum(n for q, n in best.items() if q))
+
+
+class CountExtractor:
+    """
+    Finds case and death counts in report text with precompiled patterns:
+    digits or number words, ranges ("10-15", "between 10 and 15"; the
+    upper bound counts) and confirmed/suspected/probable qualifiers, in
+    both "120 confirmed cases" and "cases rose to 120" order. Each count
+    is attributed to the nearest disease and place in its sentence, or
+    to the event's only disease and main country when the sentence
+    names none.
+    """
+    # Risk levels: High at any of these...
+    HIGH_CASES = 1000
+    HIGH_DEATHS = 10
+    HIGH_CFR = 0.1
+    MIN_CFR_CASES = 10
+    # ...Moderate at any of these, Low otherwise
+    MODERATE_CASES = 50
+    MODERATE_DEATHS = 1
+    # Larger numbers count something else (a population)
+    MAX_COUNT = 100000000
+    # How far back counts sharing one noun are looked for ("12 confirmed, 3 probable and 30 suspected cases")
+    LISTED_WINDOW = 80
+
+    def __init__(self, disease_words: Iterable[str] = ()):
+        modifier = _trie_pattern(sorted({*MODIFIERS, *(w.lower() for w in disease_words)}))
+        # Cheap first check at each position: a word start that can begin a count
+        first = "".join(sorted({w[0] for w in (*UNITS, *SCALES, "between")}))
+        count = (rf"(?<![\w.,])(?=[\d{first}])"
+                 rf"(?:between\s+(?P<between>{_NUMBER})\s+and\s+|(?P<low>{_NUMBER})\s*(?:-|–|to)\s*)?"
+                 rf"(?P<number>{_NUMBER})")
+        self.forward = re.compile(
+            rf"{count}\s+(?P<modifiers>(?:(?:{_QUALIFIER}|{modifier})[\s,-]+){{0,4}})"
+            rf"(?P<noun>{CASE_NOUNS}|{DEATH_NOUNS})\b",
+            re.I,
+        )
+        self.reverse = re.compile(
+            rf"\b(?P<noun>cases|deaths)\s+(?:(?:has|have|had)\s+)?(?:now\s+)?"
+            rf"(?:rose|risen|increased|climbed|reached|totall?ed|totall?ing|stands\s+at|stood\s+at|to)\s+"
+            rf"(?:to\s+)?(?P<number>{_NUMBER})"
+            rf"(?=\s*(?:[.,;:()]|$|\s(?:{'|'.join(AFTER_REVERSED)})\b))",
+            re.I,
+        )
+        self.listed = re.compile(
+            rf"(?P<number>{_NUMBER})\s+(?P<qualifier>{_QUALIFIER})\s*(?:,\s*(?:and\s+)?|\s+and\s+)$", re.I)
+        self.qualifier = re.compile(rf"\b(?:{_QUALIFIER})\b", re.I)
+
+    @staticmethod
+    def _kind(noun: str, modifiers: str = "") -> str:
+        if re.fullmatch(DEATH_NOUNS, noun, re.I) or "fatal" in modifiers.lower():
+            return "deaths"
+        return "cases"
+
+    @staticmethod
+    def _is_year(text: str, m: re.Match) -> bool:
+        number = m.group("number")
+        if not (len(number) == 4 and number.isdigit() and 1900 <= int(number) <= 2100):
+            return False
+        before = WORD_BEFORE_RE.search(text, max(0, m.start("number") - 40), m.start("number"))
+        return before is not None and before.group(1).lower() in YEAR_WORDS
+
+    def _mention(self, m: re.Match, kind: str, qualifier: str,
+                 low: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        count = parse_number(m.group("number"))
+        if count is None or count > self.MAX_COUNT:
+            return None
+        low_count = parse_number(low) if low else None
+        return {"kind": kind, "count": count, "low": low_count if low_count is not None and low_count < count else None,
+                "qualifier": qualifier, "start": m.start(), "end": m.end()}
+
+    def find(self, text: str) -> List[Dict[str, Any]]:
+        """Every count in text as {"kind", "count", "low", "qualifier", "start", "end"}, in order."""
+        mentions = []
+        spans = []
+        for m in self.forward.finditer(text):
+            if self._is_year(text, m):
+                continue
+            kind = self._kind(m.group("noun"), m.group("modifiers"))
+            found = self.qualifier.search(m.group("modifiers"))
+            qualifier = qualifier_of(found.group()) if found else ""
+            mention = self._mention(m, kind, qualifier, m.group("between") or m.group("low"))
+            if mention is None:
+                continue
+            mentions.append(mention)
+            spans.append((m.start(), m.end()))
+            head = m.start()
+            while qualifier:
+                listed = self.listed.search(text, max(0, head - self.LISTED_WINDOW), head)
+                earlier = listed and self._mention(listed, kind, qualifier_of(listed.group("qualifier")))
+                if not earlier:
+                    break
+                mentions.append(earlier)
+                head = listed.start()
+        for m in self.reverse.finditer(text):
+            if any(start < m.end() and m.start() < end for start, end in spans):
+                continue
+            mention = self._mention(m, self._kind(m.group("noun")), "")
+            if mention is not None:
+                mentions.append(mention)
+        mentions.sort(key=lambda x: x["start"])
+        return mentions
+
+    @staticmethod
+    def _nearest(offsets: Sequence[Tuple[int, Any]], start: int, end: int, lo: int, hi: int) -> Tuple[bool, Any]:
+        """(found, value) of the offset in [lo, hi) closest to the span [start, end)."""
+        found, best, best_distance = False, None, 0
+        for offset, value in offsets:
+            if lo <= offset < hi:
+                distance = 0 if start <= offset < end else min(abs(offset - start), abs(offset - end))
+                if not found or distance < best_distance:
+                    found, best, best_distance = True, value, distance
+        return found, best
+
+    def extract(self, text: str, diseases: Sequence[str] = (),
+                disease_offsets: Sequence[Tuple[int, Optional[str]]] = (),
+                places: Sequence[Dict[str, Any]] = (), iso2: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Case and death counts of one event. `disease_offsets` are
+        (offset, disease) for disease names in text, with None for a
+        disease the event is not about; `places` are gazetteer places with
+        their "offsets". Returns event totals and risk level, counts per
+        disease ({name: {"case_count", "death_count"}}) and per place
+        (aligned with `places`; a country or region includes the counts of
+        places inside it), and the "offsets" of every count in text. Event
+        totals leave out counts attributed to another disease or country.
+        """
+        mentions = self.find(text)
+        metrics.count("case_counts_found", len(mentions))
+        place_offsets = [(offset, i) for i, place in enumerate(places) for offset in place.get("offsets", ())]
+        main_places = [i for i, place in enumerate(places) if iso2 and place["iso2"] == iso2]
+        default_place = min(main_places, key=lambda i: LEVELS.index(places[i]["level"]), default=None)
+        default_disease = diseases[0] if len(diseases) == 1 else None
+        ends = [m.end() for m in SENTENCE_END_RE.finditer(text)]
+
+        for m in mentions:
+            s = bisect.bisect_right(ends, m["start"])
+            lo, hi = ends[s - 1] if s else 0, ends[s] if s < len(ends) else len(text)
+            named, disease = self._nearest(disease_offsets, m["start"], m["end"], lo, hi)
+            m["disease"] = disease if named else default_disease
+            m["other_disease"] = named and disease is None
+            named, place = self._nearest(place_offsets, m["start"], m["end"], lo, hi)
+            m["place"] = place if named else default_place
+
+        in_scope = [m for m in mentions if not m["other_disease"]
+                    and (m["place"] is None or not iso2 or places[m["place"]]["iso2"] in (iso2, None))]
+        cases, deaths = total_count(in_scope, "cases"), total_count(in_scope, "deaths")
+
+        located = [(places[m["place"]], m) for m in mentions if m["place"] is not None]
+
+        def counts(subset: List[Dict[str, Any]]) -> Dict[str, Optional[int]]:
+            return {"case_count": total_count(subset, "cases"), "death_count": total_count(subset, "deaths")}
+
+        return {
+            "case_count": cases,
+            "death_count": deaths,
+            "risk_level": self.risk_level(cases, deaths),
+            "disease_counts": {d: counts([m for m in mentions if m["disease"] == d]) for d in diseases},
+            "place_counts": [counts([m for p, m in located if self._within(p, place)]) for place in places],
+            "offsets": [m["start"] for m in mentions],
+        }
+
+    @staticmethod
+    def _within(place: Dict[str, Any], area: Dict[str, Any]) -> bool:
+        """Whether a place is area itself or inside it (a city in its region or country)."""
+        if place is area:
+            return True
+        if area["level"] == "country":
+            return place["iso2"] == area["iso2"]
+        if area["level"] == "region":
+            return place["level"] == "city" and place["iso2"] == area["iso2"] and place["region"] == area["region"]
+        return False
+
+    @classmethod
+    def risk_level(cls, cases: Optional[int], deaths: Optional[int]) -> Optional[str]:
+        """'Low', 'Moderate' or 'High' from an event's counts; None when it reports none."""
+        if cases is None and deaths is None:
+            return None
+        cases, deaths = cases or 0, deaths or 0
+        if (deaths >= cls.HIGH_DEATHS or cases >= cls.HIGH_CASES
+                or (cases >= cls.MIN_CFR_CASES and deaths / cases >= cls.HIGH_CFR)):
+            return "High"
+        if deaths >= cls.MODERATE_DEATHS or cases >= cls.MODERATE_CASES:
+            return "Moderate"
+        return "Low"
+
+
+_EXTRACTORS: Dict[Tuple[str, ...], CountExtractor] = {}
+_EXTRACTORS_LOCK = threading.Lock()
+
+
+def get_count_extractor(disease_words: Iterable[str] = ()) -> CountExtractor:
+    """Process-wide extractor for a set of disease aliases, compiled on first use."""
+    key = tuple(sorted(set(disease_words)))
+    with _EXTRACTORS_LOCK:
+        extractor = _EXTRACTORS.get(key)
+        if extractor is None:
+            extractor = _EXTRACTORS[key] = CountExtractor(key)
+        return extractor
@@ -0,0 +1,82 @@
+import time
+import random
+import threading
+from typing import Callable, Any
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket for API quotas (e.g. Gemini requests/minute).
+    The refill rate adapts: 429s halve it, successes slowly restore it.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int = 1, min_rate_per_minute: float = 1.0):
+        self.max_rate = rate_per_minute / 60.0
+        self.min_rate = min_rate_per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a token is available."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self):
+        """Back off after a rate-limit response."""
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+
+    def reward(self):
+        """Recover towards the configured rate after a success."""
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate * 1.1)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Recognizes 429 / quota errors without importing the SDK's exception types."""
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    text = f"{type(error).__name__} {error}"
+    return "ResourceExhausted" in text or "429" in text or "quota" in text.lower()
+
+
+def call_with_backoff(fn: Callable[[], Any], limiter: TokenBucket = None,
+                      max_retries: int = 5, base_delay: float = 2.0) -> Any:
+    """
+    Call fn under the limiter, retrying rate-limit errors with exponential
+    backoff and jitter. Other errors are raised immediately.
+    """
+    for attempt in range(max_retries + 1):
+        if limiter:
+            limiter.acquire()
+        try:
+            result = fn()
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt == max_retries:
+                raise
+            if limiter:
+                limiter.penalize()
+            delay = base_delay * (2 ** attempt) * (0.5 + random.random())
+            print(f"Rate limited ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        if limiter:
+            limiter.reward()
+        return result
@@ -1,21 +1,127 @@
 import os
+import time
+import uuid
+import threading
+import httpx
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-from supabase import create_client, Client
-from typing import Dict, Any, List, Optional
+from postgrest.utils import SyncClient
+from supabase import create_client, Client, ClientOptions
+from typing import Dict, Any, List, Optional, Tuple
+from metrics import metrics
+from disease_index import DiseaseIndex
+from keywords import DISEASE_KEYWORDS
 
 load_dotenv()
 
+# Connection errors after which the request cannot have reached PostgREST
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# The connection dropped mid-request (often a keep-alive connection the
+# server had already closed), but the server may have run it: retried only
+# when running it twice is harmless, i.e. not for plain inserts
+RETRYABLE_UNLESS_INSERT = (httpx.RemoteProtocolError,)
+
+# location_mentions columns filled from gazetteer places and their counts
+LOCATION_COLUMNS = ("country", "region", "city", "iso2", "latitude", "longitude", "case_count", "death_count")
+# outbreak_assessments columns filled from the event's counts
+ASSESSMENT_COLUMNS = ("case_count", "death_count", "risk_level")
+# Every mention row carries the count columns (bulk inserts need the same keys)
+NO_COUNTS = {"case_count": None, "death_count": None}
+# Tables whose rows hang off a normalized event (see _child_rows)
+CHILD_TABLES = ("disease_mentions", "location_mentions", "outbreak_assessments")
+
+
+def is_plain_insert(query: Any) -> bool:
+    """Whether a PostgREST query is an insert without conflict resolution (repeating it adds rows)."""
+    if getattr(query, "http_method", None) != "POST" or query.path.startswith("/rpc/"):
+        return False
+    return "resolution=" not in (query.headers.get("Prefer") or "")
+
+
+def create_supabase_client(url: str, key: str, pool_size: int = 10, timeout: float = 30.0) -> Client:
+    """
+    Supabase client whose PostgREST session keeps up to `pool_size`
+    keep-alive HTTP/2 connections, with a per-request timeout.
+    """
+    client = create_client(url, key, options=ClientOptions(postgrest_client_timeout=timeout))
+    postgrest = client.postgrest
+    default_session = postgrest.session
+    postgrest.session = SyncClient(
+        base_url=default_session.base_url,
+        headers=default_session.headers,
+        timeout=timeout,
+        follow_redirects=True,
+        http2=True,
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+    )
+    default_session.close()
+    return client
+
 class SupabaseClient:
     """
     Wrapper for Supabase operations.
     Handles storage of raw and normalized events.
     """
-    def __init__(self):
+    IN_FILTER_CHUNK = 200
+    # Rows per page for reads that may exceed PostgREST's max-rows cap
+    READ_PAGE = 1000
+    # Rows per bulk insert request; keeps PostgREST payloads bounded
+    WRITE_CHUNK = 500
+
+    # Attempts after a connection error, with exponential backoff
+    RETRIES = 2
+    RETRY_BACKOFF = 0.5
+
+    def __init__(self, client: Optional[Client] = None):
+        """
+        Prefer get_db(), which shares one client (and connection pool) per
+        process; pass `client` to wrap an existing or fake client.
+        """
+        self._diseases: Optional[DiseaseIndex] = None
+        self._diseases_lock = threading.Lock()
+        if client is not None:
+            self.client = client
+            return
         url = os.environ.get("SUPABASE_URL")
         key = os.environ.get("SUPABASE_KEY")
         if not url or not key:
             print("Warning: SUPABASE_URL or SUPABASE_KEY not set in environment.")
-        self.client: Client = create_client(url, key) if url and key else None
+        self.client: Client = create_supabase_client(
+            url, key,
+            pool_size=int(os.environ.get("SUPABASE_POOL_SIZE", 10)),
+            timeout=float(os.environ.get("SUPABASE_TIMEOUT", 30))
+        ) if url and key else None
+
+    def execute(self, query: Any) -> Any:
+        """
+        Execute a PostgREST query or RPC, counting and timing each round
+        trip. Connection errors are retried (counted as db_retries), except
+        a dropped connection during a plain insert, which may have been
+        committed; HTTP and query errors are raised as they are.
+        """
+        retryable = RETRYABLE_ERRORS if is_plain_insert(query) else RETRYABLE_ERRORS + RETRYABLE_UNLESS_INSERT
+        for attempt in range(self.RETRIES + 1):
+            metrics.count("db_requests")
+            try:
+                with metrics.timer("db_request"):
+                    return query.execute()
+            except retryable as e:
+                if attempt == self.RETRIES:
+                    raise
+                metrics.count("db_retries")
+                print(f"Database connection error ({e!r}); retrying...")
+                time.sleep(self.RETRY_BACKOFF * 2 ** attempt)
+
+    @property
+    def diseases(self) -> DiseaseIndex:
+        """
+        Index of the `diseases` table (plus the extraction keyword aliases)
+        for linking mentions, loaded with one paged read on first use.
+        """
+        with self._diseases_lock:
+            if self._diseases is None:
+                self._diseases = DiseaseIndex(self.get_diseases("id, name"), aliases=DISEASE_KEYWORDS)
+            return self._diseases
 
     def upsert_source(self, name: str, url: str, tier: int, source_type: str) -> Optional[str]:
         """Insert or update a source and return its ID."""
@@ -26,23 +132,171 @@ class SupabaseClient:
             "tier": tier,
             "type": source_type
         }
-        res = self.client.table("sources").upsert(data, on_conflict="url").execute()
+        res = self.execute(self.client.table("sources").upsert(data, on_conflict="url"))
         if res.data:
             return res.data[0]["id"]
         return None
 
-    def insert_raw_event(self, source_id: str, event_data: Dict[str, Any]) -> Optional[str]:
-        """Insert a raw event and return its ID."""
+    def get_source_watermark(self, source_id: str) -> Optional[str]:
+        """Return the source's high-water mark (latest published_at ingested)."""
         if not self.client: return None
-        data = {
+        res = self.execute(self.client.table("sources").select("last_fetched_at").eq("id", source_id))
+        if res.data:
+            return res.data[0]["last_fetched_at"]
+        return None
+
+    def update_source_watermark(self, source_id: str, watermark: str):
+        """Advance the source's high-water mark."""
+        if not self.client: return
+        self.execute(self.client.table("sources").update({"last_fetched_at": watermark}).eq("id", source_id))
+
+    def get_existing_raw_events(self, source_id: str, external_ids: List[str]) -> Dict[str, str]:
+        """Return {external_id: content} for the given IDs already stored for a source."""
+        if not self.client or not external_ids: return {}
+        existing = {}
+        # Chunked to keep the PostgREST `in` filter within URL length limits
+        for i in range(0, len(external_ids), self.IN_FILTER_CHUNK):
+            chunk = external_ids[i:i + self.IN_FILTER_CHUNK]
+            res = self.execute(self.client.table("raw_events")
+                               .select("external_id, content")
+                               .eq("source_id", source_id)
+                               .in_("external_id", chunk))
+            for row in res.data or []:
+                existing[row["external_id"]] = row["content"]
+        return existing
+
+    def get_recent_events(self, days: int) -> List[Dict[str, Any]]:
+        """
+        Stored events published in the last `days` days, as dicts with
+        event_id, source_id, external_id, title and content (used to warm
+        the near-duplicate index). Raw events already linked as duplicates
+        are left out.
+        """
+        if not self.client: return []
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+        raw_rows: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            res = self.execute(self.client.table("raw_events")
+                               .select("id, source_id, external_id, content, duplicate_of")
+                               .gte("published_at", cutoff)
+                               .order("id")
+                               .range(offset, offset + self.READ_PAGE - 1))
+            page = res.data or []
+            raw_rows.extend(r for r in page if not r.get("duplicate_of"))
+            if len(page) < self.READ_PAGE:
+                break
+            offset += self.READ_PAGE
+
+        by_raw_id = {r["id"]: r for r in raw_rows}
+        events = []
+        ids = list(by_raw_id)
+        for i in range(0, len(ids), self.IN_FILTER_CHUNK):
+            res = self.execute(self.client.table("normalized_events")
+                               .select("id, raw_event_id, title")
+                               .in_("raw_event_id", ids[i:i + self.IN_FILTER_CHUNK]))
+            for row in res.data or []:
+                raw = by_raw_id[row["raw_event_id"]]
+                events.append({
+                    "event_id": row["id"],
+                    "source_id": raw["source_id"],
+                    "external_id": raw["external_id"],
+                    "title": row["title"],
+                    "content": raw["content"]
+                })
+        return events
+
+    def link_duplicate_raw_events(self, source_id: str,
+                                  events: List[Tuple[Dict[str, Any], str]]) -> int:
+        """
+        Store (raw_event, normalized_event_id) pairs as raw events marked
+        `duplicate_of` an existing normalized event, skipping extraction and
+        the normalized/child-table fan-out. Returns the number of rows written.
+        """
+        if not self.client or not events: return 0
+        rows = [{**self._raw_event_row(source_id, raw), "duplicate_of": event_id} for raw, event_id in events]
+        written = 0
+        try:
+            for chunk in self._chunks(rows):
+                res = self.execute(self.client.table("raw_events").upsert(chunk, on_conflict="source_id, external_id"))
+                written += len(res.data or [])
+        except Exception as e:
+            print(f"Error linking duplicate raw events: {e}")
+        return written
+
+    def get_normalized_event_ids(self, raw_event_ids: List[str]) -> Dict[str, List[str]]:
+        """Return {raw_event_id: [normalized event IDs]} for raw events that were already extracted."""
+        if not self.client or not raw_event_ids: return {}
+        existing: Dict[str, List[str]] = {}
+        for i in range(0, len(raw_event_ids), self.IN_FILTER_CHUNK):
+            res = self.execute(self.client.table("normalized_events")
+                               .select("id, raw_event_id")
+                               .in_("raw_event_id", raw_event_ids[i:i + self.IN_FILTER_CHUNK]))
+            for row in res.data or []:
+                existing.setdefault(row["raw_event_id"], []).append(row["id"])
+        return existing
+
+    def _delete_event_rows(self, event_ids: List[str], stale_ids: List[str]):
+        """Delete the child rows of `event_ids`, then the `stale_ids` normalized events with theirs."""
+        for table in CHILD_TABLES:
+            ids = event_ids + stale_ids
+            for i in range(0, len(ids), self.IN_FILTER_CHUNK):
+                self.execute(self.client.table(table).delete().in_("event_id", ids[i:i + self.IN_FILTER_CHUNK]))
+        for i in range(0, len(stale_ids), self.IN_FILTER_CHUNK):
+            self.execute(self.client.table("normalized_events").delete()
+                         .in_("id", stale_ids[i:i + self.IN_FILTER_CHUNK]))
+
+    @staticmethod
+    def _raw_event_row(source_id: str, event_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
             "source_id": source_id,
             "external_id": event_data["external_id"],
             "content": event_data["content"],
             "raw_url": event_data["raw_url"],
-            "published_at": event_data["published_at"]
+            "published_at": event_data["published_at"],
+            # Cleared when the event is extracted in its own right
+            "duplicate_of": None
         }
+
+    @staticmethod
+    def _normalized_event_row(raw_event_id: str, processed_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "raw_event_id": raw_event_id,
+            "title": processed_data["title"],
+            "summary": processed_data.get("summary", processed_data["title"]),
+            "signal_classification": processed_data["classification"],
+            "confidence_score": processed_data["confidence"],
+            "source_tier": processed_data["source_tier"],
+            "iso2": processed_data.get("iso2"),
+            "geo_level": processed_data.get("geo_level")
+        }
+
+    def _child_rows(self, event_id: str, processed_data: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """Rows for the tables hanging off a normalized event, keyed by table."""
+        disease_counts = processed_data.get("disease_counts", {})
+        return {
+            "disease_mentions": [
+                {"event_id": event_id, "disease_id": self.diseases.resolve(disease), "disease_name": disease,
+                 "is_primary": True, **disease_counts.get(disease, NO_COUNTS)}
+                for disease in processed_data.get("diseases", [])
+            ],
+            "location_mentions": [
+                {"event_id": event_id, **{column: place.get(column) for column in LOCATION_COLUMNS}}
+                for place in processed_data.get("places")
+                or [{"country": location} for location in processed_data.get("locations", [])]
+            ],
+            "outbreak_assessments": [
+                {"event_id": event_id, "assessment_text": processed_data["assessment_text"],
+                 **{column: processed_data.get(column) for column in ASSESSMENT_COLUMNS}}
+            ],
+        }
+
+    def insert_raw_event(self, source_id: str, event_data: Dict[str, Any]) -> Optional[str]:
+        """Insert a raw event and return its ID."""
+        if not self.client: return None
+        data = self._raw_event_row(source_id, event_data)
         try:
-            res = self.client.table("raw_events").upsert(data, on_conflict="source_id, external_id").execute()
+            res = self.execute(self.client.table("raw_events").upsert(data, on_conflict="source_id, external_id"))
             if res.data:
                 return res.data[0]["id"]
         except Exception as e:
@@ -54,38 +308,139 @@ class SupabaseClient:
         if not self.client: return None
         
         # 1. Insert normalized event
-        event_data = {
-            "raw_event_id": raw_event_id,
-            "title": processed_data["title"],
-            "summary": processed_data.get("summary", processed_data["title"]),
-            "signal_classification": processed_data["classification"],
-            "confidence_score": processed_data["confidence"],
-            "source_tier": processed_data["source_tier"]
-        }
-        res = self.client.table("normalized_events").insert(event_data).execute()
+        event_data = self._normalized_event_row(raw_event_id, processed_data)
+        res = self.execute(self.client.table("normalized_events").insert(event_data))
         if not res.data: return None
         
         event_id = res.data[0]["id"]
         
-        # 2. Insert disease mentions
-        for disease in processed_data.get("diseases", []):
-            self.client.table("disease_mentions").insert({
-                "event_id": event_id,
-                "disease_name": disease,
-                "is_primary": True
-            }).execute()
-            
-        # 3. Insert location mentions
-        for location in processed_data.get("locations", []):
-            self.client.table("location_mentions").insert({
-                "event_id": event_id,
-                "country": location
-            }).execute()
-
-        # 4. Insert assessment
-        self.client.table("outbreak_assessments").insert({
-            "event_id": event_id,
-            "assessment_text": processed_data["assessment_text"]
-        }).execute()
+        # 2. Insert disease mentions, location mentions and assessment
+        for table, rows in self._child_rows(event_id, processed_data).items():
+            for row in rows:
+                self.execute(self.client.table(table).insert(row))
         
         return event_id
+
+    def insert_events_batch(self, source_id: str,
+                            events: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[Optional[str]]:
+        """
+        Bulk version of insert_raw_event + insert_normalized_event.
+        Takes (raw_event, processed) pairs and writes each table with array
+        requests. Normalized event IDs are generated client-side, so child
+        rows are built without waiting on the parent insert. A raw event
+        that was extracted before (its text changed) keeps its normalized
+        event ID, so duplicates linked to it stay linked, and its row and
+        child rows are replaced rather than added to.
+        Returns the normalized event IDs in input order (None where the raw
+        event could not be stored).
+        """
+        if not self.client or not events: return [None] * len(events)
+
+        # 1. Raw events: upsert returns existing IDs on conflict, so the DB
+        #    keeps assigning these (a client ID would clash on re-runs).
+        raw_rows = [self._raw_event_row(source_id, raw) for raw, _ in events]
+        raw_ids: Dict[str, str] = {}
+        try:
+            for chunk in self._chunks(raw_rows):
+                res = self.execute(self.client.table("raw_events").upsert(chunk, on_conflict="source_id, external_id"))
+                for row in res.data or []:
+                    raw_ids[row["external_id"]] = row["id"]
+        except Exception as e:
+            print(f"Error bulk inserting raw events: {e}")
+            return [None] * len(events)
+
+        # 2. Earlier extractions of these raw events: the first one is reused,
+        #    any others (left by older versions) are deleted
+        previous = self.get_normalized_event_ids(list(raw_ids.values()))
+        reused = {raw_id: ids[0] for raw_id, ids in previous.items()}
+        stale = [event_id for ids in previous.values() for event_id in ids[1:]]
+        if previous:
+            self._delete_event_rows(list(reused.values()), stale)
+
+        # 3. Build every normalized and child row up front
+        event_ids: List[Optional[str]] = []
+        tables: Dict[str, List[Dict[str, Any]]] = {"normalized_events": []}
+        for raw, processed in events:
+            raw_id = raw_ids.get(raw["external_id"])
+            if not raw_id:
+                event_ids.append(None)
+                continue
+            event_id = reused.get(raw_id) or str(uuid.uuid4())
+            event_ids.append(event_id)
+            tables["normalized_events"].append({"id": event_id, **self._normalized_event_row(raw_id, processed)})
+            for table, rows in self._child_rows(event_id, processed).items():
+                tables.setdefault(table, []).extend(rows)
+
+        # 4. One array write per table (parents first for the FKs); normalized
+        #    events are upserted by ID to replace the reused ones
+        for chunk in self._chunks(tables.pop("normalized_events")):
+            self.execute(self.client.table("normalized_events").upsert(chunk, on_conflict="id"))
+        for table, rows in tables.items():
+            for chunk in self._chunks(rows):
+                self.execute(self.client.table(table).insert(chunk))
+
+        return event_ids
+
+    def insert_pipeline_run(self, run: Dict[str, Any]) -> Optional[str]:
+        """Record a pipeline run summary in `pipeline_runs` and return its ID."""
+        if not self.client: return None
+        res = self.execute(self.client.table("pipeline_runs").insert(run))
+        if res.data:
+            return res.data[0]["id"]
+        return None
+
+    def insert_alerts(self, alerts: List[Dict[str, Any]]) -> int:
+        """
+        Bulk-insert alerts, skipping any whose dedupe_key is already stored.
+        Returns the number of new rows; errors propagate so callers can retry.
+        """
+        if not self.client or not alerts: return 0
+        inserted = 0
+        for chunk in self._chunks(alerts):
+            res = self.execute(self.client.table("alerts")
+                               .upsert(chunk, on_conflict="dedupe_key", ignore_duplicates=True))
+            inserted += len(res.data or [])
+        return inserted
+
+    def get_diseases(self, columns: str = "id, name") -> List[Dict[str, Any]]:
+        """All rows of `diseases` (the given columns), page by page."""
+        if not self.client: return []
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            res = self.execute(self.client.table("diseases")
+                               .select(columns)
+                               .order("name")
+                               .range(offset, offset + self.READ_PAGE - 1))
+            page = res.data or []
+            rows.extend(page)
+            if len(page) < self.READ_PAGE:
+                return rows
+            offset += self.READ_PAGE
+
+    def upsert_diseases(self, rows: List[Dict[str, Any]]) -> int:
+        """Upsert disease rows by name in one request; errors propagate so callers can retry."""
+        if not self.client or not rows: return 0
+        res = self.execute(self.client.table("diseases").upsert(rows, on_conflict="name"))
+        return len(res.data or [])
+
+    def _chunks(self, rows: List[Dict[str, Any]]):
+        for i in range(0, len(rows), self.WRITE_CHUNK):
+            yield rows[i:i + self.WRITE_CHUNK]
+
+
+_db: Optional[SupabaseClient] = None
+_db_lock = threading.Lock()
+
+
+def get_db() -> SupabaseClient:
+    """
+    Process-wide SupabaseClient, created on first use, so ingestors, the
+    analyzer and the notifier share one connection pool. Pool size and
+    request timeout come from SUPABASE_POOL_SIZE and SUPABASE_TIMEOUT.
+    """
+    global _db
+    with _db_lock:
+        if _db is None:
+            _db = SupabaseClient()
+        return _db
@@ -0,0 +1,247 @@
+import os
+import re
+import time
+import zlib
+import sqlite3
+import threading
+import numpy as np
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from enrichment import stored_summary
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DEDUP_PATH = os.path.join(BACKEND_DIR, ".cache", "dedup.sqlite")
+
+WORD_RE = re.compile(r"[^\W_]+")
+# Dates and counts ("12", "1,234", "4.5"); separators are dropped when comparing
+FIGURE_RE = re.compile(r"\d+(?:[.,\u00a0\u202f ]\d{3})*(?:\.\d+)?")
+
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    """Word n-grams of the lowercased text (whole words for very short texts)."""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return words or [""]
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def figures(text: str) -> str:
+    """The distinct numbers in text (dates, counts), normalized and space-separated."""
+    found = {re.sub(r"[,\u00a0\u202f ]", "", m.group()) for m in FIGURE_RE.finditer(text)}
+    return " ".join(sorted(found))
+
+
+def lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    (bands, rows) with bands * rows == num_perm whose LSH curve midpoint
+    (1/bands)^(1/rows) is the highest one not above `threshold`, so
+    candidates are recalled generously and verified exactly afterwards.
+    """
+    best = (num_perm, 1)
+    best_t = 0.0
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        t = (1.0 / bands) ** (1.0 / rows)
+        if best_t < t <= threshold:
+            best, best_t = (bands, rows), t
+    return best
+
+
+class MinHasher:
+    """
+    MinHash signatures with multiply-shift hash permutations, vectorized
+    over all shingles and permutations at once. Shingles are hashed with
+    CRC32, which (unlike hash()) is stable across processes.
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        return self.signature_of(set(shingles(text)))
+
+    def signature_of(self, shingle_set: Iterable[str]) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingle_set), dtype=np.uint64)
+        # uint64 arithmetic wraps, i.e. runs mod 2^64; the high 32 bits are the hash
+        permuted = (hashes[:, None] * self.a + self.b) >> np.uint64(32)
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of recently stored events, persisted in SQLite so a
+    run starts warm. Keys are "<source_id>:<external_id>"; each entry points
+    to the normalized event that new near-duplicates get linked to.
+    Reworded follow-ups of an outbreak read almost the same as the report
+    they update, so a match also needs every figure (date, count) of the
+    new text to appear in the indexed one, and only copies from another
+    source are linked.
+    """
+
+    # Texts with fewer distinct shingles (e.g. title-only items like
+    # "Cholera - Sudan") are too short to tell updates from copies
+    MIN_SHINGLES = 8
+
+    def __init__(self, threshold: float = 0.6, num_perm: int = 128, path: Optional[str] = None,
+                 max_age_days: int = 30, seed: int = 1):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, seed)
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self.max_age_seconds = max_age_days * 86400
+        self.path = path or os.environ.get("DEDUP_INDEX_PATH", DEFAULT_DEDUP_PATH)
+        # Signatures from a different hash family are not comparable
+        self.version = f"minhash-{num_perm}-{seed}-figures"
+        self.queries = 0
+        self.duplicates = 0
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._event_ids: Dict[str, str] = {}
+        self._figures: Dict[str, frozenset] = {}
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+        self._lock = threading.Lock()
+        self._warm_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                key TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                added_at REAL NOT NULL,
+                figures TEXT NOT NULL DEFAULT ''
+            )
+        """)
+        # Indexes written before figures were recorded
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(signatures)")}
+        if "figures" not in columns:
+            self._conn.execute("ALTER TABLE signatures ADD COLUMN figures TEXT NOT NULL DEFAULT ''")
+        self._conn.commit()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _load(self):
+        cutoff = time.time() - self.max_age_seconds
+        with self._lock:
+            self._conn.execute("DELETE FROM signatures WHERE version != ? OR added_at < ?", (self.version, cutoff))
+            self._conn.commit()
+            rows = self._conn.execute("SELECT key, event_id, signature, figures FROM signatures").fetchall()
+            for key, event_id, blob, text_figures in rows:
+                self._insert(key, np.frombuffer(blob, dtype=np.uint32), event_id, text_figures)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        data = signature.tobytes()
+        step = self.rows * signature.itemsize
+        return [data[i:i + step] for i in range(0, len(data), step)]
+
+    def _insert(self, key: str, signature: np.ndarray, event_id: str, text_figures: str):
+        if key in self._signatures:
+            self._remove(key)
+        self._signatures[key] = signature
+        self._event_ids[key] = event_id
+        self._figures[key] = frozenset(text_figures.split())
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            band.setdefault(band_key, []).append(key)
+
+    def _remove(self, key: str):
+        signature = self._signatures.pop(key)
+        del self._event_ids[key]
+        del self._figures[key]
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            keys = band.get(band_key, [])
+            if key in keys:
+                keys.remove(key)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature of the text, or None if it is too short to deduplicate."""
+        shingle_set = set(shingles(text))
+        if len(shingle_set) < self.MIN_SHINGLES:
+            return None
+        return self.hasher.signature_of(shingle_set)
+
+    def query(self, signature: np.ndarray, text_figures: str = "",
+              exclude_source: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """
+        Most similar indexed event at or above the threshold whose text has
+        all of `text_figures` (see figures()), as (normalized event ID,
+        estimated Jaccard similarity), or None. Events of `exclude_source`
+        are never returned.
+        """
+        own_prefix = f"{exclude_source}:" if exclude_source is not None else None
+        wanted = frozenset(text_figures.split())
+        with self._lock:
+            self.queries += 1
+            candidates = set()
+            for band, band_key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(band.get(band_key, ()))
+            best: Optional[Tuple[str, float]] = None
+            for key in candidates:
+                if (own_prefix and key.startswith(own_prefix)) or not wanted <= self._figures[key]:
+                    continue
+                similarity = float(np.mean(self._signatures[key] == signature))
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (self._event_ids[key], similarity)
+            if best:
+                self.duplicates += 1
+            return best
+
+    def add_many(self, entries: Iterable[Tuple[str, np.ndarray, str, str]]):
+        """Index and persist (key, signature, event_id, figures) entries."""
+        now = time.time()
+        rows = []
+        with self._lock:
+            for key, signature, event_id, text_figures in entries:
+                self._insert(key, signature, event_id, text_figures)
+                rows.append((key, self.version, event_id, signature.tobytes(), now, text_figures))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO signatures (key, version, event_id, signature, added_at, figures) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def warm_from_db(self, db: Any, days: int = 30) -> int:
+        """
+        Index recent stored events when the local file starts empty (e.g. a
+        fresh CI cache). Like queries, they are signed on title and summary:
+        an article body appended by enrichment is left out.
+        """
+        with self._warm_lock:
+            if self._signatures or not db:
+                return 0
+            recent = db.get_recent_events(days)
+            texts = [(e, f"{e['title']} {stored_summary(e['content'])}") for e in recent]
+            signed = [(f"{e['source_id']}:{e['external_id']}", self.signature(text), e['event_id'], figures(text))
+                      for e, text in texts]
+            self.add_many(entry for entry in signed if entry[1] is not None)
+            return len(recent)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queries": self.queries,
+            "duplicates": self.duplicates,
+            "skip_rate": self.duplicates / self.queries if self.queries else 0.0,
+            "entries": len(self._signatures),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_INDEX: Optional[NearDuplicateIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_dedup_index() -> NearDuplicateIndex:
+    """Process-wide index shared by all sources; DEDUP_THRESHOLD tunes similarity."""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = NearDuplicateIndex(threshold=float(os.environ.get("DEDUP_THRESHOLD", 0.6)))
+        return _INDEX
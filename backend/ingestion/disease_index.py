@@ -0,0 +1,200 @@
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from metrics import metrics
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+PAREN_RE = re.compile(r"\(([^)]*)\)")
+
+# Words that don't tell diseases apart ("Nipah virus infection" is "Nipah")
+FILLER_WORDS = {"disease", "diseases", "infection", "infections", "virus", "viral", "the", "of", "new", "and"}
+
+# Marks a trie node or alias shared by more than one disease
+AMBIGUOUS = ""
+
+
+def normalize(name: str) -> str:
+    """Lowercase ASCII words of a name, accents stripped, punctuation dropped."""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return " ".join(WORD_RE.findall(ascii_name.lower()))
+
+
+def content_tokens(normalized: str) -> List[str]:
+    return [t for t in normalized.split() if t not in FILLER_WORDS]
+
+
+def trigrams(text: str) -> List[str]:
+    padded = f"  {text} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class DiseaseIndex:
+    """
+    Resolves extracted disease names to `diseases` rows in memory, so
+    mentions are linked without per-mention lookups. Tried in order:
+    exact name or alias (including parenthesized forms, e.g. "flu" for
+    "Influenza (flu)", and word order), a trie of name words (so "Ebola"
+    finds "Ebola hemorrhagic fever" and "Avian Influenza" finds
+    "Influenza"), then trigram similarity for misspellings. Results are
+    memoized per name.
+    """
+    FUZZY_THRESHOLD = 0.75
+    # Fuzzy candidates scored per lookup, by shared trigram count
+    FUZZY_CANDIDATES = 20
+    MAX_QUERY_TOKENS = 8
+    MAX_CACHED = 10000
+
+    def __init__(self, rows: Iterable[Dict[str, Any]], aliases: Optional[Dict[str, List[str]]] = None):
+        self.names: Dict[str, str] = {}
+        self._exact: Dict[str, str] = {}
+        self._trie: Dict[str, Any] = {}
+        self._grams: Dict[str, List[str]] = {}
+        self._gram_counts: Dict[str, int] = {}
+        self._cache: Dict[str, Tuple[Optional[str], str]] = {}
+        self._lock = threading.Lock()
+        self.counts: Counter = Counter()
+        self.unresolved: Counter = Counter()
+
+        rows = list(rows)
+        for row in rows:
+            self.names[row["id"]] = row["name"]
+            self._add_key(normalize(row["name"]), row["id"], primary=True)
+        for row in rows:
+            for key in self._alias_keys(row["name"]):
+                self._add_key(key, row["id"])
+        for row in rows:
+            for key in {normalize(row["name"]), *self._alias_keys(row["name"])}:
+                if self._exact.get(key) == row["id"]:
+                    self._add_to_trie(content_tokens(key), row["id"])
+                    self._add_to_fuzzy(key, row["id"])
+        if aliases:
+            self.add_aliases(aliases)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @staticmethod
+    def _alias_keys(name: str) -> List[str]:
+        """The name without its parenthesized parts, and each of those parts."""
+        keys = [normalize(PAREN_RE.sub(" ", name))]
+        for inner in PAREN_RE.findall(name):
+            keys.extend(normalize(part) for part in re.split(r"[;,]", inner))
+        return [k for k in keys if content_tokens(k)]
+
+    def _add_key(self, key: str, disease_id: str, primary: bool = False):
+        for k in (key, " ".join(sorted(key.split()))):
+            current = self._exact.get(k)
+            if current is None or (primary and current == AMBIGUOUS):
+                self._exact[k] = disease_id
+            elif current != disease_id and not primary:
+                self._exact[k] = AMBIGUOUS
+
+    def _add_to_trie(self, tokens: List[str], disease_id: str):
+        node = self._trie
+        for token in tokens:
+            node.setdefault("only", disease_id)
+            if node["only"] != disease_id:
+                node["only"] = AMBIGUOUS
+            node = node.setdefault("children", {}).setdefault(token, {})
+        node.setdefault("only", disease_id)
+        if node["only"] != disease_id:
+            node["only"] = AMBIGUOUS
+        node.setdefault("id", disease_id)
+
+    def _add_to_fuzzy(self, key: str, disease_id: str):
+        grams = set(trigrams(key))
+        self._gram_counts[key] = len(grams)
+        for gram in grams:
+            self._grams.setdefault(gram, []).append(key)
+
+    def add_aliases(self, aliases: Dict[str, List[str]]):
+        """
+        Register keyword lists ({canonical name: [alias, ...]}, as used by
+        the extractor): once one of them resolves, all of them map there.
+        """
+        for canonical, words in aliases.items():
+            candidates = [canonical] + list(words)
+            disease_id = next((i for i in map(self._lookup_id, candidates) if i), None)
+            if disease_id:
+                for word in candidates:
+                    self._add_key(normalize(word), disease_id)
+        self._cache.clear()
+
+    def _lookup_id(self, name: str) -> Optional[str]:
+        return self._resolve(normalize(name))[0]
+
+    def _walk(self, tokens: List[str]) -> Optional[str]:
+        """Longest name starting at the first token, or the only name the tokens are a prefix of."""
+        node = self._trie
+        longest = None
+        for token in tokens:
+            node = node.get("children", {}).get(token)
+            if node is None:
+                return longest
+            if node.get("id"):
+                longest = node["id"]
+        return longest or node.get("only") or None
+
+    def _fuzzy(self, key: str) -> Optional[str]:
+        grams = set(trigrams(key))
+        shared: Counter = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        best, best_score = None, 0.0
+        for candidate, common in shared.most_common(self.FUZZY_CANDIDATES):
+            score = 2 * common / (len(grams) + self._gram_counts[candidate])
+            if score > best_score:
+                best, best_score = candidate, score
+        return self._exact[best] if best and best_score >= self.FUZZY_THRESHOLD else None
+
+    def _resolve(self, key: str) -> Tuple[Optional[str], str]:
+        for k in (key, " ".join(sorted(key.split()))):
+            disease_id = self._exact.get(k)
+            if disease_id:
+                return disease_id, "exact"
+        tokens = content_tokens(key)[:self.MAX_QUERY_TOKENS]
+        # Leading qualifiers are skipped one at a time ("Avian Influenza")
+        for start in range(len(tokens)):
+            disease_id = self._walk(tokens[start:])
+            if disease_id:
+                return disease_id, "token"
+        disease_id = self._fuzzy(key) if tokens else None
+        return (disease_id, "fuzzy") if disease_id else (None, "unresolved")
+
+    def resolve(self, name: str) -> Optional[str]:
+        """The `diseases.id` for an extracted disease name, or None."""
+        key = normalize(name)
+        result = self._cache.get(key)
+        if result is None:
+            result = self._resolve(key)
+            if len(self._cache) < self.MAX_CACHED:
+                self._cache[key] = result
+        disease_id, method = result
+        with self._lock:
+            self.counts[method] += 1
+            if not disease_id:
+                self.unresolved[name] += 1
+        metrics.count(f"disease_names_{method}")
+        return disease_id
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self.counts.values())
+        resolved = total - self.counts["unresolved"]
+        return {
+            "mentions": total,
+            "resolved": resolved,
+            "resolution_rate": resolved / total if total else 0.0,
+            "by_method": dict(self.counts),
+            "top_unresolved": self.unresolved.most_common(5),
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        methods = ", ".join(f"{n} {m}" for m, n in sorted(s["by_method"].items()) if m != "unresolved")
+        line = (f"Disease names: {s['resolved']}/{s['mentions']} mentions linked to diseases "
+                f"({s['resolution_rate']:.0%}; {methods or 'none'})")
+        if s["top_unresolved"]:
+            line += "; unresolved: " + ", ".join(f"{n} ({c})" for n, c in s["top_unresolved"])
+        return line
@@ -0,0 +1,272 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urlsplit
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+import requests
+from http_client import get_session
+from concurrency import TokenBucket
+from stream import bounded_map
+from metrics import metrics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_PATH = os.path.join(BACKEND_DIR, ".cache", "article_bodies.sqlite")
+
+# Enriched content is the summary, this separator, then the article body
+BODY_SEPARATOR = "\n\n"
+
+# Never part of an article body
+BOILERPLATE_TAGS = ("script", "style", "noscript", "template", "nav", "header", "footer", "aside", "form",
+                    "iframe", "svg", "button", "select")
+# Class or id words of page furniture ("sf-breadcrumb", "social-share", "related-links")
+BOILERPLATE_NAME_RE = re.compile(
+    r"(?:^|[\s_-])(?:breadcrumbs?|share|sharing|social|related|footer|header|navigation|nav|menu|cookies?|banner|"
+    r"sidebar|promo|subscribe|newsletter|skip|pagination|tags)(?:$|[\s_-])", re.I)
+BLOCK_XPATH = ".//p | .//h2 | .//h3 | .//h4 | .//li | .//td"
+SPACE_RE = re.compile(r"\s+")
+
+
+def body_stored(stored: Optional[str], summary: str) -> bool:
+    """Whether stored content is this summary, alone or with its article body appended."""
+    return stored is not None and (stored == summary or stored.startswith(summary + BODY_SEPARATOR))
+
+
+def stored_summary(stored: str) -> str:
+    """The summary part of stored content (article bodies never contain the separator)."""
+    return stored.rsplit(BODY_SEPARATOR, 1)[0]
+
+
+def extract_article_body(html: str) -> str:
+    """
+    The article text of a page: scripts, navigation, headers, footers and
+    share/related blocks are dropped, then the element holding the most
+    paragraph text is kept as the body. Blocks (paragraphs, headings, list
+    items) are returned one per line.
+    """
+    # Imported here: only enrichment (and the scraping fallback) need lxml
+    import lxml.html
+
+    if not html.strip():
+        return ""
+    root = lxml.html.fromstring(html)
+    for element in root.xpath(" | ".join(f"//{tag}" for tag in BOILERPLATE_TAGS)):
+        element.drop_tree()
+    for element in root.xpath("//body//*[@class or @id]"):
+        name = f"{element.get('class', '')} {element.get('id', '')}"
+        if element.tag not in ("main", "article") and BOILERPLATE_NAME_RE.search(name):
+            element.drop_tree()
+
+    # Each paragraph scores its parent, and half as much its grandparent
+    scores: Dict[Any, float] = {}
+    for p in root.iter("p"):
+        length = len(SPACE_RE.sub(" ", p.text_content()).strip())
+        parent = p.getparent()
+        if parent is None or length == 0:
+            continue
+        scores[parent] = scores.get(parent, 0.0) + length
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = scores.get(grandparent, 0.0) + length / 2
+    candidates = root.xpath("//article | //main | //*[@itemprop='articleBody']")
+    container = max(scores, key=scores.get) if scores else (candidates[0] if candidates else root)
+
+    blocks = []
+    for element in container.xpath(BLOCK_XPATH) or [container]:
+        text = SPACE_RE.sub(" ", element.text_content()).strip()
+        if text:
+            blocks.append(text)
+    # Nested blocks (a paragraph inside a list item) repeat text
+    return "\n".join(dict.fromkeys(blocks))
+
+
+class BodyCache:
+    """
+    On-disk cache of extracted article bodies, keyed by URL plus the page's
+    ETag (or Last-Modified, or content hash when the server sends neither).
+    The validators are replayed on the next fetch; an unchanged page is
+    answered from here without downloading or parsing it again. A path of
+    ":memory:" keeps the cache in memory for the process only.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 50000, max_age_days: int = 180):
+        self.path = path or os.environ.get("ARTICLE_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+        self._lock = threading.Lock()
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS bodies (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                sha256 TEXT NOT NULL,
+                body TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self.evict()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, sha256, body, fetched_at FROM bodies WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "sha256": row[2], "body": row[3], "fetched_at": row[4]}
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], sha256: str, body: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO bodies (url, etag, last_modified, sha256, body, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, sha256, body, time.time())
+            )
+            self._conn.commit()
+
+    def evict(self):
+        """Drops expired entries, then trims to max_entries (oldest first)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM bodies WHERE fetched_at < ?", (time.time() - self.max_age_seconds,))
+            self._conn.execute(
+                "DELETE FROM bodies WHERE url IN ("
+                "SELECT url FROM bodies ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ArticleEnricher:
+    """
+    Fetches the page of each item (`raw_url`) on a bounded worker pool and
+    appends its article body to the summary in `content`, so extraction
+    sees the whole report. Each host gets at most `per_host` requests in
+    flight and `host_rpm` requests per minute; bodies are cached per
+    URL and ETag, and a body cached less than REUSE_DAYS ago is used
+    without a request. A page that fails or has no body leaves the item
+    as is.
+    """
+    WORKERS = 8
+    PER_HOST = 2
+    HOST_RPM = 120
+    # Published reports rarely change; revalidate cached bodies after this long
+    REUSE_DAYS = 30
+    # A shorter "body" is page furniture, not an article
+    MIN_BODY_CHARS = 200
+    MAX_BODY_CHARS = 20000
+
+    def __init__(self, session: Optional[requests.Session] = None, headers: Optional[Dict[str, str]] = None,
+                 cache: Optional[BodyCache] = None, workers: int = WORKERS, per_host: int = PER_HOST,
+                 host_rpm: Optional[float] = HOST_RPM, timeout: float = 15):
+        self.session = session or get_session()
+        self.headers = {**(headers or {}), "Accept": "text/html,application/xhtml+xml"}
+        self.cache = cache or BodyCache()
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
+        self.host_rpm = host_rpm
+        self.timeout = timeout
+        self._hosts: Dict[str, Tuple[threading.Semaphore, Optional[TokenBucket]]] = {}
+        self._hosts_lock = threading.Lock()
+
+    def _host_limits(self, url: str) -> Tuple[threading.Semaphore, Optional[TokenBucket]]:
+        host = urlsplit(url).netloc.lower()
+        with self._hosts_lock:
+            limits = self._hosts.get(host)
+            if limits is None:
+                bucket = TokenBucket(self.host_rpm, burst=self.per_host) if self.host_rpm else None
+                limits = self._hosts[host] = (threading.Semaphore(self.per_host), bucket)
+            return limits
+
+    def fetch_body(self, url: str, budget: Optional[threading.Semaphore] = None) -> Optional[str]:
+        """
+        The article body at url, from the cache when it is recent or the
+        page is unchanged. None if the page would need a request and
+        `budget` (one permit per request) is spent.
+        """
+        cached = self.cache.get(url)
+        if cached and time.time() - cached["fetched_at"] < self.REUSE_DAYS * 86400:
+            metrics.count("article_bodies_cached")
+            return cached["body"]
+        if budget is not None and not budget.acquire(blocking=False):
+            metrics.count("article_fetches_over_limit")
+            return None
+        headers = dict(self.headers)
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        slots, bucket = self._host_limits(url)
+        with slots:
+            if bucket:
+                bucket.acquire()
+            metrics.count("article_requests")
+            with metrics.timer("article_fetch"):
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 429 and bucket:
+            bucket.penalize()
+        if response.status_code != 200 and not (response.status_code == 304 and cached):
+            raise RuntimeError(f"{url} returned status {response.status_code}")
+
+        etag = response.headers.get("ETag")
+        html = response.text if response.status_code == 200 else ""
+        digest = hashlib.sha256(html.encode("utf-8")).hexdigest()
+        if cached and (response.status_code == 304 or (etag and etag == cached["etag"]) or digest == cached["sha256"]):
+            # Still current: reuse the body for another REUSE_DAYS
+            metrics.count("article_bodies_cached")
+            self.cache.put(url, cached["etag"], cached["last_modified"], cached["sha256"], cached["body"])
+            return cached["body"]
+        with metrics.timer("article_parse"):
+            body = extract_article_body(html)[:self.MAX_BODY_CHARS]
+        if len(body) < self.MIN_BODY_CHARS:
+            body = ""
+        self.cache.put(url, etag, response.headers.get("Last-Modified"), digest, body)
+        return body
+
+    def enrich(self, event: Dict[str, Any], budget: Optional[threading.Semaphore] = None) -> Dict[str, Any]:
+        """The event with its article body appended to `content` (unchanged if there is none)."""
+        url = event.get("raw_url")
+        if not url or not url.startswith("http"):
+            return event
+        body = self.fetch_body(url, budget)
+        summary = event.get("content") or ""
+        if not body or body == summary:
+            return event
+        metrics.count("articles_enriched")
+        return {**event, "content": summary + BODY_SEPARATOR + body}
+
+    def enrich_all(self, events: Iterable[Dict[str, Any]], deadline: Optional[float] = None,
+                   max_fetches: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Enrich a stream of events concurrently, yielding them as they
+        complete. Past `deadline` (time.monotonic()) or once `max_fetches`
+        page requests were made, events without a cached body pass through
+        as they are; a failed fetch passes the event through too.
+        """
+        budget = threading.Semaphore(max_fetches) if max_fetches is not None else None
+
+        def enrich(event: Dict[str, Any]) -> Dict[str, Any]:
+            if deadline and time.monotonic() > deadline:
+                return event
+            return self.enrich(event, budget)
+
+        for event, enriched, error in bounded_map(enrich, events, workers=self.workers,
+                                                  max_in_flight=self.workers * 2):
+            if error:
+                metrics.count("article_fetch_failures")
+                print(f"Article fetch failed for {event.get('raw_url')}: {error}")
+                yield event
+            else:
+                yield enriched
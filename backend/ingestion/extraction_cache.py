@@ -0,0 +1,118 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Any, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_PATH = os.path.join(BACKEND_DIR, ".cache", "extraction.sqlite")
+
+
+class ExtractionCache:
+    """
+    On-disk cache of LLM extraction results, keyed by content hash.
+    Keys combine the normalized event text with a version string, so
+    changing the prompt, model or keyword lists invalidates old entries.
+    """
+
+    def __init__(self, version: str, path: Optional[str] = None,
+                 max_entries: int = 50000, max_age_days: int = 90):
+        self.version = version
+        self.path = path or os.environ.get("EXTRACTION_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._writes_since_evict = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS extractions (
+                key TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_last_used ON extractions(last_used_at)")
+        self._conn.commit()
+        self.evict()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapses whitespace so formatting-only changes still hit."""
+        return re.sub(r"\s+", " ", text).strip()
+
+    def key_for(self, text: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(self.version.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(self.normalize(text).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, text: str) -> Optional[Dict[str, Any]]:
+        key = self.key_for(text)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, created_at FROM extractions WHERE key = ? AND version = ?",
+                (key, self.version)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE extractions SET last_used_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, text: str, result: Dict[str, Any]):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, version, result, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.key_for(text), self.version, json.dumps(result), now, now)
+            )
+            self._conn.commit()
+            self._writes_since_evict += 1
+            due = self._writes_since_evict >= 500
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Drops stale-version and expired entries, then trims to max_entries (LRU)."""
+        cutoff = time.time() - self.max_age_seconds
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM extractions WHERE version != ? OR created_at < ?",
+                (self.version, cutoff)
+            )
+            self._conn.execute(
+                "DELETE FROM extractions WHERE key IN ("
+                "SELECT key FROM extractions ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+            self._writes_since_evict = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,336 @@
+import os
+import re
+import csv
+import mmap
+import struct
+import hashlib
+import threading
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from disease_index import normalize
+from metrics import metrics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SOURCE_PATH = os.path.join(BACKEND_DIR, "data", "gazetteer.csv")
+DEFAULT_INDEX_PATH = os.path.join(BACKEND_DIR, ".cache", "gazetteer.idx")
+
+# Coarsest first
+LEVELS = ("country", "region", "city")
+
+# Index layout: header, one offset per key, one offset per place, then a blob
+# of "key\tplace,place\n" lines (sorted by key) and "level\tiso2\t...\n" lines
+MAGIC = b"GAZ1"
+HEADER = struct.Struct("<4s16sII")  # magic, source digest, key count, place count
+OFFSET = struct.Struct("<I")
+
+TOKEN_RE = re.compile(r"[^\W\d_]+(?:['’.][^\W\d_]+)*")
+POSSESSIVE_RE = re.compile(r"['’]s$")
+# Gaps allowed inside a place name: spaces, a hyphen ("Guinea-Bissau"),
+# or the dot of an abbreviation ("St. Lucia")
+SPACE_RE = re.compile(r"[ \t]+")
+ABBREVIATION_RE = re.compile(r"\.[ \t]+")
+MAX_ABBREVIATION = 3
+
+# A place name followed by one of these names a pathogen ("Sudan virus",
+# "Congo Basin clade")...
+PATHOGEN_WORDS = {"fever", "virus", "viruses", "ebolavirus", "disease", "worm", "encephalitis", "flu",
+                  "influenza", "syndrome", "variant", "strain", "lineage", "clade", "basin"}
+# ...and preceded by one of these, a landmark ("Lake Victoria", "River Niger")
+LANDMARK_WORDS = {"lake", "mount", "mt", "river"}
+
+
+def place_key(name: str) -> str:
+    """Normalized lookup key; typographic apostrophes split words like ASCII ones ("Côte d’Ivoire")."""
+    return normalize(name.replace("’", "'"))
+
+
+def source_digest(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).digest()
+
+
+def read_places(path: str) -> List[Dict[str, str]]:
+    """Rows of the bundled gazetteer CSV; lines starting with # are comments."""
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(line for line in f if not line.startswith("#")))
+    for row in rows:
+        if row["level"] not in LEVELS:
+            raise ValueError(f"Unknown level {row['level']!r} for {row['name']} in {path}")
+    return rows
+
+
+def build_index(source_path: str, index_path: str, digest: Optional[bytes] = None):
+    """Compile the gazetteer CSV into the memory-mapped lookup index."""
+    rows = read_places(source_path)
+    countries = {row["iso2"]: row["name"] for row in rows if row["level"] == "country"}
+    keys: Dict[str, List[int]] = {}
+    places = []
+    for i, row in enumerate(rows):
+        admin1 = row["admin1"] if row["level"] == "city" else ""
+        places.append("\t".join([row["level"], row["iso2"], countries.get(row["iso2"], ""), admin1,
+                                 row["name"], row["lat"], row["lon"]]).encode("utf-8") + b"\n")
+        for name in [row["name"], *row["aliases"].split(";")]:
+            ids = keys.setdefault(place_key(name), [])
+            if i not in ids:
+                ids.append(i)
+    keys.pop("", None)
+    entries = [f"{key}\t{','.join(map(str, ids))}\n".encode("ascii") for key, ids in sorted(keys.items())]
+
+    offsets, position = [], 0
+    for entry in entries + places:
+        offsets.append(position)
+        position += len(entry)
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, digest or source_digest(source_path), len(entries), len(places)))
+        f.write(b"".join(OFFSET.pack(o) for o in offsets))
+        f.write(b"".join(entries + places))
+    os.replace(tmp_path, index_path)
+
+
+class Gazetteer:
+    """
+    Offline lookup of countries, admin-1 regions and major cities, with
+    ISO2 codes and coordinates, from the bundled data/gazetteer.csv.
+    The CSV is compiled once into a sorted index under backend/.cache
+    (again whenever the CSV changes) that is memory-mapped and
+    binary-searched, so loading takes a millisecond and nothing is
+    parsed up front. locate() finds the longest place name at each
+    capitalized word of a text, walking the sorted keys word by word
+    the way a trie would.
+    """
+    MAX_WORDS = 8
+    MAX_CACHED = 10000
+
+    def __init__(self, path: Optional[str] = None, source_path: Optional[str] = None):
+        self.source_path = source_path or DEFAULT_SOURCE_PATH
+        self.path = path or os.environ.get("GAZETTEER_INDEX_PATH", DEFAULT_INDEX_PATH)
+        digest = source_digest(self.source_path)
+        if not self._is_current(digest):
+            build_index(self.source_path, self.path, digest)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _, _, self.key_count, self.place_count = HEADER.unpack_from(self._mm, 0)
+        self._key_offsets = HEADER.size
+        self._place_offsets = self._key_offsets + OFFSET.size * self.key_count
+        self._blob = self._place_offsets + OFFSET.size * self.place_count
+        self._places: Dict[int, Dict[str, Any]] = {}
+        # Key range per first word; most capitalized words end here
+        self._first_words: Dict[str, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return self.place_count
+
+    def _is_current(self, digest: bytes) -> bool:
+        try:
+            with open(self.path, "rb") as f:
+                magic, stored, _, _ = HEADER.unpack(f.read(HEADER.size))
+        except (OSError, struct.error):
+            return False
+        return magic == MAGIC and stored == digest
+
+    def _entry_start(self, table: int, i: int) -> int:
+        return self._blob + OFFSET.unpack_from(self._mm, table + OFFSET.size * i)[0]
+
+    def _key(self, i: int) -> bytes:
+        start = self._entry_start(self._key_offsets, i)
+        return self._mm[start:self._mm.find(b"\t", start)]
+
+    def _key_places(self, i: int) -> List[int]:
+        start = self._mm.find(b"\t", self._entry_start(self._key_offsets, i)) + 1
+        return [int(p) for p in self._mm[start:self._mm.find(b"\n", start)].split(b",")]
+
+    def _range(self, prefix: bytes, lo: int, hi: int) -> Tuple[int, int]:
+        """The keys within [lo, hi) that start with prefix, as a narrower [lo, hi)."""
+        end = hi
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        start, hi = lo, end
+        # Keys with the prefix come first among those not below it
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid).startswith(prefix):
+                lo = mid + 1
+            else:
+                hi = mid
+        return start, lo
+
+    def place(self, i: int) -> Dict[str, Any]:
+        place = self._places.get(i)
+        if place is None:
+            start = self._entry_start(self._place_offsets, i)
+            line = self._mm[start:self._mm.find(b"\n", start)].decode("utf-8")
+            level, iso2, country, admin1, name, lat, lon = line.split("\t")
+            place = {
+                "name": name,
+                "level": level,
+                "iso2": iso2,
+                "country": country,
+                "region": name if level == "region" else admin1 or None,
+                "city": name if level == "city" else None,
+                "latitude": float(lat),
+                "longitude": float(lon),
+            }
+            self._places[i] = place
+        return place
+
+    def lookup(self, name: str) -> List[Dict[str, Any]]:
+        """Every place with exactly this name or alias."""
+        key = place_key(name).encode("ascii")
+        lo, hi = self._range(key, 0, self.key_count)
+        if lo == hi or self._key(lo) != key:
+            return []
+        return [self.place(i) for i in self._key_places(lo)]
+
+    @staticmethod
+    def _joined(text: str, prev: re.Match, token: re.Match) -> bool:
+        gap = text[prev.end():token.start()]
+        return bool(SPACE_RE.fullmatch(gap) or gap == "-"
+                    or (ABBREVIATION_RE.fullmatch(gap) and len(prev.group()) <= MAX_ABBREVIATION))
+
+    def _first_word_range(self, word: str) -> Tuple[int, int]:
+        found = self._first_words.get(word)
+        if found is None:
+            found = self._range(word.encode("ascii"), 0, self.key_count)
+            if len(self._first_words) < self.MAX_CACHED:
+                self._first_words[word] = found
+        return found
+
+    def _longest(self, text: str, tokens: List[re.Match], start: int) -> Optional[Tuple[int, int]]:
+        """(last token, key index) of the longest place name starting at tokens[start]."""
+        best = None
+        key = ""
+        lo, hi = 0, self.key_count
+        for j in range(start, min(start + self.MAX_WORDS, len(tokens))):
+            if j > start and not self._joined(text, tokens[j - 1], tokens[j]):
+                break
+            raw = tokens[j].group()
+            stem = POSSESSIVE_RE.sub("", raw)
+            word = place_key(stem)
+            if not word:
+                break
+            if j == start:
+                key = word
+                lo, hi = self._first_word_range(word)
+            else:
+                key = f"{key} {word}"
+                lo, hi = self._range(key.encode("ascii"), lo, hi)
+            if lo == hi:
+                break
+            if self._key(lo) == key.encode("ascii"):
+                best = (j, lo)
+            # "Uganda's Ministry": a possessive ends the name
+            if stem != raw:
+                break
+        return best
+
+    def _scan(self, text: str, any_case: bool = False) -> List[Tuple[int, List[int]]]:
+        """(offset, candidate place IDs) for each place name in text, in order of mention."""
+        tokens = list(TOKEN_RE.finditer(text))
+        found = []
+        last_end = -1
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            hyphenated = i > 0 and text[tokens[i - 1].end():token.start()] == "-"
+            # "Crimean-Congo" is not the Congo, but "DRC-Uganda" is Uganda
+            if (not any_case and not token.group()[0].isupper()) or (hyphenated and last_end != i - 1):
+                i += 1
+                continue
+            match = self._longest(text, tokens, i)
+            if match is None:
+                i += 1
+                continue
+            end, key = match
+            after = tokens[end + 1] if end + 1 < len(tokens) else None
+            before = tokens[i - 1] if i > 0 else None
+            if ((after is not None and self._joined(text, tokens[end], after)
+                 and place_key(after.group()) in PATHOGEN_WORDS)
+                    or (before is not None and self._joined(text, before, token)
+                        and place_key(before.group()) in LANDMARK_WORDS)):
+                i = end + 1
+                continue
+            found.append((token.start(), self._key_places(key)))
+            last_end = end
+            i = end + 1
+        return found
+
+    def _choose(self, ids: List[int], context: set) -> int:
+        """A place in a country mentioned elsewhere, then the coarsest, then the first listed."""
+        in_context = [i for i in ids if self.place(i)["iso2"] in context] or ids
+        return min(in_context, key=lambda i: LEVELS.index(self.place(i)["level"]))
+
+    def locate(self, text: str, names: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """
+        Places named in text, plus extra names from elsewhere (e.g. the LLM's
+        location list, matched regardless of case), in order of first
+        mention with a "mentions" count and the "offsets" of its mentions
+        in text. Ambiguous names ("Georgia", "Punjab") go to a country the
+        text mentions unambiguously. Extra names that match nothing are
+        kept as bare country names.
+        """
+        matches = self._scan(text)
+        unresolved = []
+        for name in names:
+            if not isinstance(name, str) or not name.strip():
+                continue
+            found = self._scan(name, any_case=True)
+            matches.extend((None, ids) for _, ids in found)
+            if not found:
+                unresolved.append(name.strip())
+
+        context = set()
+        for _, ids in matches:
+            codes = {self.place(i)["iso2"] for i in ids}
+            if len(codes) == 1:
+                context |= codes
+        mentions: Counter = Counter()
+        offsets: Dict[int, List[int]] = {}
+        for offset, ids in matches:
+            i = self._choose(ids, context)
+            mentions[i] += 1
+            positions = offsets.setdefault(i, [])
+            if offset is not None:
+                positions.append(offset)
+
+        metrics.count("places_located", len(mentions))
+        metrics.count("place_names_unresolved", len(unresolved))
+        places = [{**self.place(i), "mentions": n, "offsets": offsets[i]} for i, n in mentions.items()]
+        for name in dict.fromkeys(unresolved):
+            places.append({"name": name, "level": None, "iso2": None, "country": name, "region": None,
+                           "city": None, "latitude": None, "longitude": None, "mentions": 1, "offsets": []})
+        return places
+
+
+def geo_summary(places: List[Dict[str, Any]]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (iso2, geo_level) for an event: the country mentioned most (first
+    mentioned on ties) and the finest level named within it.
+    """
+    by_country: Counter = Counter()
+    for place in places:
+        if place["iso2"]:
+            by_country[place["iso2"]] += place["mentions"]
+    if not by_country:
+        return None, None
+    iso2 = max(by_country, key=by_country.get)
+    level = max((p["level"] for p in places if p["iso2"] == iso2), key=LEVELS.index)
+    return iso2, level
+
+
+_GAZETTEER: Optional[Gazetteer] = None
+_GAZETTEER_LOCK = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Process-wide gazetteer, loaded on first use."""
+    global _GAZETTEER
+    with _GAZETTEER_LOCK:
+        if _GAZETTEER is None:
+            _GAZETTEER = Gazetteer()
+        return _GAZETTEER
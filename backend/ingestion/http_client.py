@@ -0,0 +1,133 @@
+import os
+import json
+import hashlib
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Any, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_HTTP_CACHE_DIR = os.path.join(BACKEND_DIR, ".cache", "http")
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size: int = 10) -> requests.Session:
+    """
+    Process-wide keep-alive session, so every fetch reuses pooled
+    connections instead of a fresh TCP/TLS handshake per request.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504],
+                            allowed_methods=["GET", "HEAD"])
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+class FetchResult:
+    def __init__(self, status: int, body: str, not_modified: bool = False, from_cache: bool = False):
+        self.status = status
+        self.body = body
+        # True when the payload is unchanged since the last run (304 or same hash)
+        self.not_modified = not_modified
+        self.from_cache = from_cache
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class CachedFetcher:
+    """
+    Conditional GETs backed by an on-disk response cache.
+    Stored ETag/Last-Modified validators are replayed on the next request;
+    a 304 is answered from disk without re-downloading the payload.
+    With `defer_validators`, fresh responses are held until commit(), so a
+    caller can save them only once it has stored what the pages contained.
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, cache_dir: Optional[str] = None,
+                 timeout: int = 15, session: Optional[requests.Session] = None, defer_validators: bool = False):
+        self.headers = headers or {}
+        self.cache_dir = cache_dir or os.environ.get("HTTP_CACHE_DIR", DEFAULT_HTTP_CACHE_DIR)
+        self.timeout = timeout
+        self.session = session or get_session()
+        self.defer_validators = defer_validators
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._pending_lock = threading.Lock()
+
+    def _cache_path(self, url: str, params: Optional[Dict[str, Any]]) -> str:
+        key = url + "?" + json.dumps(params or {}, sort_keys=True)
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _load(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, path: str, entry: Dict[str, Any]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None) -> FetchResult:
+        path = self._cache_path(url, params)
+        cached = self._load(path)
+
+        headers = dict(self.headers)
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304 and cached:
+            return FetchResult(200, cached["body"], not_modified=True, from_cache=True)
+
+        if response.status_code == 200:
+            body = response.text
+            digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+            entry = {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "sha256": digest,
+                "body": body,
+            }
+            if self.defer_validators:
+                with self._pending_lock:
+                    self._pending[path] = entry
+            else:
+                self._store(path, entry)
+            # Servers without validators still let us skip parsing identical payloads
+            unchanged = bool(cached) and cached.get("sha256") == digest
+            return FetchResult(200, body, not_modified=unchanged)
+
+        return FetchResult(response.status_code, response.text)
+
+    def commit(self) -> int:
+        """Save the validators of every deferred response; returns how many were saved."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for path, entry in pending.items():
+            self._store(path, entry)
+        return len(pending)
+
+    def discard(self) -> int:
+        """Drop deferred responses, so their pages are fetched and parsed again next time."""
+        with self._pending_lock:
+            dropped, self._pending = len(self._pending), {}
+        return dropped
@@ -0,0 +1,38 @@
+"""
+Keyword tables shared by extraction (matcher, count extractor) and
+storage (disease linking). Kept free of imports so either side can use
+them without pulling in the other.
+"""
+
+# Canonical disease names and the keywords that mention them
+DISEASE_KEYWORDS = {
+    "Cholera": ["Cholera"],
+    "Mpox": ["Mpox", "monkeypox"],
+    "Ebola": ["Ebola", "EVD"],
+    "Dengue": ["Dengue", "DENV"],
+    "Nipah": ["Nipah", "NiV"],
+    "Avian Influenza": ["Avian Influenza", "H5N1", "H7N9", "H5N6", "H9N2"],
+    "COVID-19": ["COVID-19", "Coronavirus", "SARS-CoV-2", "SARS-2"],
+    "Oropouche": ["Oropouche", "OROV"],
+    "Zika": ["Zika", "ZIKV"],
+    "Polio": ["Polio", "Poliomyelitis", "cVDPV2", "WPV1"],
+    "Marburg": ["Marburg", "MVD"],
+    "Lassa Fever": ["Lassa Fever"],
+    "Yellow Fever": ["Yellow Fever"],
+    "Anthrax": ["Anthrax"],
+    "Measles": ["Measles"]
+}
+
+# Country names the keyword matcher recognizes
+COUNTRIES = [
+    "Afghanistan", "Angola", "Argentina", "Australia", "Bangladesh", "Benin", "Bolivia", "Brazil", 
+    "Burkina Faso", "Burundi", "Cambodia", "Cameroon", "Canada", "Central African Republic", "Chad", 
+    "Chile", "China", "Colombia", "Congo", "Costa Rica", "Côte d'Ivoire", "Cuba", "DRC", "Democratic Republic of the Congo",
+    "Ecuador", "Egypt", "Ethiopia", "France", "Gabon", "Gambia", "Germany", "Ghana", "Guinea", "Guyana", 
+    "Haiti", "India", "Indonesia", "Iraq", "Italy", "Japan", "Jordan", "Kazakhstan", "Kenya", "Laos", 
+    "Liberia", "Madagascar", "Malawi", "Malaysia", "Mali", "Mauritania", "Mexico", "Mongolia", "Morocco", 
+    "Mozambique", "Myanmar", "Namibia", "Nepal", "Niger", "Nigeria", "Pakistan", "Panama", "Papua New Guinea", 
+    "Paraguay", "Peru", "Philippines", "Rwanda", "Saudi Arabia", "Senegal", "Sierra Leone", "Somalia", 
+    "South Africa", "South Sudan", "Spain", "Sri Lanka", "Sudan", "Tanzania", "Thailand", "Togo", "Uganda", 
+    "United Kingdom", "USA", "United States", "Vietnam", "Yemen", "Zambia", "Zimbabwe"
+]
@@ -0,0 +1,87 @@
+import re
+from typing import Any, Dict, List, Iterable, Tuple, Optional
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Builds a regex alternation shaped like a trie of the given words.
+    At any text position the engine only walks as deep as the longest
+    keyword, so matching cost stays linear in text length no matter
+    how many aliases are added.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True  # end-of-word marker
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = []
+        for ch in sorted(c for c in node if c):
+            branches.append(re.escape(ch) + build(node[ch]))
+        if "" in node:
+            branches.append("")
+        if not branches:
+            return ""
+        if len(branches) == 1:
+            return branches[0]
+        # The empty branch comes last so the longest keyword wins,
+        # e.g. "Nigeria" is tried before "Niger"
+        return "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+class EntityMatcher:
+    """
+    Single-pass matcher for disease and country keywords.
+    Compiles every alias into one pattern so each event is scanned once
+    instead of once per keyword. Diseases match case-insensitively,
+    countries are case-sensitive (e.g. "Chad" vs "chad").
+    """
+
+    def __init__(self, disease_keywords: Dict[str, List[str]], countries: List[str]):
+        self.disease_lookup: Dict[str, str] = {}
+        for disease, keywords in disease_keywords.items():
+            for kw in keywords:
+                self.disease_lookup[kw.lower()] = disease
+        self.country_lookup: Dict[str, str] = {c: c for c in countries}
+
+        disease_alt = _trie_pattern(self.disease_lookup.keys())
+        country_alt = _trie_pattern(self.country_lookup.keys())
+        self.pattern = re.compile(
+            rf"\b(?:(?P<disease>(?i:{disease_alt}))|(?P<country>{country_alt}))\b"
+        )
+
+    def match(self, text: str) -> Tuple[List[str], List[str]]:
+        """Returns (diseases, countries) found in text, as canonical names."""
+        diseases = set()
+        countries = set()
+        for m in self.pattern.finditer(text):
+            if m.group("disease") is not None:
+                diseases.add(self.disease_lookup[m.group("disease").lower()])
+            else:
+                countries.add(self.country_lookup[m.group("country")])
+        return list(diseases), list(countries)
+
+    def disease_offsets(self, text: str) -> List[Tuple[int, str]]:
+        """(offset, canonical name) of each disease keyword in text."""
+        return [(m.start(), self.disease_lookup[m.group("disease").lower()])
+                for m in self.pattern.finditer(text) if m.group("disease") is not None]
+
+
+_MATCHER_CACHE: Dict[int, EntityMatcher] = {}
+
+
+def get_matcher(disease_keywords: Dict[str, List[str]], countries: List[str]) -> EntityMatcher:
+    """Returns a process-wide matcher, compiling it on first use."""
+    key = hash((
+        tuple((d, tuple(kws)) for d, kws in disease_keywords.items()),
+        tuple(countries),
+    ))
+    matcher: Optional[EntityMatcher] = _MATCHER_CACHE.get(key)
+    if matcher is None:
+        matcher = EntityMatcher(disease_keywords, countries)
+        _MATCHER_CACHE[key] = matcher
+    return matcher
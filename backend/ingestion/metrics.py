@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Latency bucket upper bounds in seconds (Prometheus-style, cumulative on export)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "max": round(self.max, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "buckets": {str(b): c for b, c in zip(list(self.buckets) + ["+Inf"], self.counts)},
+        }
+
+
+class Metrics:
+    """
+    Thread-safe timers and counters for one pipeline run.
+    `timer` works as a context manager, `timed` as a decorator; both record
+    into a latency histogram and count failures when the block raises.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters: Dict[str, float] = {}
+            self.histograms: Dict[str, Histogram] = {}
+            self.started = time.time()
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.count(f"{name}_failures")
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed(self, name: str) -> Callable:
+        def decorator(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started_at": self.started,
+                "duration_seconds": round(time.time() - self.started, 3),
+                "counters": dict(sorted(self.counters.items())),
+                "timers": {name: h.to_dict() for name, h in sorted(self.histograms.items())},
+            }
+
+    def to_prometheus(self, prefix: str = "outbreak_pipeline") -> str:
+        """Prometheus text exposition format (for the node_exporter textfile collector)."""
+        snap = self.snapshot()
+        lines = []
+        for name, value in snap["counters"].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        for name, h in snap["timers"].items():
+            metric = f"{prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in h["buckets"].items():
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"{metric}_sum {h['sum']}")
+            lines.append(f"{metric}_count {h['count']}")
+        lines.append(f"# TYPE {prefix}_duration_seconds gauge")
+        lines.append(f"{prefix}_duration_seconds {snap['duration_seconds']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, textfile: Optional[str] = None, json_path: Optional[str] = None):
+        """Write the Prometheus textfile and/or JSON snapshot (atomically)."""
+        outputs: List[tuple] = []
+        if textfile:
+            outputs.append((textfile, self.to_prometheus()))
+        if json_path:
+            outputs.append((json_path, json.dumps(self.snapshot(), indent=2)))
+        for path, body in outputs:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(body)
+            os.replace(tmp, path)
+
+    def summary(self) -> str:
+        snap = self.snapshot()
+        parts = [f"{name}={value:g}" for name, value in snap["counters"].items()]
+        parts += [f"{name}: {h['count']}x, mean {h['mean'] * 1000:.1f}ms, max {h['max'] * 1000:.1f}ms"
+                  for name, h in snap["timers"].items()]
+        return "; ".join(parts)
+
+
+# Process-wide registry shared by every pipeline component
+metrics = Metrics()
@@ -1,33 +1,244 @@
 import os
-from datetime import datetime
-from db_client import SupabaseClient
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from db_client import SupabaseClient, get_db
+from metrics import metrics
 
-class Notifier:
-    def __init__(self):
-        self.db = SupabaseClient()
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTBOX_PATH = os.path.join(BACKEND_DIR, ".cache", "alert_outbox.sqlite")
+
+SEVERITY_RANK = {"info": 0, "medium": 1, "high": 2, "critical": 3}
+
+
+class DatabaseChannel:
+    """Delivers alerts to the `alerts` table, one bulk upsert per flush."""
+    name = "db"
+
+    def __init__(self, db: SupabaseClient):
+        self.db = db
+
+    def deliver(self, alerts: List[Dict[str, Any]]):
+        self.db.insert_alerts([{**a, "is_read": False} for a in alerts])
+
+
+class FileChannel:
+    """
+    Local stand-in for email/webhook delivery: appends each alert as a
+    JSON line to a file.
+    """
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
 
-    def send_alert(self, type: str, severity: str, message: str):
+    def deliver(self, alerts: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for a in alerts:
+                f.write(json.dumps(a) + "\n")
+
+
+class AlertOutbox:
+    """
+    On-disk outbox between alert producers and delivery channels.
+    Repeats of the same (type, series key, window) are dropped, so a spike
+    re-detected on every run of the day alerts once. Queued alerts are
+    delivered in bulk once MAX_PENDING accumulate, FLUSH_INTERVAL seconds
+    after the previous flush, or on flush()/close(); each channel has its
+    own worker thread, so producers never wait on delivery. Bursts of
+    COALESCE_MIN or more alerts of one type go out as a single summary.
+    """
+    MAX_PENDING = 100
+    FLUSH_INTERVAL = 30.0
+    COALESCE_MIN = 5
+    # Series named in a summary message before "+N more"
+    SUMMARY_KEYS = 10
+    # Delivered (and undeliverable) alerts are forgotten after this long
+    RETENTION_DAYS = 7
+
+    def __init__(self, channels: List[Any], path: Optional[str] = None, window_hours: Optional[float] = None):
+        self.channels = channels
+        self.path = path or os.environ.get("ALERT_OUTBOX_PATH", DEFAULT_OUTBOX_PATH)
+        self.window_seconds = float(window_hours or os.environ.get("ALERT_WINDOW_HOURS", 24)) * 3600
+        self._lock = threading.Lock()
+        self._workers = {c.name: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"alerts-{c.name}")
+                         for c in channels}
+        self._last_flush = time.monotonic()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                dedupe_key TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                alert TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                delivered_at REAL,
+                PRIMARY KEY (dedupe_key, channel)
+            )
+        """)
+        self._conn.execute("DELETE FROM outbox WHERE created_at < ?", (time.time() - self.RETENTION_DAYS * 86400,))
+        self._conn.commit()
+        # Alerts left undelivered by an earlier run go out with the next flush
+        self._pending = self._conn.execute("SELECT COUNT(*) FROM outbox WHERE delivered_at IS NULL").fetchone()[0]
+
+    def dedupe_key(self, type: str, series_key: Optional[str], timestamp: float) -> str:
+        window_start = datetime.fromtimestamp(timestamp - timestamp % self.window_seconds, timezone.utc)
+        return f"{type}:{series_key or 'global'}:{window_start.strftime('%Y-%m-%dT%H')}"
+
+    def put(self, type: str, severity: str, message: str, series_key: Optional[str] = None) -> bool:
         """
-        Logs an alert to the database.
-        Future: Integrate Email/Slack here.
+        Queue an alert; returns False if it repeats one already queued or
+        sent in this window, or if no delivery channel is configured.
         """
-        print(f"[{severity.upper()}] ALERT: {message}")
-        
-        try:
-            data = {
+        if not self.channels:
+            metrics.count("alerts_undeliverable")
+            return False
+        now = time.time()
+        alert = {
+            "type": type,
+            "severity": severity,
+            "message": message,
+            "series_key": series_key,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "dedupe_key": self.dedupe_key(type, series_key, now)
+        }
+        with self._lock:
+            queued = 0
+            for channel in self.channels:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO outbox (dedupe_key, channel, alert, created_at) VALUES (?, ?, ?, ?)",
+                    (alert["dedupe_key"], channel.name, json.dumps(alert), now)
+                )
+                queued += cursor.rowcount
+            self._conn.commit()
+            if not queued:
+                metrics.count("alerts_deduplicated")
+                return False
+            metrics.count("alerts_queued")
+            self._pending += 1
+            due = (self._pending >= self.MAX_PENDING
+                   or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL)
+        if due:
+            self.flush()
+        return True
+
+    def coalesce(self, alerts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Replace each burst of COALESCE_MIN or more alerts of one type with a summary alert."""
+        by_type: Dict[str, List[Dict[str, Any]]] = {}
+        for a in alerts:
+            by_type.setdefault(a["type"], []).append(a)
+        result = []
+        for type, group in by_type.items():
+            if len(group) < self.COALESCE_MIN:
+                result.extend(group)
+                continue
+            group = sorted(group, key=lambda a: SEVERITY_RANK.get(a["severity"], 0), reverse=True)
+            keys = [a["series_key"] or "global" for a in group]
+            more = f" (+{len(keys) - self.SUMMARY_KEYS} more)" if len(keys) > self.SUMMARY_KEYS else ""
+            result.append({
                 "type": type,
-                "severity": severity,
-                "message": message,
-                "created_at": datetime.now().isoformat(),
-                "is_read": False
-            }
-            res = self.db.client.table("alerts").insert(data).execute()
-            print(f"Alert saved to DB: {res.data}")
-            return True
+                "severity": group[0]["severity"],
+                "message": f"{len(group)} {type} alerts: {', '.join(keys[:self.SUMMARY_KEYS])}{more}",
+                "series_key": None,
+                "created_at": max(a["created_at"] for a in group),
+                "dedupe_key": f"{type}:summary:" + hashlib.sha1(
+                    "\0".join(sorted(a["dedupe_key"] for a in group)).encode("utf-8")).hexdigest()
+            })
+        return result
+
+    def _flush_channel(self, channel: Any) -> int:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT dedupe_key, alert FROM outbox WHERE channel = ? AND delivered_at IS NULL ORDER BY created_at",
+                (channel.name,)
+            ).fetchall()
+        if not rows:
+            return 0
+        batch = self.coalesce([json.loads(alert) for _, alert in rows])
+        try:
+            with metrics.timer(f"alert_delivery_{channel.name}"):
+                channel.deliver(batch)
         except Exception as e:
-            print(f"Failed to save alert to DB: {e}")
-            return False
+            # Left undelivered; retried on the next flush
+            metrics.count("alert_delivery_failures")
+            print(f"Failed to deliver {len(rows)} alerts via {channel.name}: {e}")
+            return 0
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE outbox SET delivered_at = ? WHERE dedupe_key = ? AND channel = ?",
+                [(time.time(), key, channel.name) for key, _ in rows]
+            )
+            self._conn.commit()
+        metrics.count("alerts_delivered", len(batch))
+        print(f"Delivered {len(rows)} queued alerts via {channel.name} as {len(batch)} alerts.")
+        return len(batch)
+
+    def flush(self, wait: bool = False) -> List[Future]:
+        """Hand queued alerts to every channel's worker; with wait=True, block until delivered."""
+        with self._lock:
+            self._pending = 0
+            self._last_flush = time.monotonic()
+        futures = [self._workers[c.name].submit(self._flush_channel, c) for c in self.channels]
+        if wait:
+            for future in futures:
+                future.result()
+        return futures
+
+    def close(self):
+        """Deliver everything still queued and stop the workers."""
+        self.flush(wait=True)
+        for worker in self._workers.values():
+            worker.shutdown()
+        with self._lock:
+            self._conn.close()
+
+
+class Notifier:
+    """
+    Queues alerts in an AlertOutbox. Alerts are written to the database
+    and, if ALERT_FILE is set, appended to that file (the local stand-in
+    for email/webhook channels). Call close() at the end of a run.
+    """
+
+    def __init__(self, db: Optional[SupabaseClient] = None, outbox: Optional[AlertOutbox] = None):
+        self.db = db or get_db()
+        self.outbox = outbox or AlertOutbox(self.default_channels())
+        if not self.outbox.channels:
+            print("Warning: no alert channels configured (no Supabase client, ALERT_FILE unset); "
+                  "alerts will not be delivered.")
+
+    def default_channels(self) -> List[Any]:
+        channels: List[Any] = []
+        if self.db.client:
+            channels.append(DatabaseChannel(self.db))
+        if os.environ.get("ALERT_FILE"):
+            channels.append(FileChannel(os.environ["ALERT_FILE"]))
+        return channels
+
+    def send_alert(self, type: str, severity: str, message: str, series_key: Optional[str] = None) -> bool:
+        """
+        Queues an alert for delivery; returns False if the same alert
+        (type and series) was already sent in the current window, or if
+        there is no channel to deliver it to.
+        series_key identifies the disease/country series for per-series alerts.
+        """
+        print(f"[{severity.upper()}] ALERT: {message}")
+        return self.outbox.put(type, severity, message, series_key=series_key)
+
+    def flush(self, wait: bool = False):
+        self.outbox.flush(wait=wait)
+
+    def close(self):
+        self.outbox.close()
 
 # Usage Example:
 # notifier = Notifier()
 # notifier.send_alert("confirmed_outbreak", "critical", "New Ebola case detected in DRC.")
+# notifier.close()
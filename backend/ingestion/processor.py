@@ -1,60 +1,32 @@
-import re
 import os
 import json
-import google.generativeai as genai
-from typing import Dict, List, Any, Optional
+import bisect
+import hashlib
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from keywords import DISEASE_KEYWORDS, COUNTRIES
+from matcher import get_matcher
+from gazetteer import get_gazetteer, geo_summary
+from case_counts import get_count_extractor, SENTENCE_END_RE
+from extraction_cache import ExtractionCache
+from concurrency import TokenBucket, call_with_backoff
+from metrics import metrics
 
 class EventProcessor:
     """
     Normalizes raw events.
-    Uses Google Gemini for entity extraction if available, otherwise falls back to Regex.
+    The compiled matcher, gazetteer and count extractor run first; only
+    events they leave ambiguous are escalated to Google Gemini (when
+    available), with the rest and any LLM failure falling back to Regex.
     """
 
-    # Expanded disease name mapping (Fallback)
-    DISEASE_KEYWORDS = {
-        "Cholera": ["Cholera"],
-        "Mpox": ["Mpox", "monkeypox"],
-        "Ebola": ["Ebola", "EVD"],
-        "Dengue": ["Dengue", "DENV"],
-        "Nipah": ["Nipah", "NiV"],
-        "Avian Influenza": ["Avian Influenza", "H5N1", "H7N9", "H5N6", "H9N2"],
-        "COVID-19": ["COVID-19", "Coronavirus", "SARS-CoV-2", "SARS-2"],
-        "Oropouche": ["Oropouche", "OROV"],
-        "Zika": ["Zika", "ZIKV"],
-        "Polio": ["Polio", "Poliomyelitis", "cVDPV2", "WPV1"],
-        "Marburg": ["Marburg", "MVD"],
-        "Lassa Fever": ["Lassa Fever"],
-        "Yellow Fever": ["Yellow Fever"],
-        "Anthrax": ["Anthrax"],
-        "Measles": ["Measles"]
-    }
-
-    COUNTRIES = [
-        "Afghanistan", "Angola", "Argentina", "Australia", "Bangladesh", "Benin", "Bolivia", "Brazil", 
-        "Burkina Faso", "Burundi", "Cambodia", "Cameroon", "Canada", "Central African Republic", "Chad", 
-        "Chile", "China", "Colombia", "Congo", "Costa Rica", "Côte d'Ivoire", "Cuba", "DRC", "Democratic Republic of the Congo",
-        "Ecuador", "Egypt", "Ethiopia", "France", "Gabon", "Gambia", "Germany", "Ghana", "Guinea", "Guyana", 
-        "Haiti", "India", "Indonesia", "Iraq", "Italy", "Japan", "Jordan", "Kazakhstan", "Kenya", "Laos", 
-        "Liberia", "Madagascar", "Malawi", "Malaysia", "Mali", "Mauritania", "Mexico", "Mongolia", "Morocco", 
-        "Mozambique", "Myanmar", "Namibia", "Nepal", "Niger", "Nigeria", "Pakistan", "Panama", "Papua New Guinea", 
-        "Paraguay", "Peru", "Philippines", "Rwanda", "Saudi Arabia", "Senegal", "Sierra Leone", "Somalia", 
-        "South Africa", "South Sudan", "Spain", "Sri Lanka", "Sudan", "Tanzania", "Thailand", "Togo", "Uganda", 
-        "United Kingdom", "USA", "United States", "Vietnam", "Yemen", "Zambia", "Zimbabwe"
-    ]
-
-    def __init__(self):
-        self.api_key = os.environ.get("GEMINI_API_KEY")
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-2.0-flash')
-            print("EventProcessor: AI Mode Enabled (Gemini)")
-        else:
-            self.model = None
-            print("EventProcessor: Regex Mode (Fallback) - GEMINI_API_KEY not found")
+    # Keyword tables (see keywords.py), as class attributes so a subclass can extend them
+    DISEASE_KEYWORDS = DISEASE_KEYWORDS
+    COUNTRIES = COUNTRIES
 
-    def _extract_with_llm(self, text: str) -> Dict[str, Any]:
-        """Extract entities using Gemini API."""
-        prompt = f"""
+    MODEL_NAME = 'gemini-2.0-flash'
+
+    EXTRACTION_PROMPT = """
         Analyze the following health alert text and extract:
         1. Primary Diseases mentioned (list of strings). Normalize names (e.g., "H5N1" -> "Avian Influenza").
         2. Locations mentioned (list of countries).
@@ -63,7 +35,7 @@ class EventProcessor:
 
         Output ONLY valid JSON.
         
-        Text: "{text[:8000]}"
+        Text: "{text}"
         
         JSON Structure:
         {{
@@ -73,35 +45,208 @@ class EventProcessor:
             "confidence": 0.95
         }}
         """
+
+    BATCH_EXTRACTION_PROMPT = """
+        Analyze each of the following health alert texts and, for each one, extract:
+        1. Primary Diseases mentioned (list of strings). Normalize names (e.g., "H5N1" -> "Avian Influenza").
+        2. Locations mentioned (list of countries).
+        3. A brief 1-sentence assessment reason.
+        4. A confidence score (0.0 to 1.0) regarding if this is an active outbreak.
+
+        Output ONLY a valid JSON array with one object per item, echoing its Item ID.
+
+        {blocks}
+        JSON Structure:
+        [
+            {{
+                "id": "Item ID",
+                "diseases": ["name"],
+                "locations": ["Country"],
+                "assessment": "reason",
+                "confidence": 0.95
+            }}
+        ]
+        """
+
+    # Batched extraction limits: rough token estimate is 4 chars/token
+    BATCH_TOKEN_BUDGET = 24000
+    BATCH_MAX_ITEMS = 20
+    CHARS_PER_TOKEN = 4
+    MAX_TEXT_CHARS = 8000
+    # The prompt gets the first sentence and the sentences naming a disease, place or count
+    PROMPT_INPUT = "relevant_sentences"
+
+    # Cascade: events whose keyword confidence is below the threshold go to the LLM
+    CASCADE_THRESHOLD = 0.75
+    # Seconds before a model request is abandoned (and retried or failed)
+    LLM_TIMEOUT = 60
+    # Two diseases conflict unless the most mentioned one has this share of the mentions
+    PRIMARY_DISEASE_SHARE = 0.6
+    CONFLICT_PENALTY = 0.5
+    NO_PLACE_PENALTY = 0.8
+
+    def __init__(self, model: Any = None, cache: Optional[ExtractionCache] = None, use_cache: bool = True,
+                 rate_limiter: Optional[TokenBucket] = None, cascade: bool = True,
+                 cascade_threshold: Optional[float] = None):
+        self.api_key = os.environ.get("GEMINI_API_KEY")
+        self.rate_limiter = rate_limiter
+        # With the cascade off every event goes to the LLM
+        self.cascade = cascade
+        self.cascade_threshold = float(cascade_threshold if cascade_threshold is not None
+                                       else os.environ.get("CASCADE_THRESHOLD", self.CASCADE_THRESHOLD))
+        self._cascade_stats: Dict[int, List[int]] = {}
+        self._cascade_lock = threading.Lock()
+        self._model = model
+        self._model_lock = threading.Lock()
+        # Whether extraction uses an LLM; the Gemini model itself is built on first use
+        self.ai_enabled = model is not None or bool(self.api_key)
+        if model is not None:
+            # Injected model (e.g. a local stub for offline runs)
+            print("EventProcessor: AI Mode Enabled (injected model)")
+        elif self.api_key:
+            if self.rate_limiter is None:
+                # Shared by all worker threads; GEMINI_RPM matches the API tier quota
+                rpm = float(os.environ.get("GEMINI_RPM", 15))
+                self.rate_limiter = TokenBucket(rpm, burst=int(os.environ.get("GEMINI_BURST", 1)))
+            print("EventProcessor: AI Mode Enabled (Gemini)")
+        else:
+            print("EventProcessor: Regex Mode (Fallback) - GEMINI_API_KEY not found")
+        self.matcher = get_matcher(self.DISEASE_KEYWORDS, self.COUNTRIES)
+        self.gazetteer = get_gazetteer()
+        self.counter = get_count_extractor(kw for kws in self.DISEASE_KEYWORDS.values() for kw in kws)
+
+        # Cache LLM results only; regex extraction is cheaper than a lookup
+        self.cache = None
+        if self.ai_enabled and use_cache:
+            self.cache = cache or ExtractionCache(self.extraction_version())
+
+    @property
+    def model(self) -> Any:
+        """
+        The LLM client. The Gemini SDK is imported and configured on first
+        use, so regex-mode runs and runs served from the cache never load it.
+        """
+        if self._model is None and self.api_key:
+            with self._model_lock:
+                if self._model is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel(self.MODEL_NAME)
+        return self._model
+
+    @classmethod
+    def extraction_version(cls) -> str:
+        """Fingerprint of everything that shapes an extraction result."""
+        fingerprint = json.dumps([
+            cls.MODEL_NAME,
+            cls.EXTRACTION_PROMPT,
+            cls.BATCH_EXTRACTION_PROMPT,
+            cls.MAX_TEXT_CHARS,
+            cls.PROMPT_INPUT,
+            cls.DISEASE_KEYWORDS,
+            cls.COUNTRIES,
+        ], sort_keys=True)
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:16]
+
+    def _generate(self, prompt: str) -> str:
+        """Rate-limited model call with backoff on 429s; returns cleaned text."""
+        metrics.count("llm_calls")
+        with metrics.timer("llm_request"):
+            response = call_with_backoff(lambda: self.model.generate_content(
+                prompt, request_options={"timeout": self.LLM_TIMEOUT}), self.rate_limiter)
+        # Simple cleanup for markdown json blocks if present
+        return response.text.replace("```json", "").replace("```", "").strip()
+
+    @metrics.timed("llm_extraction")
+    def _extract_with_llm(self, text: str) -> Dict[str, Any]:
+        """Extract entities using Gemini API."""
+        prompt = self.EXTRACTION_PROMPT.format(text=text[:self.MAX_TEXT_CHARS])
         try:
-            response = self.model.generate_content(prompt)
-            # Simple cleanup for markdown json blocks if present
-            raw_text = response.text.replace("```json", "").replace("```", "").strip()
-            return json.loads(raw_text)
+            return json.loads(self._generate(prompt))
         except Exception as e:
+            metrics.count("llm_failures")
             print(f"LLM Extraction failed: {e}")
             return None
 
+    @metrics.timed("llm_extraction")
+    def _extract_batch_with_llm(self, items: List[Dict[str, str]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Extract entities for several texts in one Gemini request.
+        Returns results keyed by item ID; items missing or malformed in the
+        response are left out so the caller can fall back per item.
+        """
+        blocks = "\n".join(
+            f'Item ID: {item["id"]}\nText: "{item["text"][:self.MAX_TEXT_CHARS]}"\n'
+            for item in items
+        )
+        prompt = self.BATCH_EXTRACTION_PROMPT.format(blocks=blocks)
+        try:
+            parsed = json.loads(self._generate(prompt))
+        except Exception as e:
+            metrics.count("llm_failures")
+            print(f"LLM Batch Extraction failed: {e}")
+            return {}
+
+        if not isinstance(parsed, list):
+            metrics.count("llm_failures")
+            print("LLM Batch Extraction returned a non-array response")
+            return {}
+
+        results = {}
+        for entry in parsed:
+            if not self._is_valid_llm_result(entry) or "id" not in entry:
+                continue
+            results[str(entry["id"])] = entry
+        return results
+
+    @staticmethod
+    def _is_valid_llm_result(entry: Any) -> bool:
+        """Checks the shape of a single LLM extraction result."""
+        if not isinstance(entry, dict):
+            return False
+        if not isinstance(entry.get("diseases", []), list):
+            return False
+        if not isinstance(entry.get("locations", []), list):
+            return False
+        try:
+            float(entry.get("confidence", 0.5))
+        except (TypeError, ValueError):
+            return False
+        return True
+
+    def _plan_batches(self, texts: List[str]) -> List[List[int]]:
+        """Groups text indexes into batches capped by token budget and item count."""
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = min(len(text), self.MAX_TEXT_CHARS) // self.CHARS_PER_TOKEN + 1
+            if current and (current_tokens + tokens > self.BATCH_TOKEN_BUDGET
+                            or len(current) >= self.BATCH_MAX_ITEMS):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
     def extract_diseases_regex(self, text: str) -> List[str]:
         """Fallback: Extract primary diseases mentioned in the text."""
-        found = []
-        for disease, keywords in self.DISEASE_KEYWORDS.items():
-            for kw in keywords:
-                if re.search(rf"\\b{kw}\\b", text, re.I):
-                    found.append(disease)
-                    break
-        return list(set(found))
+        diseases, _ = self.matcher.match(text)
+        return diseases
 
     def extract_locations_regex(self, text: str) -> List[str]:
         """Fallback: Extract countries mentioned in the text."""
-        found = []
-        for country in self.COUNTRIES:
-            if re.search(rf"\\b{country}\\b", text):
-                found.append(country)
-        return list(set(found))
-
-    def classify_event(self, source_tier: int, content: str, title: str) -> Dict[str, Any]:
-        """Deterministic classification logic (Fallback)."""
+        _, locations = self.matcher.match(text)
+        return locations
+
+    def classify_event(self, source_tier: int, content: str, title: str,
+                       counts: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Deterministic classification logic (Fallback). `counts` are the
+        event's case and death counts, extracted from content if not given.
+        """
         classification = "early_signal"
         confidence = 0.5
         reason = "Initial signal"
@@ -111,11 +256,14 @@ class EventProcessor:
             confidence = 1.0
             reason = "Official Tier 1 Source (WHO DONs)"
         elif source_tier == 2:
-            case_match = re.search(r"(\d+)\s+(cases|deaths|infections)", content, re.I)
-            if case_match:
+            if counts is None:
+                counts = self.counter.extract(content)
+            reported = [f"{counts[key]} {noun}" for key, noun in (("case_count", "cases"), ("death_count", "deaths"))
+                        if counts[key] is not None]
+            if reported:
                 classification = "confirmed_outbreak"
                 confidence = 0.8
-                reason = f"Tier 2 source reporting {case_match.group(0)}"
+                reason = f"Tier 2 source reporting {' and '.join(reported)}"
             else:
                 classification = "research_update"
                 confidence = 0.9
@@ -129,18 +277,164 @@ class EventProcessor:
 
     def process(self, raw_event: Dict[str, Any], source_tier: int) -> Dict[str, Any]:
         full_text = f"{raw_event['title']} {raw_event['content']}"
-        
-        # Try LLM First
+        triage = self._triage(raw_event, source_tier, full_text)
+
+        # Only ambiguous events go to the LLM (unchanged text is served from the cache)
         llm_result = None
-        if self.model:
-            llm_result = self._extract_with_llm(full_text)
-            
+        if triage["escalate"]:
+            llm_result = self.cache.get(full_text) if self.cache else None
+            if llm_result is None:
+                llm_result = self._extract_with_llm(self._prompt_text(full_text, triage["anchors"]))
+                if llm_result and self.cache:
+                    self.cache.put(full_text, llm_result)
+
+        return self._build_result(raw_event, source_tier, full_text, llm_result, triage)
+
+    def process_batch(self, raw_events: List[Dict[str, Any]], source_tier: int) -> List[Dict[str, Any]]:
+        """
+        Process many events with as few LLM round trips as possible.
+        Only escalated events are sent; results are returned in input
+        order, and any item the LLM drops or returns malformed falls back
+        to regex on its own.
+        """
+        texts = [f"{e['title']} {e['content']}" for e in raw_events]
+        triages = [self._triage(e, source_tier, text) for e, text in zip(raw_events, texts)]
+        llm_results: List[Optional[Dict[str, Any]]] = [None] * len(raw_events)
+
+        pending = []
+        for i, text in enumerate(texts):
+            if not triages[i]["escalate"]:
+                continue
+            llm_results[i] = self.cache.get(text) if self.cache else None
+            if llm_results[i] is None:
+                pending.append(i)
+
+        if pending:
+            prompt_texts = {i: self._prompt_text(texts[i], triages[i]["anchors"]) for i in pending}
+            for batch_positions in self._plan_batches([prompt_texts[i] for i in pending]):
+                batch = [pending[p] for p in batch_positions]
+                items = [{"id": str(i), "text": prompt_texts[i]} for i in batch]
+                by_id = self._extract_batch_with_llm(items)
+                for i in batch:
+                    llm_results[i] = by_id.get(str(i))
+                    if llm_results[i] and self.cache:
+                        self.cache.put(texts[i], llm_results[i])
+                missing = sum(1 for i in batch if llm_results[i] is None)
+                if missing:
+                    print(f"LLM Batch: {missing}/{len(batch)} items fell back to regex")
+
+        return [
+            self._build_result(e, source_tier, text, llm_result, triage)
+            for e, text, llm_result, triage in zip(raw_events, texts, llm_results, triages)
+        ]
+
+    def _count_cases(self, text: str, diseases: List[str], places: List[Dict[str, Any]],
+                     iso2: Optional[str], disease_offsets: Optional[List[Tuple[int, str]]] = None) -> Dict[str, Any]:
+        """Case and death counts of an event, attributed to its diseases and places."""
+        # Keywords map to the event's own disease names ("Ebola" -> "Ebola virus disease");
+        # a disease it does not list keeps nearby counts from being attributed
+        by_keyword: Dict[str, str] = {}
+        for disease in diseases:
+            for keyword in self.matcher.match(str(disease))[0] + [disease]:
+                by_keyword.setdefault(keyword, disease)
+        if disease_offsets is None:
+            disease_offsets = self.matcher.disease_offsets(text)
+        offsets = [(offset, by_keyword.get(name)) for offset, name in disease_offsets]
+        return self.counter.extract(text, diseases=diseases, disease_offsets=offsets, places=places, iso2=iso2)
+
+    def _triage(self, raw_event: Dict[str, Any], source_tier: int, full_text: str) -> Dict[str, Any]:
+        """
+        First stage of the cascade: keyword diseases, gazetteer places, case
+        counts and the deterministic classification, plus whether the event
+        needs the LLM ("escalate", with the reason) and the keyword
+        confidence that decided it.
+        """
+        with metrics.timer("entity_matching"):
+            disease_offsets = self.matcher.disease_offsets(full_text)
+        mentions: Dict[str, int] = {}
+        for _, name in disease_offsets:
+            mentions[name] = mentions.get(name, 0) + 1
+        diseases = list(mentions)
+
+        with metrics.timer("geocoding"):
+            places = self.gazetteer.locate(full_text)
+        iso2, geo_level = geo_summary(places)
+        with metrics.timer("case_counts"):
+            counts = self._count_cases(full_text, diseases, places, iso2, disease_offsets)
+        assessment = self.classify_event(source_tier, raw_event['content'], raw_event['title'], counts=counts)
+
+        # Keyword confidence: the classification's, lowered when the primary
+        # disease is unclear or no place is named
+        confidence, reason = assessment["confidence"], "low_confidence"
+        if not diseases:
+            confidence, reason = 0.0, "no_entities"
+        elif max(mentions.values()) < self.PRIMARY_DISEASE_SHARE * len(disease_offsets):
+            confidence, reason = confidence * self.CONFLICT_PENALTY, "conflicting_diseases"
+        if not places:
+            confidence *= self.NO_PLACE_PENALTY
+
+        escalate = self.ai_enabled and (not self.cascade or confidence < self.cascade_threshold)
+        if self.ai_enabled:
+            with self._cascade_lock:
+                tier_stats = self._cascade_stats.setdefault(source_tier, [0, 0])
+                tier_stats[0] += 1
+                tier_stats[1] += escalate
+            metrics.count(f"cascade_tier{source_tier}_events")
+            if escalate:
+                metrics.count(f"cascade_tier{source_tier}_escalated")
+                if self.cascade:
+                    metrics.count(f"cascade_escalated_{reason}")
+
+        anchors = sorted([offset for offset, _ in disease_offsets] + counts["offsets"]
+                         + [offset for place in places for offset in place["offsets"]])
+        return {
+            "diseases": diseases, "places": places, "iso2": iso2, "geo_level": geo_level,
+            "counts": counts, "assessment": assessment, "anchors": anchors,
+            "confidence": confidence, "escalate": escalate,
+        }
+
+    def _prompt_text(self, full_text: str, anchors: List[int]) -> str:
+        """
+        LLM input: the first sentence (the title) and every sentence that
+        names a disease, place or count, up to MAX_TEXT_CHARS. Text with no
+        such sentence is sent as is.
+        """
+        if not anchors:
+            return full_text[:self.MAX_TEXT_CHARS]
+        ends = [m.end() for m in SENTENCE_END_RE.finditer(full_text)] + [len(full_text)]
+        keep = dict.fromkeys([0] + [bisect.bisect_right(ends, offset) for offset in anchors])
+        sentences = [full_text[ends[i - 1] if i else 0:ends[i]].strip() for i in keep if i < len(ends)]
+        return " ".join(sentences)[:self.MAX_TEXT_CHARS]
+
+    def cascade_stats(self) -> Dict[int, Dict[str, Any]]:
+        """Per source tier: events triaged, how many were escalated to the LLM, and the ratio."""
+        with self._cascade_lock:
+            return {tier: {"events": events, "escalated": escalated,
+                           "escalation_rate": escalated / events if events else 0.0}
+                    for tier, (events, escalated) in sorted(self._cascade_stats.items())}
+
+    def _build_result(self, raw_event: Dict[str, Any], source_tier: int, full_text: str,
+                      llm_result: Optional[Dict[str, Any]], triage: Dict[str, Any]) -> Dict[str, Any]:
         if llm_result:
             diseases = llm_result.get("diseases", [])
-            locations = llm_result.get("locations", [])
+            # Every place named in the text (regions and cities too), plus any
+            # the LLM listed, resolved offline to ISO2 codes and coordinates
+            with metrics.timer("geocoding"):
+                places = self.gazetteer.locate(full_text, names=llm_result.get("locations", []))
+            iso2, geo_level = geo_summary(places)
+            with metrics.timer("case_counts"):
+                counts = self._count_cases(full_text, diseases, places, iso2)
+        else:
+            # Resolved by the cascade's first stage, or a fallback (regex mode or LLM failure)
+            metrics.count("regex_fallbacks" if triage["escalate"] or not self.ai_enabled else "cascade_resolved")
+            diseases, places, counts = triage["diseases"], triage["places"], triage["counts"]
+            iso2, geo_level = triage["iso2"], triage["geo_level"]
+        places = [{**place, **place_counts} for place, place_counts in zip(places, counts["place_counts"])]
+
+        if llm_result:
             assessment_text = llm_result.get("assessment", "AI Analyzed")
             confidence = float(llm_result.get("confidence", 0.5))
-            
+
             # Map LLM confidence to classification
             classification = "early_signal"
             if source_tier == 1:
@@ -152,10 +446,7 @@ class EventProcessor:
                 classification = "research_update"
 
         else:
-            # Fallback to Regex
-            diseases = self.extract_diseases_regex(full_text)
-            locations = self.extract_locations_regex(full_text)
-            assessment = self.classify_event(source_tier, raw_event['content'], raw_event['title'])
+            assessment = triage["assessment"]
             classification = assessment['classification']
             confidence = assessment['confidence']
             assessment_text = assessment['reason']
@@ -163,7 +454,14 @@ class EventProcessor:
         return {
             "title": raw_event['title'],
             "diseases": diseases,
-            "locations": locations,
+            "locations": list(dict.fromkeys(p["country"] for p in places)),
+            "places": places,
+            "iso2": iso2,
+            "geo_level": geo_level,
+            "case_count": counts["case_count"],
+            "death_count": counts["death_count"],
+            "risk_level": counts["risk_level"],
+            "disease_counts": counts["disease_counts"],
             "classification": classification,
             "confidence": confidence,
             "assessment_text": assessment_text,
@@ -1,31 +1,120 @@
 import os
-import sys
-from datetime import datetime
-from who_dons import WHODonIngestor
+import traceback
+from datetime import datetime, timezone
+from typing import Any, Dict, List
 from analyzer import IntelligenceAnalyzer
+from base_ingestor import BaseIngestor
+from db_client import get_db
+from metrics import metrics
+from sources import load_sources, run_sources
 
-def run_pipeline():
+def run_pipeline(ingestors: List[BaseIngestor]) -> Dict[str, Dict[str, Any]]:
     print(f"[{datetime.now().isoformat()}] Starting Outbreak Intel Pipeline...")
-    
-    # 1. Scraping & Ingestion
-    print("Step 1: Running WHO DONs Scraper...")
-    scraper = WHODonIngestor()
-    scraper.run()
-    
+
+    # 1. Ingestion: every enabled source concurrently
+    print(f"Step 1: Ingesting {len(ingestors)} sources ({', '.join(i.key for i in ingestors)})...")
+    results = run_sources(ingestors)
+    db = get_db()
+    if db.client:
+        print(db.diseases.report())
+
     # 2. Analysis & Anomaly Detection
     print("Step 2: Analyzing signals for anomalies...")
     analyzer = IntelligenceAnalyzer()
-    anomalies = analyzer.detect_anomalies()
-    
+    try:
+        anomalies = analyzer.detect_anomalies() + analyzer.detect_series_anomalies()
+    finally:
+        # Deliver the run's queued alerts in bulk
+        analyzer.notifier.close()
+
     if anomalies:
         print(f"Found {len(anomalies)} anomalies!")
-        # In the future, this could trigger email alerts or push to a 'alerts' table
         for a in anomalies:
             print(f"ALERT: {a['message']}")
     else:
         print("No critical anomalies detected.")
 
     print(f"[{datetime.now().isoformat()}] Pipeline complete.")
+    return results
+
+def source_metrics(ingestor) -> Dict[str, Any]:
+    """The source's own counters from its last run (fetched, fresh, duplicates, stored, failed, seconds)."""
+    return {name: value.isoformat() if isinstance(value, datetime) else value
+            for name, value in ingestor.stats.items()}
+
+def record_run(ingestor, start_time, result=None, error=None, run_metrics=None):
+    """
+    Write one source's run summary to `pipeline_runs`. Its `metrics` hold
+    the source's own counters under "source"; the process-wide timers and
+    counters (shared by every source) are passed as `run_metrics` for one
+    row of the run only, under "run", so they are never counted twice.
+    Returns whether the row was written.
+    """
+    if not ingestor.source_id:
+        print(f"Skipping pipeline_runs record for {ingestor.key}: no source_id.")
+        return False
+    result = result or {}
+    error = error or result.get("error")
+    try:
+        run_id = ingestor.db.insert_pipeline_run({
+            "source_id": ingestor.source_id,
+            "start_time": start_time.isoformat(),
+            "end_time": datetime.now(timezone.utc).isoformat(),
+            "status": "failure" if error or result.get("status") != "success" else "success",
+            "events_fetched": ingestor.stats.get("fetched", 0),
+            "error_log": error,
+            "metrics": {"source": source_metrics(ingestor), **({"run": run_metrics} if run_metrics else {})}
+        })
+        return run_id is not None
+    except Exception as e:
+        print(f"Failed to record pipeline run: {e}")
+        return False
+
+def record_runs(ingestors, start_time, results=None, error=None):
+    """Record every source's run; the run-wide metrics go on the first recorded row."""
+    run_metrics = metrics.snapshot()
+    for ingestor in ingestors:
+        if record_run(ingestor, start_time, result=(results or {}).get(ingestor.key), error=error,
+                      run_metrics=run_metrics):
+            run_metrics = None
+
+def main(args):
+    metrics.reset()
+    start_time = datetime.now(timezone.utc)
+    ingestors = load_sources(only=args.sources.split(",") if args.sources else None,
+                             concurrency=int(os.environ.get("PIPELINE_WORKERS", 4)))
+    try:
+        results = run_pipeline(ingestors)
+    except Exception:
+        record_runs(ingestors, start_time, error=traceback.format_exc())
+        raise
+    finally:
+        print(f"Metrics: {metrics.summary()}")
+        metrics.export(textfile=args.metrics_textfile, json_path=args.metrics_json)
+    record_runs(ingestors, start_time, results=results)
 
 if __name__ == "__main__":
-    run_pipeline()
+    import argparse
+    parser = argparse.ArgumentParser(description="Run ingestion and anomaly detection.")
+    parser.add_argument("--sources", default=None,
+                        help="Comma-separated source keys from sources.json (default: all enabled)")
+    parser.add_argument("--profile", nargs="?", const="pipeline.prof", default=None, metavar="PATH",
+                        help="Write a cProfile dump (view with snakeviz, or flameprof for a flamegraph)")
+    parser.add_argument("--metrics-textfile", default=os.environ.get("METRICS_TEXTFILE"),
+                        help="Prometheus textfile-collector output path")
+    parser.add_argument("--metrics-json", default=os.environ.get("METRICS_JSON"),
+                        help="JSON metrics snapshot output path")
+    args = parser.parse_args()
+
+    if args.profile:
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        try:
+            profiler.runcall(main, args)
+        finally:
+            profiler.dump_stats(args.profile)
+            print(f"Profile written to {args.profile}")
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+    else:
+        main(args)
@@ -0,0 +1,111 @@
+import os
+import json
+import time
+import threading
+from typing import Dict, Any, List, Optional
+from base_ingestor import BaseIngestor, SOURCE_TYPES
+from processor import EventProcessor
+from db_client import get_db
+from metrics import metrics
+import who_dons  # noqa: F401  (registers "who_dons")
+import feeds  # noqa: F401  (registers "rss", "json_api")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SOURCES_PATH = os.path.join(BACKEND_DIR, "sources.json")
+
+# Per-source wall-clock budget unless sources.json sets "timeout"
+DEFAULT_SOURCE_TIMEOUT = 600
+
+
+def load_sources(path: Optional[str] = None, only: Optional[List[str]] = None, dry_run: bool = False,
+                 incremental: bool = True, concurrency: int = 4) -> List[BaseIngestor]:
+    """
+    Build one ingestor per enabled entry of sources.json. All of them share
+    one EventProcessor (model, rate limiter, extraction cache); database
+    and HTTP calls go through the process-wide client and session pools.
+    `only` (or PIPELINE_SOURCES, comma-separated keys) selects entries.
+    """
+    path = path or os.environ.get("PIPELINE_SOURCES_FILE", DEFAULT_SOURCES_PATH)
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    if only is None and os.environ.get("PIPELINE_SOURCES"):
+        only = [k.strip() for k in os.environ["PIPELINE_SOURCES"].split(",") if k.strip()]
+
+    processor = EventProcessor()
+    db = get_db() if not dry_run else None
+    ingestors = []
+    for entry in entries:
+        entry = dict(entry)
+        key = entry.pop("key")
+        enabled = entry.pop("enabled", True)
+        if (only is not None and key not in only) or (only is None and not enabled):
+            continue
+        source_type = entry.pop("type")
+        if source_type not in SOURCE_TYPES:
+            raise ValueError(f"Unknown source type '{source_type}' for source '{key}'")
+        ingestor = SOURCE_TYPES[source_type](
+            dry_run=dry_run,
+            incremental=incremental,
+            concurrency=concurrency,
+            processor=processor,
+            db=db,
+            timeout=entry.pop("timeout", DEFAULT_SOURCE_TIMEOUT),
+            key=key,
+            **entry
+        )
+        ingestors.append(ingestor)
+    return ingestors
+
+
+def _run_source(ingestor: BaseIngestor, outcome: Dict[str, Any]):
+    try:
+        with metrics.timer(f"source_{ingestor.key}"):
+            outcome["stats"] = ingestor.run()
+    except Exception as e:
+        outcome["error"] = e
+
+
+def run_sources(ingestors: List[BaseIngestor]) -> Dict[str, Dict[str, Any]]:
+    """
+    Run every source concurrently and return {key: result}. A source that
+    raises or overruns its budget is reported as failed; the others keep
+    going. Each ingestor also stops itself cooperatively at its deadline,
+    so the hard wait below is only a backstop for a hung request.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    if not ingestors:
+        return results
+    started = time.perf_counter()
+    # Daemon threads: a source still running after the wait below is
+    # reported as timed out and does not keep the process alive at exit.
+    # Its extraction and fetch workers are pool threads that exit joins, but
+    # every HTTP and model request they make has a timeout
+    runs = []
+    for ingestor in ingestors:
+        outcome: Dict[str, Any] = {}
+        thread = threading.Thread(target=_run_source, args=(ingestor, outcome),
+                                  name=f"source-{ingestor.key}", daemon=True)
+        thread.start()
+        runs.append((ingestor, thread, outcome))
+    budget = max((i.timeout or DEFAULT_SOURCE_TIMEOUT) for i in ingestors)
+    deadline = time.monotonic() + budget + 60
+    for ingestor, thread, outcome in runs:
+        thread.join(max(0.0, deadline - time.monotonic()))
+        if thread.is_alive():
+            metrics.count("source_timeouts")
+            results[ingestor.key] = {"status": "timeout", "error": f"still running after {budget + 60:.0f}s"}
+            continue
+        if "error" in outcome:
+            metrics.count("source_failures")
+            results[ingestor.key] = {"status": "failure", "error": repr(outcome["error"])}
+            continue
+        stats = outcome.get("stats") or {}
+        status = "failure" if stats.get("error") else "timeout" if stats.get("timed_out") else "success"
+        results[ingestor.key] = {"status": status, **stats}
+
+    print(f"Sources finished in {time.perf_counter() - started:.1f}s:")
+    for key, result in results.items():
+        detail = (f"{result.get('fetched', 0)} fetched, {result.get('stored', 0)} stored "
+                  f"in {result.get('seconds', 0):.1f}s" if "error" not in result else result["error"])
+        print(f"  {key}: {result['status']} ({detail})")
+    return results
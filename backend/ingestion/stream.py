@@ -0,0 +1,92 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Groups a stream into lists of at most `size` items."""
+    chunk: List[T] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def prefetch(items: Iterable[T], buffer_size: int) -> Iterator[T]:
+    """
+    Runs the upstream generator in a background thread, at most
+    `buffer_size` items ahead of the consumer. Upstream exceptions are
+    re-raised in the consumer.
+    """
+    buffer: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, buffer_size))
+    stop = threading.Event()
+
+    def put(value: Any) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:  # handed to the consumer
+            put(e)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Consumer stopped early (or finished): release the producer
+        stop.set()
+
+
+def bounded_map(fn: Callable[[T], R], items: Iterable[T], workers: int,
+                max_in_flight: int) -> Iterator[Tuple[T, Optional[R], Optional[BaseException]]]:
+    """
+    Applies fn on a thread pool, pulling input lazily so no more than
+    `max_in_flight` items are pending at once. Yields (item, result, error)
+    in completion order: error is None on success, and a failed item has
+    result None and its exception as error.
+    """
+    source = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    item = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[pool.submit(fn, item)] = item
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                error = future.exception()
+                yield item, (None if error else future.result()), error
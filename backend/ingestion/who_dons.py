@@ -1,48 +1,147 @@
-import requests
-from bs4 import BeautifulSoup
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 import datetime
+import functools
 import re
 import dateutil.parser
-from processor import EventProcessor
-from db_client import SupabaseClient
+from base_ingestor import BaseIngestor, register_source
+from metrics import metrics
 
-class WHODonIngestor:
+MONTHS = {name: i for i, name in enumerate(
+    ["january", "february", "march", "april", "may", "june", "july",
+     "august", "september", "october", "november", "december"], start=1)}
+WHO_DATE_RE = re.compile(r"^\s*(\d{1,2})\s+([A-Za-z]+)\s+(\d{4})\s*$")
+ISO_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}(T\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?(Z|[+-]\d{2}:\d{2})?)?$")
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_who_date(date_str: str) -> Optional[str]:
+    """
+    Parse a WHO date string to ISO format, or None if unparseable.
+    Known shapes ("8 January 2024", API ISO timestamps) skip dateutil;
+    results are memoized since feeds repeat the same dates.
+    """
+    match = WHO_DATE_RE.match(date_str)
+    if match and match.group(2).lower() in MONTHS:
+        day, month, year = int(match.group(1)), MONTHS[match.group(2).lower()], int(match.group(3))
+        try:
+            return datetime.datetime(year, month, day).isoformat()
+        except ValueError:
+            return None
+    if ISO_DATE_RE.match(date_str):
+        try:
+            return datetime.datetime.fromisoformat(date_str).isoformat()
+        except ValueError:
+            pass
+    try:
+        return dateutil.parser.parse(date_str).isoformat()
+    except Exception:
+        return None
+
+
+@register_source("who_dons")
+class WHODonIngestor(BaseIngestor):
     """
     Ingestor for WHO Disease Outbreak News (DONs).
     Uses the official RESTful API as the primary source.
     """
     API_URL = "https://www.who.int/api/news/diseaseoutbreaknews"
     BASE_URL = "https://www.who.int"
+    INDEX_URL = "https://www.who.int/emergencies/disease-outbreak-news"
     HEADERS = {
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
         "Accept": "application/json"
     }
 
-    def __init__(self, dry_run: bool = False):
-        self.dry_run = dry_run
-        self.processor = EventProcessor()
-        self.db = SupabaseClient() if not dry_run else None
+    SOURCE_NAME = "WHO Disease Outbreak News"
+    SOURCE_URL = INDEX_URL
+    TIER = 1
+    SOURCE_TYPE = "Web"
+    # The API only carries a one-paragraph summary
+    ENRICH_BODIES = True
 
-    def fetch_latest(self) -> List[Dict[str, Any]]:
-        """Fetch and parse the latest DONs from the official API."""
+    # OData paging: newest first, PAGE_SIZE items per request
+    PAGE_SIZE = 100
+    MAX_PAGES = 5
+    PREFETCH_BUFFER = PAGE_SIZE
+
+    def __init__(self, dry_run: bool = False, incremental: bool = True, concurrency: int = 4,
+                 max_pages: int = MAX_PAGES, **kwargs):
+        super().__init__(dry_run=dry_run, incremental=incremental, concurrency=concurrency, **kwargs)
+        self.max_pages = max_pages
+
+    def iter_events(self, since: Optional[datetime.datetime] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield the latest DONs from the official API, page by page.
+        Pages are followed newest-first and paging stops once a page reaches
+        items published before `since`. Falls back to scraping if the API
+        fails before producing anything.
+        """
         print(f"Fetching WHO DONs via API from {self.API_URL}...")
-        
+        produced = 0
         try:
-            response = requests.get(self.API_URL, headers=self.HEADERS, timeout=15)
-            if response.status_code == 200:
-                data = response.json()
-                return self._parse_api_response(data)
-            else:
-                print(f"API returned status {response.status_code}. Falling back to scraping...")
-                return self._fetch_via_scraping()
+            for page in self._iter_api_pages():
+                for event in page:
+                    produced += 1
+                    yield event
+                if since and page and min(self._to_utc(self._parse_date(e['published_at'])) for e in page) < since:
+                    return
         except Exception as e:
+            if produced:
+                print(f"API Error: {e}. Keeping {produced} events from earlier pages.")
+                return
             print(f"API Error: {e}. Falling back to scraping...")
-            return self._fetch_via_scraping()
+            yield from self._iter_scraped()
+
+    def iter_range(self, start: datetime.date, end: datetime.date) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every DON published in [start, end) via the API's $filter,
+        with dates normalized. Used by the historical backfill.
+        """
+        odata_filter = (f"PublicationDate ge {start.isoformat()}T00:00:00Z "
+                        f"and PublicationDate lt {end.isoformat()}T00:00:00Z")
+        for page in self._iter_api_pages(odata_filter=odata_filter, all_pages=True):
+            for e in page:
+                e['published_at'] = self._parse_date(e['published_at'])
+                yield e
+
+    def _iter_api_pages(self, odata_filter: Optional[str] = None,
+                        all_pages: bool = False) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Lazily yields parsed API pages, following $skip or @odata.nextLink.
+        Stops after max_pages unless all_pages is set.
+        """
+        url = self.API_URL
+        base_params: Dict[str, Any] = {"$top": self.PAGE_SIZE, "$orderby": "PublicationDate desc"}
+        if odata_filter:
+            base_params["$filter"] = odata_filter
+        params: Optional[Dict[str, Any]] = dict(base_params)
+        skip = 0
+        page_no = 0
+        while all_pages or page_no < self.max_pages:
+            page_no += 1
+            result = self._fetch(url, params=params)
+            if result.not_modified and self.incremental and not self.dry_run:
+                # Nothing changed since the last run; skip parsing this and older pages
+                print(f"API page {page_no} unchanged since last run.")
+                return
+
+            with metrics.timer("parse"):
+                data = result.json()
+                items = data.get("value", []) if isinstance(data, dict) else data
+                page = list(self._parse_api_response(data))
+            yield page
 
-    def _parse_api_response(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+            next_link = data.get("@odata.nextLink") if isinstance(data, dict) else None
+            if next_link:
+                url, params = next_link, None
+            elif len(items) < self.PAGE_SIZE:
+                return
+            else:
+                skip += self.PAGE_SIZE
+                params = {**base_params, "$skip": skip}
+
+    def _parse_api_response(self, data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
         """Parse the WHO API JSON response."""
-        events = []
         items = data.get("value", []) if isinstance(data, dict) else data
         
         for item in items:
@@ -52,107 +151,80 @@ class WHODonIngestor:
                 u = url.lstrip("/")
                 url = f"{self.BASE_URL}/{u}"
             
-            events.append({
+            yield {
                 "external_id": str(item.get("Id") or url),
                 "title": item.get("Title") or item.get("title"),
                 "content": item.get("Summary") or item.get("Title"),
                 "raw_url": url,
                 "published_at": item.get("PublicationDate") or item.get("date")
-            })
-        return events
+            }
 
     def _fetch_via_scraping(self) -> List[Dict[str, Any]]:
         """Verified scraping method as fallback."""
-        index_url = "https://www.who.int/emergencies/disease-outbreak-news"
+        return list(self._iter_scraped())
+
+    def _iter_scraped(self) -> Iterator[Dict[str, Any]]:
         try:
-            response = requests.get(index_url, headers=self.HEADERS, timeout=15)
-            response.raise_for_status()
-            return self._parse_html(response.text)
+            result = self._fetch(self.INDEX_URL)
+            if result.not_modified and self.incremental and not self.dry_run:
+                print("Index page unchanged since last run.")
+                return
+            with metrics.timer("parse"):
+                events = list(self._parse_html(result.body))
+            yield from events
         except Exception as e:
             print(f"Scraping Error: {e}")
-            return []
 
-    def _parse_html(self, html: str) -> List[Dict[str, Any]]:
-        """Parse the WHO DONs index page HTML."""
-        soup = BeautifulSoup(html, "lxml")
-        events = []
-        items = soup.find_all("a", class_=re.compile(r"list-vertical__item|list-view--item"))
-        
-        if not items:
-            items = soup.find_all("a", href=re.compile(r"/emergencies/disease-outbreak-news/item/"))
+    # XPath equivalents of the list-item selectors used on the index page
+    LIST_ITEM_XPATH = "//a[contains(@class, 'list-vertical__item') or contains(@class, 'list-view--item')]"
+    ITEM_LINK_XPATH = "//a[contains(@href, '/emergencies/disease-outbreak-news/item/')]"
+    FULL_TITLE_XPATH = ".//span[contains(concat(' ', normalize-space(@class), ' '), ' full-title ')]"
+    DATE_RE = re.compile(r"(\d{1,2}\s+[A-Z][a-z]+\s+\d{4})")
+
+    def _parse_html(self, html: str) -> Iterator[Dict[str, Any]]:
+        """Parse the WHO DONs index page HTML (lxml + XPath)."""
+        # Imported here: only the scraping fallback needs lxml
+        import lxml.html
+
+        if not html.strip():
+            return
+        root = lxml.html.fromstring(html)
+        items = root.xpath(self.LIST_ITEM_XPATH) or root.xpath(self.ITEM_LINK_XPATH)
 
         for item in items:
             url = item.get("href")
             if url and not url.startswith("http"):
                 url = self.BASE_URL + url if url.startswith("/") else url
-            
-            title_elem = item.find("span", class_="full-title") or item.find("h4")
-            title = title_elem.get_text(strip=True) if title_elem else item.get_text(strip=True)
-            
-            date_match = re.search(r"(\d{1,2}\s+[A-Z][a-z]+\s+\d{4})", item.get_text())
+
+            # Text nodes only (no comments), like BeautifulSoup's get_text()
+            texts = item.xpath(".//text()")
+            title_elems = item.xpath(self.FULL_TITLE_XPATH) or item.xpath(".//h4")
+            title_texts = title_elems[0].xpath(".//text()") if title_elems else texts
+            title = "".join(t.strip() for t in title_texts)
+
+            date_match = self.DATE_RE.search("".join(texts))
             date_str = date_match.group(1) if date_match else ""
 
-            events.append({
+            yield {
                 "external_id": url,
                 "title": title,
                 "content": title,
                 "raw_url": url,
                 "published_at": date_str
-            })
-        return events
+            }
 
     def _parse_date(self, date_str: str) -> str:
         """Parse WHO date strings into ISO format."""
-        if not date_str:
-            return datetime.datetime.now().isoformat()
-        try:
-            # Handle formats like "8 January 2024" or API ISO strings
-            dt = dateutil.parser.parse(date_str)
-            return dt.isoformat()
-        except Exception:
-            return datetime.datetime.now().isoformat()
-
-    def run(self):
-        raw_events = self.fetch_latest()
-        print(f"Fetched {len(raw_events)} events.")
-        
-        source_id = None
-        if not self.dry_run:
-            source_id = self.db.upsert_source(
-                name="WHO Disease Outbreak News",
-                url="https://www.who.int/emergencies/disease-outbreak-news",
-                tier=1,
-                source_type="Web"
-            )
-
-        for e in raw_events:
-            # Clean up published_at
-            e['published_at'] = self._parse_date(e['published_at'])
-            
-            # Normalize and classify
-            processed = self.processor.process(e, source_tier=1)
-            
-            if self.dry_run:
-                print(f"--- Event: {processed['title']} ---")
-                print(f"    Date: {e['published_at']}")
-                print(f"    Diseases: {', '.join(processed['diseases']) or 'None detected'}")
-                print(f"    Locations: {', '.join(processed['locations']) or 'None detected'}")
-                print(f"    Classification: {processed['classification']} (Conf: {processed['confidence']})")
-                print(f"    Reason: {processed['assessment_text']}\n")
-            else:
-                if source_id:
-                    print(f"Storing: {processed['title']}...")
-                    raw_id = self.db.insert_raw_event(source_id, e)
-                    if raw_id:
-                        self.db.insert_normalized_event(raw_id, processed)
-                else:
-                    print("Error: Could not obtain source_id. Check Supabase connection.")
+        parsed = parse_who_date(date_str) if date_str else None
+        return parsed or datetime.datetime.now().isoformat()
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument("--dry-run", action="store_true", help="Fetch and print without saving to DB")
+    parser.add_argument("--full", action="store_true", help="Reprocess every fetched event, ignoring the watermark")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent LLM extraction workers")
     args = parser.parse_args()
     
-    ingestor = WHODonIngestor(dry_run=args.dry_run)
+    ingestor = WHODonIngestor(dry_run=args.dry_run, incremental=not args.full, concurrency=args.workers)
     ingestor.run()
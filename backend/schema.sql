@@ -29,6 +29,9 @@ CREATE TABLE IF NOT EXISTS diseases (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Hash of the fields loaded from the XLSX, so seed_diseases.py only rewrites changed rows
+ALTER TABLE diseases ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
 -- Raw Events Table (Preserve original data)
 CREATE TABLE IF NOT EXISTS raw_events (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -102,6 +105,87 @@ CREATE TABLE IF NOT EXISTS pipeline_runs (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Per-stage timers and counters of the run (see ingestion/metrics.py)
+ALTER TABLE pipeline_runs ADD COLUMN IF NOT EXISTS metrics JSONB;
+
+-- Near-duplicate raw events are linked to an existing normalized event
+-- instead of being extracted again (see ingestion/dedup.py)
+ALTER TABLE raw_events ADD COLUMN IF NOT EXISTS duplicate_of UUID REFERENCES normalized_events(id) ON DELETE SET NULL;
+
+-- Case and death counts reported for each disease and place of an event
+-- (see ingestion/case_counts.py)
+ALTER TABLE disease_mentions ADD COLUMN IF NOT EXISTS case_count INTEGER;
+ALTER TABLE disease_mentions ADD COLUMN IF NOT EXISTS death_count INTEGER;
+ALTER TABLE location_mentions ADD COLUMN IF NOT EXISTS case_count INTEGER;
+ALTER TABLE location_mentions ADD COLUMN IF NOT EXISTS death_count INTEGER;
+
+-- Re-extracting a raw event whose text changed replaces its normalized event
+-- (looked up by raw_event_id) instead of adding another one
+CREATE INDEX IF NOT EXISTS idx_normalized_events_raw_event_id ON normalized_events(raw_event_id);
+
+-- Daily event volume for anomaly detection (aggregated server-side).
+-- Returns one row per day in the window, including zero-count days.
+CREATE INDEX IF NOT EXISTS idx_raw_events_published_at ON raw_events(published_at);
+
+CREATE OR REPLACE FUNCTION daily_event_counts(lookback_days INTEGER DEFAULT 30)
+RETURNS TABLE (day DATE, event_count BIGINT)
+LANGUAGE sql STABLE AS $$
+    WITH days AS (
+        SELECT generate_series(CURRENT_DATE - (lookback_days - 1), CURRENT_DATE, INTERVAL '1 day')::date AS day
+    ),
+    events AS (
+        SELECT COALESCE(n.event_timestamp, r.published_at, n.created_at)::date AS day
+        FROM normalized_events n
+        JOIN raw_events r ON r.id = n.raw_event_id
+        WHERE COALESCE(n.event_timestamp, r.published_at, n.created_at) >= CURRENT_DATE - (lookback_days - 1)
+    )
+    SELECT days.day, COUNT(events.day) AS event_count
+    FROM days
+    LEFT JOIN events ON events.day = days.day
+    GROUP BY days.day
+    ORDER BY days.day;
+$$;
+
+-- Daily mention counts and reported cases per disease and per country for
+-- series-level anomaly detection. An event counts once per series, with the
+-- largest case count among its rows there (a country and one of its cities).
+-- Sparse (only non-zero days); paged because PostgREST caps rows.
+DROP FUNCTION IF EXISTS series_daily_counts(INTEGER, INTEGER, INTEGER);
+CREATE OR REPLACE FUNCTION series_daily_counts(
+    lookback_days INTEGER DEFAULT 90,
+    page_offset INTEGER DEFAULT 0,
+    page_limit INTEGER DEFAULT 1000
+)
+RETURNS TABLE (series_key TEXT, day DATE, event_count BIGINT, case_count BIGINT)
+LANGUAGE sql STABLE AS $$
+    WITH events AS (
+        SELECT n.id, COALESCE(n.event_timestamp, r.published_at, n.created_at)::date AS day
+        FROM normalized_events n
+        JOIN raw_events r ON r.id = n.raw_event_id
+        WHERE COALESCE(n.event_timestamp, r.published_at, n.created_at) >= CURRENT_DATE - (lookback_days - 1)
+    ),
+    mentions AS (
+        SELECT 'disease:' || d.disease_name AS series_key, e.day, e.id, d.case_count
+        FROM disease_mentions d
+        JOIN events e ON e.id = d.event_id
+        UNION ALL
+        SELECT 'country:' || l.country AS series_key, e.day, e.id, l.case_count
+        FROM location_mentions l
+        JOIN events e ON e.id = l.event_id
+        WHERE l.country IS NOT NULL
+    ),
+    per_event AS (
+        SELECT series_key, day, id, MAX(case_count) AS case_count
+        FROM mentions
+        GROUP BY series_key, day, id
+    )
+    SELECT series_key, day, COUNT(*) AS event_count, COALESCE(SUM(case_count), 0) AS case_count
+    FROM per_event
+    GROUP BY series_key, day
+    ORDER BY series_key, day
+    LIMIT page_limit OFFSET page_offset;
+$$;
+
 -- Initial Data: WHO Source
 INSERT INTO sources (name, url, tier, type)
 VALUES ('WHO Disease Outbreak News', 'https://www.who.int/feeds/newsroom/don/en/rss.xml', 1, 'RSS')
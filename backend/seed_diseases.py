@@ -1,66 +1,161 @@
-import pandas as pd
+"""
+Load the `diseases` reference table from "List of infectious diseases.xlsx".
+
+Rows are streamed with openpyxl in read-only mode and hashed; only diseases
+that are new or whose sheet fields changed since the last import are
+written, so re-seeding an unchanged file costs a single read query.
+Writes go out in adaptive batches: a batch that keeps failing after
+retries is split in half until the offending rows are isolated.
+
+Usage (from backend/):
+    python seed_diseases.py [--file "List of infectious diseases.xlsx"] [--dry-run] [--force]
+"""
+import argparse
+import hashlib
+import json
 import os
+import sys
 import time
+from typing import Dict, Any, Iterator, List, Tuple
+
+import openpyxl
 from dotenv import load_dotenv
-from supabase import create_client, Client
 
 load_dotenv(".env")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingestion"))
+
+from db_client import get_db
+
+DEFAULT_FILE = "List of infectious diseases.xlsx"
+
+# Table column -> sheet column
+COLUMN_MAP = {
+    "name": "Common name",
+    "pathogen_agent": "Infectious agent",
+    "diagnostic_protocols": "Diagnosis",
+    "treatment": "Treatment",
+    "vaccine_status": "Vaccine(s)",
+}
+
+# Only set when a disease is first inserted, so later edits in the table survive re-seeding
+INSERT_DEFAULTS = {
+    "symptoms": "Not specified in dataset",
+    "classification_reason": "Manual Import",
+    "severity_score": 5.0,  # Default medium severity
+    "total_case_count": 0,
+    "total_death_count": 0,
+    "tags": ["imported"],
+}
 
-url = os.environ.get("SUPABASE_URL")
-key = os.environ.get("SUPABASE_KEY")
-
-if not url or not key:
-    print("Error: Missing credentials")
-    exit(1)
-
-client: Client = create_client(url, key)
-
-file_path = "List of infectious diseases.xlsx"
-
-print(f"Reading {file_path}...")
-try:
-    df = pd.read_excel(file_path)
-    # Clean NaN values
-    df = df.fillna("")
-except Exception as e:
-    print(f"Error reading Excel: {e}")
-    exit(1)
-
-records_to_insert = []
-print(f"Preparing {len(df)} records...")
-
-for index, row in df.iterrows():
-    # Map CSV columns to Schema columns
-    record = {
-        "name": row.get("Common name", "Unknown"),
-        "pathogen_agent": row.get("Infectious agent", ""),
-        "diagnostic_protocols": row.get("Diagnosis", ""),
-        "treatment": row.get("Treatment", ""),
-        "vaccine_status": row.get("Vaccine(s)", ""),
-        # Defaults
-        "symptoms": "Not specified in dataset",
-        "classification_reason": "Manual Import",
-        "severity_score": 5.0, # Default medium severity
-        "total_case_count": 0,
-        "total_death_count": 0,
-        "tags": ["imported"]
-    }
-    records_to_insert.append(record)
-
-# Batch insert in chunks of 50 to avoid timeouts/limits
-BATCH_SIZE = 50
-total_inserted = 0
-
-print("Starting ingestion...")
-for i in range(0, len(records_to_insert), BATCH_SIZE):
-    batch = records_to_insert[i:i + BATCH_SIZE]
+MIN_BATCH = 25
+MAX_BATCH = 500
+RETRIES = 2
+
+
+def iter_records(path: str) -> Iterator[Dict[str, str]]:
+    """Stream sheet rows as records of the mapped columns; rows without a name are skipped."""
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
     try:
-        # upsert based on name (which is unique in schema)
-        res = client.table("diseases").upsert(batch, on_conflict="name").execute()
-        total_inserted += len(batch)
-        print(f"Inserted batch {i // BATCH_SIZE + 1} ({len(batch)} records). Total: {total_inserted}")
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else "" for cell in next(rows, ())]
+        missing = [col for col in COLUMN_MAP.values() if col not in header]
+        if missing:
+            raise ValueError(f"Missing columns in {path}: {', '.join(missing)}")
+        positions = {field: header.index(col) for field, col in COLUMN_MAP.items()}
+        for row in rows:
+            record = {field: str(row[i]).strip() if i < len(row) and row[i] is not None else ""
+                      for field, i in positions.items()}
+            if record["name"]:
+                yield record
+    finally:
+        workbook.close()
+
+
+def content_hash(record: Dict[str, str]) -> str:
+    return hashlib.sha256(json.dumps(record, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def plan_changes(records: Iterator[Dict[str, str]], existing: Dict[str, str],
+                 force: bool = False) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+    """
+    Split sheet records into (new rows, changed rows, unchanged count)
+    against {name: content_hash} of the stored diseases. A name listed
+    twice keeps its last row, as sequential upserts would.
+    """
+    by_name: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        by_name[record["name"]] = {**record, "content_hash": content_hash(record)}
+    new_rows, changed_rows = [], []
+    for name, row in by_name.items():
+        if name not in existing:
+            new_rows.append({**row, **INSERT_DEFAULTS})
+        elif force or existing[name] != row["content_hash"]:
+            changed_rows.append(row)
+    return new_rows, changed_rows, len(by_name) - len(new_rows) - len(changed_rows)
+
+
+def upsert_batch(db: Any, batch: List[Dict[str, Any]], failed: List[Tuple[str, str]]) -> int:
+    """Upsert with retries; on persistent failure, bisect to isolate the bad rows."""
+    for attempt in range(RETRIES + 1):
+        try:
+            db.upsert_diseases(batch)
+            return len(batch)
+        except Exception as e:
+            error = e
+            if attempt < RETRIES:
+                time.sleep(0.5 * 2 ** attempt)
+    if len(batch) == 1:
+        failed.append((batch[0]["name"], str(error)))
+        return 0
+    middle = len(batch) // 2
+    return upsert_batch(db, batch[:middle], failed) + upsert_batch(db, batch[middle:], failed)
+
+
+def write_rows(db: Any, rows: List[Dict[str, Any]], failed: List[Tuple[str, str]], batch_size: int = 100) -> int:
+    """Write rows in batches that double after a clean batch and halve after a failing one."""
+    written = 0
+    i = 0
+    while i < len(rows):
+        batch = rows[i:i + batch_size]
+        ok = upsert_batch(db, batch, failed)
+        written += ok
+        i += len(batch)
+        batch_size = min(MAX_BATCH, batch_size * 2) if ok == len(batch) else max(MIN_BATCH, batch_size // 2)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the diseases reference table from the XLSX list.")
+    parser.add_argument("--file", default=DEFAULT_FILE)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--force", action="store_true", help="Rewrite every disease, changed or not")
+    args = parser.parse_args()
+
+    db = get_db()
+    if not db.client:
+        print("Error: Missing credentials")
+        sys.exit(1)
+
+    print(f"Reading {args.file}...")
+    existing = {row["name"]: row.get("content_hash") for row in db.get_diseases("name, content_hash")}
+    try:
+        new_rows, changed_rows, unchanged = plan_changes(iter_records(args.file), existing, force=args.force)
     except Exception as e:
-        print(f"Error inserting batch {i}: {e}")
-        # If bulk fails, try one by one for this batch (optional, but good for debugging)
-        
-print(f"Done! Successfully processed {total_inserted} records.")
+        print(f"Error reading Excel: {e}")
+        sys.exit(1)
+    print(f"{len(new_rows)} new, {len(changed_rows)} changed, {unchanged} unchanged diseases.")
+    if args.dry_run or not (new_rows or changed_rows):
+        return
+
+    failed: List[Tuple[str, str]] = []
+    # New and changed rows go separately: bulk upserts need the same columns in every row
+    written = write_rows(db, new_rows, failed) + write_rows(db, changed_rows, failed)
+    for name, error in failed:
+        print(f"Error writing disease '{name}': {error}")
+    print(f"Done! Wrote {written} records ({len(failed)} failed).")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()